@@ -71,6 +71,90 @@ F6_INPUT = config.get('Files', 'F6_INPUT', fallback='')
 F6_OUTPUT = config.get('Files', 'F6_OUTPUT', fallback='')
 
 
+def _field_list(raw):
+    # 逗号分隔的字段名清单 (兼容中文逗号)
+    return [name.strip() for name in raw.replace('，', ',').split(',') if name.strip()]
+
+
+# [V2.4.0 新增] 列投影配置 [Fields] (均为可选项)：只提取并输出所列字段，留空为全部字段。
+# 未列出的字段不再读取；所列字段均不在详情页 (或工作台详情面板) 上时，整个详情访问一并跳过。
+F1_FIELDS = _field_list(config.get('Fields', 'F1_FIELDS', fallback=''))
+F2_FIELDS = _field_list(config.get('Fields', 'F2_FIELDS', fallback=''))
+F5_FIELDS = _field_list(config.get('Fields', 'F5_FIELDS', fallback=''))
+
+# 引擎性能调优配置 [Engine] (均为可选项，未配置时取下列缺省值)
+# 注意：以下几项缺省即开启，与 V2.4.0 之前的行为不同：热备切换 (WARM_STANDBY)、单任务看门狗 (ITEM_DEADLINE = 120)、
+# 列表状态存档 (RESTORE_LIST_STATE)、工程数缓存 (COUNT_CACHE_TTL_DAYS = 7)、单据内容缓存 (CONTENT_CACHE_MAX_ENTRIES)、
+# 盘点列表整表采集 (LIST_HARVEST = auto) 与前缀批量检索 (PREFIX_BATCH)；其余优化缺省关闭
+# 对冲检索：检索耗时超过已学习的 p95 时，在预热好的备用标签页上同时发起同一检索，先返回者胜出
+HEDGE_SEARCH = config.getboolean('Engine', 'HEDGE_SEARCH', fallback=False)
+# 对冲检索启用前需要积累的最少检索样本数，样本不足时 p95 不可信，暂不对冲
+HEDGE_MIN_SAMPLES = config.getint('Engine', 'HEDGE_MIN_SAMPLES', fallback=20)
+# 热备切换：常驻一个已挂载筛选条件的备用检索标签页，主标签页故障时立即顶替，并在后台重新预热
+WARM_STANDBY = config.getboolean('Engine', 'WARM_STANDBY', fallback=True)
+# 单任务看门狗：每个编号单次处理的墙钟截止秒数，超时即销毁卡死标签页并进入重试流程 (0 表示关闭)
+ITEM_DEADLINE = config.getfloat('Engine', 'ITEM_DEADLINE', fallback=120)
+# 列表状态存档：记录已挂载筛选条件的列表地址与筛选区指纹，启动与自愈时直达已配置的列表，跳过菜单导航与筛选点击
+RESTORE_LIST_STATE = config.getboolean('Engine', 'RESTORE_LIST_STATE', fallback=True)
+# 列表状态存档文件路径，缺省存放于程序所在目录
+LIST_STATE_FILE = config.get('Engine', 'LIST_STATE_FILE', fallback='') or os.path.join(base_path, 'list_state.json')
+# 分级自愈：单个任务最多执行的自愈步数 (重新检索 -> 清除标签 -> 重载标签页 -> 重建环境 -> 重启浏览器，按代价模型选择起点)
+RECOVERY_MAX_STEPS = config.getint('Engine', 'RECOVERY_MAX_STEPS', fallback=3)
+# 离线解析：详情页就绪后抓取一次整页 HTML 快照并立即关闭标签页，表单解析交由后台线程用 lxml 完成
+# (默认关闭：离线文本读取与在线 innerText 尚未在全部表单模板上核对一致)
+OFFLINE_PARSE = config.getboolean('Engine', 'OFFLINE_PARSE', fallback=False)
+# 离线解析后台线程数
+PARSE_WORKERS = config.getint('Engine', 'PARSE_WORKERS', fallback=2)
+# 工程数来源：workbench = 业务线开始前先到项目流程工作台批量嗅探全部编号 (原有行为)；
+# search = 由业务线自身的项目检索结果推导工程数，仅在项目暂无任何单据时才按需回退至工作台单查
+ENGINEERING_COUNT_SOURCE = config.get('Engine', 'ENGINEERING_COUNT_SOURCE', fallback='workbench').strip().lower()
+# 详情页获取方式 (功能1/2)：browser = 经浏览器标签页打开；http = 复用登录会话 Cookie，以长连接 HTTP 客户端并发直取并离线解析
+DETAIL_FETCH = config.get('Engine', 'DETAIL_FETCH', fallback='browser').strip().lower()
+# HTTP 直取的并发连接数
+HTTP_WORKERS = config.getint('Engine', 'HTTP_WORKERS', fallback=4)
+# HTTP 直取的单次请求超时秒数
+HTTP_TIMEOUT = config.getfloat('Engine', 'HTTP_TIMEOUT', fallback=20)
+# 工作台工程数查询方式：ui = 驱动工作台输入框与按钮逐个查询；http = 复用登录会话直接请求工作台查询接口，并发查询
+COUNT_FETCH = config.get('Engine', 'COUNT_FETCH', fallback='ui').strip().lower()
+# 工作台查询接口地址 (可选)：留空时在首次界面查询中监听网络请求自动学习
+WORKBENCH_QUERY_URL = config.get('Engine', 'WORKBENCH_QUERY_URL', fallback='').strip()
+# 手工指定查询接口时，提交项目编号所用的表单字段名
+WORKBENCH_QUERY_FIELD = config.get('Engine', 'WORKBENCH_QUERY_FIELD', fallback='projectcode').strip()
+# 本地持久化缓存文件路径 (SQLite)，缺省存放于程序所在目录
+CACHE_FILE = config.get('Engine', 'CACHE_FILE', fallback='') or os.path.join(base_path, 'valkyrie_cache.db')
+# 工程数缓存有效期 (天)：有效期内的编号直接复用缓存，不再到工作台查询 (0 表示关闭缓存)
+COUNT_CACHE_TTL_DAYS = config.getfloat('Engine', 'COUNT_CACHE_TTL_DAYS', fallback=7)
+# 单据内容缓存条目上限：已结束单据的提取结果按单据身份长期复用，超出上限按最近使用时间淘汰 (0 表示关闭)
+CONTENT_CACHE_MAX_ENTRIES = config.getint('Engine', 'CONTENT_CACHE_MAX_ENTRIES', fallback=20000)
+# 空结果缓存有效期 (天)：有效期内两次检索均为空的编号直接本地作答，过期后才重新检索 (0 表示关闭，默认关闭)
+NEGATIVE_CACHE_TTL_DAYS = config.getfloat('Engine', 'NEGATIVE_CACHE_TTL_DAYS', fallback=0)
+# 强制刷新：忽略已有的空结果记录，本次运行全部重新检索 (检索结果照常回写)
+NEGATIVE_CACHE_BYPASS = config.getboolean('Engine', 'NEGATIVE_CACHE_BYPASS', fallback=False)
+# 盘点列表整表采集 (功能3)：auto = 按输入规模与列表总条数自动选择更快的方式；force = 只要接口可用即整表采集；off = 关闭
+LIST_HARVEST = config.get('Engine', 'LIST_HARVEST', fallback='auto').strip().lower()
+# 整表采集的每页条数 (取列表允许的最大值)
+HARVEST_PAGE_SIZE = config.getint('Engine', 'HARVEST_PAGE_SIZE', fallback=500)
+# 列表数据接口的页码参数名与每页条数参数名
+HARVEST_PAGE_PARAM = config.get('Engine', 'HARVEST_PAGE_PARAM', fallback='pageno').strip()
+HARVEST_SIZE_PARAM = config.get('Engine', 'HARVEST_SIZE_PARAM', fallback='rowsize').strip()
+# 施工委托招标列表本地镜像 (功能1/2)：首次整表同步、此后增量同步，检索改为本地查询
+LIST_MIRROR = config.getboolean('Engine', 'LIST_MIRROR', fallback=False)
+# 镜像同步时附加的排序参数 (按创建时间倒序)
+MIRROR_ORDER_PARAMS = config.get('Engine', 'MIRROR_ORDER_PARAMS', fallback='orderby=docCreateTime&ordertype=down').strip()
+# 增量同步的重叠窗口 (天)：重新拉取镜像最新单据之前这段时间内创建的单据，覆盖创建较早、近期才结束的单据
+MIRROR_OVERLAP_DAYS = config.getint('Engine', 'MIRROR_OVERLAP_DAYS', fallback=30)
+# 前缀批量检索 (功能1/2/3)：密集成段的编号按共享前缀合并为一次检索，再在结果中逐个匹配
+PREFIX_BATCH = config.getboolean('Engine', 'PREFIX_BATCH', fallback=True)
+# 前缀最多截去的末尾数字位数 (3 表示一个前缀最多覆盖 1000 个编号)
+PREFIX_MAX_DIGITS = config.getint('Engine', 'PREFIX_MAX_DIGITS', fallback=3)
+# 成组所需的最低密度：组内输入编号数 / 前缀覆盖的编号数
+PREFIX_MIN_DENSITY = config.getfloat('Engine', 'PREFIX_MIN_DENSITY', fallback=0.1)
+# 单个前缀检索的结果条数上限，超出时拆分为更窄的前缀
+PREFIX_MAX_ROWS = config.getint('Engine', 'PREFIX_MAX_ROWS', fallback=2000)
+# 增量刷新 (功能1/2/3)：以上一次的输出表为底稿，终态行原样沿用，只重新查询状态仍可能变化的编号与工程，合并写回输出表
+INCREMENTAL_REFRESH = config.getboolean('Engine', 'INCREMENTAL_REFRESH', fallback=False)
+
+
 # =========================================================
 # 4. 内部静态常量 (非动态配置项)
 # =========================================================
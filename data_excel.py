@@ -82,6 +82,45 @@ def load_and_clean_data(file_path):
     return valid_codes
 
 
+def load_previous_results(file_path):
+    """
+    [V2.4.0 新增] 增量刷新底稿读取模块
+    功能：读取上一次运行的输出表，按项目编号索引每一行 (同一编号取首行)，空单元格还原为空字符串。
+    文件不存在时返回空字典，即本次全部重新查询。
+    """
+    if not file_path or not os.path.exists(file_path):
+        print("[增量刷新] 未找到上一次的输出表，本次全部重新查询。")
+        return {}
+
+    try:
+        df = pd.read_excel(file_path)
+    except Exception as e:
+        raise Exception(f"[系统异常] 上一次的输出表读取失败，请检查文件占用状态。错误详情：{e}")
+
+    df = df.astype(object).where(df.notna(), "")
+    previous = {}
+    for row in df.to_dict("records"):
+        previous.setdefault(str(row.get("项目编号", "")).strip(), row)
+    print(f"[增量刷新] 已读取上一次的输出表，共 {len(previous)} 条记录。")
+    return previous
+
+
+def select_fields(requested, available, option, fixed=()):
+    """
+    [V2.4.0 新增] 列投影模块
+    功能：从业务线的可选字段中选出本次运行需要提取的字段，按原有列序返回。
+    requested 为空时返回全部字段；fixed 为始终输出的标识列 (如项目编号、状态)，列出时忽略。
+    包含未知字段名时抛出异常，防止拼写错误静默产出缺列的结果表。
+    """
+    if not requested:
+        return list(available)
+
+    unknown = [name for name in requested if name not in available and name not in fixed]
+    if unknown:
+        raise Exception(f"FieldSelectionError: {option} 中包含未知字段 {unknown}，可选字段：{'、'.join(available)}")
+    return [name for name in available if name in requested]
+
+
 def save_data_to_excel(data_list, output_file):
     """
     数据输出与序列化模块
@@ -0,0 +1,530 @@
+"""
+ValkyrieEngine 本地持久化缓存模块 (SQLite)
+功能：在程序所在目录的 SQLite 文件中保存跨功能、跨运行复用的基础数据，避免每次运行都重新向 ERP 查询。
+
+【工程数缓存】
+项目的工程数极少变化，而功能2/3 每次运行都要到工作台逐个重新查询 (每个编号数秒)。
+缓存以项目编号为键，记录查询到的真实工程数与写入时间；有效期 (COUNT_CACHE_TTL_DAYS) 内直接复用，
+只有未命中与已过期的编号才需要查询。查询失败时使用的兜底值 3 不是真实数据，绝不写入缓存。
+
+【单据内容缓存】
+检索环境只列出“结束”状态的单据，已结束单据的表单内容不会再变化，提取一次即可长期复用。
+缓存以单据身份 (fdId 或 SR 编号) 为键保存提取结果，并附带提取模式标签 (字段列表指纹 + 手工版本号)：
+  - 模式变化 (字段增删或解析规则升级) 时，该业务线的旧缓存在首次使用时整体清除；
+  - 条目总数超过 CONTENT_CACHE_MAX_ENTRIES 时，按最近使用时间淘汰最久未用的条目 (LRU)。
+
+【空结果缓存】
+相当比例的输入编号查询不到任何数据 (功能1“未发包”、功能2 单个后缀“未发包”、功能5“查无此项目”)，
+每次运行仍要完整经历一次检索与渲染等待。空结果按业务线与编号记录，有效期 (NEGATIVE_CACHE_TTL_DAYS) 内直接本地作答，
+过期后才重新检索；此后一旦查到数据立即删除对应记录。
+单次检索为空也可能只是列表尚未渲染完毕，因此首次为空只记作一次“待确认”；有效期内再次检索仍得到相同的空结果，
+才写入空结果缓存并开始直接作答。缓存默认关闭 (NEGATIVE_CACHE_TTL_DAYS = 0)，需手动开启。NEGATIVE_CACHE_BYPASS 开启时本次运行忽略已有记录、全部重新检索
+(检索结果仍照常回写，用于强制刷新)。
+
+【列表镜像】
+业务列表索引行 (单据身份、主题、SR 编号、单据地址、创建时间) 的本地副本，由 erp_list_mirror 负责同步，
+本模块只负责存取。每个列表另记一条同步状态：列表数据接口的请求模板、单据地址模板与上次同步时间。
+
+【耗时统计】
+各类操作 (检索、详情、工作台查询等) 的耗时中位数，供运行规划 (erp_run_planner) 在启动浏览器前预估耗时。
+每次运行结束时与已有记录按样本数加权合并 (历史权重以 LATENCY_MAX_SAMPLES 为上限，统计仍能跟随网络状况变化)，
+样本很少的一次运行不会覆盖长期积累的统计。
+
+【只读模式】
+运行规划试算期间 (read_only)，数据库以只读方式打开，不建表、不写入；缓存文件不存在时不会创建，各类缓存均视为未命中。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+import config
+
+_lock = threading.Lock()
+_initialized = False
+# 只读模式 (运行规划试算)：见模块说明
+_read_only = False
+
+# 耗时统计合并时，历史记录所占样本权重的上限
+LATENCY_MAX_SAMPLES = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS engineering_counts (
+    code TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detail_contents (
+    namespace TEXT NOT NULL,
+    schema TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, doc_key)
+);
+CREATE INDEX IF NOT EXISTS idx_detail_contents_last_used ON detail_contents (last_used);
+CREATE TABLE IF NOT EXISTS list_mirror (
+    list_key TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    sr_no TEXT,
+    link TEXT,
+    created_at TEXT,
+    PRIMARY KEY (list_key, doc_key)
+);
+CREATE INDEX IF NOT EXISTS idx_list_mirror_created ON list_mirror (list_key, created_at);
+CREATE TABLE IF NOT EXISTS list_mirror_state (
+    list_key TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    view_url TEXT NOT NULL,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS latency_stats (
+    op_name TEXT PRIMARY KEY,
+    median REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS negative_results (
+    namespace TEXT NOT NULL,
+    code TEXT NOT NULL,
+    status TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (namespace, code)
+);
+CREATE TABLE IF NOT EXISTS negative_sightings (
+    namespace TEXT NOT NULL,
+    code TEXT NOT NULL,
+    status TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (namespace, code)
+);
+"""
+
+# 本次运行中已完成模式校验 (旧模式缓存已清除) 的业务线
+_checked_namespaces = set()
+
+
+def _connect():
+    """
+    打开缓存数据库 (每次操作独立连接，便于多线程共用)，首次使用时建表；只读模式下以只读方式打开，不建表
+    """
+    global _initialized
+    if _read_only:
+        uri = f"file:{pathname2url(os.path.abspath(config.CACHE_FILE))}?mode=ro"
+        return sqlite3.connect(uri, uri=True, timeout=10)
+    conn = sqlite3.connect(config.CACHE_FILE, timeout=10)
+    if not _initialized:
+        with _lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(config.CACHE_FILE) or '.', exist_ok=True)
+                conn.executescript(SCHEMA)
+                _initialized = True
+    return conn
+
+
+@contextmanager
+def read_only():
+    """
+    [V2.4.0 新增] 只读模式：with 块内只读取已有的缓存文件，不建表、不写入
+    """
+    global _read_only
+    _read_only = True
+    try:
+        yield
+    finally:
+        _read_only = False
+
+
+def available():
+    """
+    缓存文件是否可用：只读模式下文件不存在即不可用 (不创建)
+    """
+    return not _read_only or os.path.exists(config.CACHE_FILE)
+
+
+def count_cache_enabled():
+    return config.COUNT_CACHE_TTL_DAYS > 0 and available()
+
+
+def get_counts(codes):
+    """
+    批量读取有效期内的工程数
+    返回：{项目编号: 工程数}，仅包含命中且未过期的编号；缓存不可用时返回空字典，由调用方照常查询。
+    """
+    if not count_cache_enabled() or not codes:
+        return {}
+
+    oldest = time.time() - config.COUNT_CACHE_TTL_DAYS * 86400
+    unique = list(dict.fromkeys(codes))
+    found = {}
+    try:
+        conn = _connect()
+        try:
+            # 分批查询，避免超出 SQLite 单条语句的参数个数上限
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT code, count FROM engineering_counts WHERE code IN ({marks}) AND updated_at >= ?",
+                    batch + [oldest]).fetchall()
+                found.update(rows)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[工程数缓存] 缓存读取失败，本次全部重新查询：{e}")
+        return {}
+    return found
+
+
+def put_counts(counts):
+    """
+    写入查询到的真实工程数：{项目编号: 工程数}。调用方须自行剔除兜底值，缓存只接受真实查询结果。
+    """
+    if not count_cache_enabled() or not counts:
+        return
+
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO engineering_counts (code, count, updated_at) VALUES (?, ?, ?)",
+                    [(code, int(count), now) for code, count in counts.items()])
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[工程数缓存] 缓存写入失败 (不影响本次结果)：{e}")
+
+
+# ---------------- 单据内容缓存 ----------------
+
+def content_cache_enabled():
+    return config.CONTENT_CACHE_MAX_ENTRIES > 0 and available()
+
+
+def schema_tag(version, fields):
+    """
+    提取模式标签：手工版本号 + 字段列表指纹。字段增删会自动改变标签；解析规则升级时手工递增版本号
+    """
+    digest = hashlib.md5("\x1f".join(fields).encode('utf-8')).hexdigest()[:8]
+    return f"v{version}-{digest}"
+
+
+def _check_schema(conn, namespace, schema):
+    """
+    每条业务线每次运行首次使用时，清除模式标签与当前不一致的旧缓存
+    """
+    if namespace in _checked_namespaces:
+        return
+    with conn:
+        removed = conn.execute("DELETE FROM detail_contents WHERE namespace = ? AND schema != ?",
+                               (namespace, schema)).rowcount
+    if removed:
+        print(f"[内容缓存] [{namespace}] 提取模式已变更，已清除 {removed} 条旧模式缓存。")
+    _checked_namespaces.add(namespace)
+
+
+def get_content(namespace, schema, doc_key):
+    """
+    读取单据的缓存内容，并刷新其最近使用时间
+    返回：缓存的提取结果 (dict)；未命中、模式不符或缓存不可用时返回 None。
+    """
+    if not content_cache_enabled() or not doc_key:
+        return None
+    try:
+        conn = _connect()
+        try:
+            _check_schema(conn, namespace, schema)
+            row = conn.execute("SELECT data FROM detail_contents WHERE namespace = ? AND schema = ? AND doc_key = ?",
+                               (namespace, schema, doc_key)).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute("UPDATE detail_contents SET last_used = ? WHERE namespace = ? AND doc_key = ?",
+                             (time.time(), namespace, doc_key))
+            return json.loads(row[0])
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[内容缓存] 缓存读取失败，照常打开详情页：{e}")
+        return None
+
+
+def put_content(namespace, schema, doc_key, data):
+    """
+    写入单据的提取结果；条目总数超出上限时淘汰最久未用的条目
+    """
+    if not content_cache_enabled() or not doc_key:
+        return
+    try:
+        conn = _connect()
+        try:
+            _check_schema(conn, namespace, schema)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO detail_contents (namespace, schema, doc_key, data, last_used) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (namespace, schema, doc_key, json.dumps(data, ensure_ascii=False), time.time()))
+                overflow = conn.execute("SELECT COUNT(*) FROM detail_contents").fetchone()[0] \
+                    - config.CONTENT_CACHE_MAX_ENTRIES
+                if overflow > 0:
+                    conn.execute("DELETE FROM detail_contents WHERE rowid IN "
+                                 "(SELECT rowid FROM detail_contents ORDER BY last_used LIMIT ?)", (overflow,))
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[内容缓存] 缓存写入失败 (不影响本次结果)：{e}")
+
+
+def put_content_when_ready(namespace, schema, doc_key, result, accept):
+    """
+    提取结果可能是后台解析任务 (Future)：完成后再判定是否写入缓存
+    参数 accept：接收提取结果、返回是否可以缓存 (只缓存完整无异常的结果)。
+    """
+    if not content_cache_enabled() or not doc_key:
+        return result
+
+    def store(data):
+        if data is not None and accept(data):
+            put_content(namespace, schema, doc_key, data)
+
+    if hasattr(result, "add_done_callback"):
+        result.add_done_callback(lambda future: store(future.result()) if not future.exception() else None)
+    else:
+        store(result)
+    return result
+
+
+# ---------------- 空结果缓存 ----------------
+
+def negative_cache_enabled():
+    return config.NEGATIVE_CACHE_TTL_DAYS > 0 and available()
+
+
+def get_negative(namespace, code):
+    """
+    读取有效期内的空结果记录
+    返回：当时记录的状态文本 (如“查无此项目”)；未命中、已过期、处于强制刷新模式或缓存不可用时返回 None。
+    """
+    if not negative_cache_enabled() or config.NEGATIVE_CACHE_BYPASS:
+        return None
+
+    oldest = time.time() - config.NEGATIVE_CACHE_TTL_DAYS * 86400
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT status FROM negative_results WHERE namespace = ? AND code = ? AND checked_at >= ?",
+                               (namespace, code, oldest)).fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[空结果缓存] 缓存读取失败，照常检索：{e}")
+        return None
+    return row[0] if row else None
+
+
+def put_negative(namespace, code, status):
+    """
+    记录一次检索为空的结果：有效期内已有一次相同的空结果时确认写入空结果缓存 (刷新检索时间)，否则只记作待确认
+    返回：本次是否已确认写入。
+    """
+    if not negative_cache_enabled():
+        return False
+    now = time.time()
+    oldest = now - config.NEGATIVE_CACHE_TTL_DAYS * 86400
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                seen = conn.execute("SELECT status FROM negative_sightings WHERE namespace = ? AND code = ? "
+                                    "AND seen_at >= ?", (namespace, code, oldest)).fetchone()
+                confirmed = seen is not None and seen[0] == status
+                if confirmed:
+                    conn.execute("INSERT OR REPLACE INTO negative_results (namespace, code, status, checked_at) "
+                                 "VALUES (?, ?, ?, ?)", (namespace, code, status, now))
+                    conn.execute("DELETE FROM negative_sightings WHERE namespace = ? AND code = ?", (namespace, code))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO negative_sightings (namespace, code, status, seen_at) "
+                                 "VALUES (?, ?, ?, ?)", (namespace, code, status, now))
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[空结果缓存] 缓存写入失败 (不影响本次结果)：{e}")
+        return False
+    return confirmed
+
+
+def drop_negative(namespace, code):
+    """
+    编号已查到数据：删除其空结果记录与待确认记录 (强制刷新模式下查到的新数据同样据此生效)
+    """
+    if not negative_cache_enabled():
+        return
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM negative_results WHERE namespace = ? AND code = ?", (namespace, code))
+                conn.execute("DELETE FROM negative_sightings WHERE namespace = ? AND code = ?", (namespace, code))
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[空结果缓存] 缓存写入失败 (不影响本次结果)：{e}")
+
+
+# ---------------- 列表镜像 ----------------
+
+def get_mirror_state(list_key):
+    """
+    读取列表镜像的同步状态
+    返回：{"template": 请求模板, "view_url": 单据地址模板, "synced_at": 上次同步时间}；从未同步过时返回 None。
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT template, view_url, synced_at FROM list_mirror_state WHERE list_key = ?",
+                           (list_key,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {"template": json.loads(row[0]), "view_url": row[1], "synced_at": row[2]}
+
+
+def put_mirror_state(list_key, template, view_url, synced_at=None):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO list_mirror_state (list_key, template, view_url, synced_at) "
+                         "VALUES (?, ?, ?, ?)", (list_key, json.dumps(template, ensure_ascii=False), view_url, synced_at))
+    finally:
+        conn.close()
+
+
+def drop_mirror_state(list_key):
+    """
+    作废列表镜像的同步状态 (接口失效或同步失败时)：下次使用时重新学习接口，已有索引行保留并据此增量同步
+    """
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM list_mirror_state WHERE list_key = ?", (list_key,))
+    finally:
+        conn.close()
+
+
+def mirror_watermark(list_key):
+    """
+    镜像中最新单据的创建时间 (增量同步的起点)；镜像为空时返回 None
+    """
+    conn = _connect()
+    try:
+        return conn.execute("SELECT MAX(created_at) FROM list_mirror WHERE list_key = ?", (list_key,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def put_mirror_rows(list_key, rows):
+    """
+    写入 (或覆盖) 索引行：[{"doc_key", "subject", "sr_no", "link", "created_at"}, ...]
+    """
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO list_mirror (list_key, doc_key, subject, sr_no, link, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(list_key, r["doc_key"], r["subject"], r["sr_no"], r["link"], r["created_at"]) for r in rows])
+    finally:
+        conn.close()
+
+
+def find_mirror_rows(list_key, keyword):
+    """
+    按主题关键字查询索引行 (与列表主题检索的“包含”语义一致)，按创建时间排列
+    返回：[(doc_key, subject, link), ...]
+    """
+    conn = _connect()
+    try:
+        return conn.execute("SELECT doc_key, subject, link FROM list_mirror WHERE list_key = ? AND instr(subject, ?) > 0 "
+                            "ORDER BY created_at", (list_key, keyword)).fetchall()
+    finally:
+        conn.close()
+
+
+def count_contents(namespace, schema, doc_keys):
+    """
+    统计一批单据中已有内容缓存的数量 (只读，不刷新最近使用时间；供运行规划试算)；缓存不可用时返回 0
+    """
+    keys = [key for key in dict.fromkeys(doc_keys) if key]
+    if not content_cache_enabled() or not keys:
+        return 0
+    found = 0
+    try:
+        conn = _connect()
+        try:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                found += conn.execute(f"SELECT COUNT(*) FROM detail_contents WHERE namespace = ? AND schema = ? "
+                                      f"AND doc_key IN ({marks})", [namespace, schema] + batch).fetchone()[0]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[内容缓存] 缓存统计失败，按全部未命中估算：{e}")
+        return 0
+    return found
+
+
+# ---------------- 耗时统计 ----------------
+
+def put_latency_stats(stats):
+    """
+    写入本次运行各类操作的耗时统计：{操作名称: (耗时中位数, 样本数)}
+    与同名操作的已有记录按样本数加权合并 (历史权重不超过 LATENCY_MAX_SAMPLES)，而非直接覆盖
+    """
+    if not stats:
+        return
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                marks = ",".join("?" * len(stats))
+                stored = {op: (median, samples) for op, median, samples in conn.execute(
+                    f"SELECT op_name, median, samples FROM latency_stats WHERE op_name IN ({marks})", list(stats))}
+                merged = []
+                for op, (median, samples) in stats.items():
+                    old_median, old_samples = stored.get(op, (0.0, 0))
+                    old_samples = min(old_samples, LATENCY_MAX_SAMPLES)
+                    total = old_samples + samples
+                    merged.append((op, (old_median * old_samples + median * samples) / total, total, now))
+                conn.executemany("INSERT OR REPLACE INTO latency_stats (op_name, median, samples, updated_at) "
+                                 "VALUES (?, ?, ?, ?)", merged)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[耗时统计] 统计写入失败 (不影响本次结果)：{e}")
+
+
+def get_latency_stats():
+    """
+    读取历次运行记录的耗时统计：{操作名称: (耗时中位数, 样本数)}；缓存不可用时返回空字典
+    """
+    if not available():
+        return {}
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute("SELECT op_name, median, samples FROM latency_stats").fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[耗时统计] 统计读取失败：{e}")
+        return {}
+    return {op: (median, samples) for op, median, samples in rows}
\ No newline at end of file
@@ -3,6 +3,17 @@ ValkyrieEngine 页面初始化与环境导航模块 (功能1专属)
 功能：控制浏览器导航至“施工委托招标”页面，并完成筛选条件的初始化。
 """
 
+import erp_list_state  # [V2.4.0 新增] 列表检索状态存档，支持按地址直达已配置的列表
+
+# [V2.4.0 新增] 列表状态存档的业务键，以及列表渲染完毕的锚点
+STATE_KEY = 'construction_bidding'
+RENDER_ANCHOR = 'text:SR'
+
+# [V2.4.0 新增] 业务列表地址 (尚未挂载筛选条件时的页面地址)
+# 首次经菜单导航进入列表后自动记录，供备用检索标签页按地址直达构建，跳过首页菜单导航。
+LIST_URL = None
+
+
 def reset_and_back_to_home(page):
     """
     页面状态重置模块
@@ -40,6 +51,10 @@ def apply_search_conditions(tab):
     # 强行等待可避免因抓取到“即将被替换的旧元素”而引发的 ElementLostError（元素失效异常）。
     tab.wait(2)
 
+    # [V2.4.0 新增] 页面稳定后、挂载条件前，记录业务列表地址
+    global LIST_URL
+    LIST_URL = tab.url
+
     print("[参数配置] 正在设置业务筛选条件...")
 
     # 【定位与操作 1】：通过元素属性锁定单选按钮
@@ -79,6 +94,50 @@ def apply_search_conditions(tab):
         print(f"[系统警报] 致命超时：30秒内未检测到 'SR' 数据，网络严重阻塞！")
         raise Exception("ListRenderTimeout: 列表渲染严重超时，拒绝执行后续脏数据抓取。")
 
+    # [V2.4.0 新增] 筛选条件挂载成功，存档列表地址与筛选区状态，后续可直达已配置的列表
+    erp_list_state.capture_list_state(STATE_KEY, LIST_URL, tab)
+
+
+def open_search_tab(page):
+    """
+    查询标签页单次构建模块
+    功能：从首页导航至“施工委托招标(项目)”列表并挂载筛选条件，返回配置完毕的标签页。
+    本函数只尝试一次、失败直接抛出，不触发任何页面重置，
+    便于 setup_search_environment 的重试循环与对冲检索的备用标签页构建共同复用。
+    """
+    # 【定位与操作 3】：通过文本模糊匹配进行导航
+    # 语法解析：'text:流程查询' 表示在页面上寻找可见文本包含“流程查询”的元素并执行点击。
+    page.ele('text:流程查询', timeout=15).click()
+    print("[环境导航] 触发菜单栏 '流程查询'")
+
+    # 上一步的点击会触发浏览器打开一个新的标签页，
+    # 必须通过 page.latest_tab 将代码的控制权（句柄）移交至最新弹出的页面对象上。
+    tab = page.latest_tab
+
+    # 在新获取控制权的页面中，继续通过文本特征查找目标业务入口并点击
+    tab.ele('text:施工委托招标(项目)', timeout=15).click()
+    print("[环境导航] 成功进入施工委托业务列表...")
+
+    # 页面导航完成，调用独立模块执行具体的筛选框勾选逻辑
+    apply_search_conditions(tab)
+
+    print("[环境导航] 业务查询环境初始化完毕，检索条件已挂载。")
+    return tab
+
+
+def restore_search_tab(page, tab_guard=None, on_created=None):
+    """
+    [V2.4.0 新增] 查询标签页存档直达模块
+    功能：按已存档的列表状态直接打开已挂载筛选条件的列表并校验筛选状态，跳过菜单导航与筛选点击。
+    返回：校验通过的标签页；无存档或校验失败时返回 None。
+    """
+    global LIST_URL
+    tab = erp_list_state.open_configured_tab(page, STATE_KEY, RENDER_ANCHOR,
+                                             tab_guard=tab_guard, on_created=on_created)
+    if tab is not None and not LIST_URL:
+        LIST_URL = erp_list_state.load_list_state(STATE_KEY).get("list_url")
+    return tab
+
 
 def setup_search_environment(page):
     """
@@ -86,32 +145,19 @@ def setup_search_environment(page):
     功能：控制浏览器从首页逐步导航至具体的业务查询列表，并调用 apply_search_conditions 完成条件设置。
     内置多轮重试的自愈机制，以应对企业内网偶尔的延迟与阻断。
     """
+    # [V2.4.0 新增] 优先按存档直达已配置的列表，存档缺失或校验失败时再走菜单导航
+    tab = restore_search_tab(page)
+    if tab is not None:
+        return tab
+
     max_try = 3  # 定义最大容错重试次数
 
     for attempt in range(1, max_try + 1):
         print(f"\n[环境导航 - 第 {attempt}/{max_try} 次尝试] 正在进入施工委托查询界面...")
 
         try:
-            # 【定位与操作 3】：通过文本模糊匹配进行导航
-            # 语法解析：'text:流程查询' 表示在页面上寻找可见文本包含“流程查询”的元素并执行点击。
-            page.ele('text:流程查询', timeout=15).click()
-            print("[环境导航] 触发菜单栏 '流程查询'")
-
-            # 上一步的点击会触发浏览器打开一个新的标签页，
-            # 必须通过 page.latest_tab 将代码的控制权（句柄）移交至最新弹出的页面对象上。
-            tab = page.latest_tab
-
-            # 在新获取控制权的页面中，继续通过文本特征查找目标业务入口并点击
-            tab.ele('text:施工委托招标(项目)', timeout=15).click()
-            print("[环境导航] 成功进入施工委托业务列表...")
-
-            # 页面导航完成，调用独立模块执行具体的筛选框勾选逻辑
-            apply_search_conditions(tab)
-
-            print("[环境导航] 业务查询环境初始化完毕，检索条件已挂载。")
-
             # 返回初始化完毕的标签页对象，供后续的数据提取模块进行循环搜索
-            return tab
+            return open_search_tab(page)
 
         except Exception as e:
             # 异常捕获与日志输出：记录引发超时的具体节点错误信息
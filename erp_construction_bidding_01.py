@@ -5,6 +5,17 @@ ValkyrieEngine 页面初始化与环境导航模块 (功能2专属：工程维
 区分：本模块专用于【工程维度】查询，与功能1的【项目维度】入口不同。
 """
 
+import erp_list_state  # [V2.4.0 新增] 列表检索状态存档，支持按地址直达已配置的列表
+
+# [V2.4.0 新增] 列表状态存档的业务键，以及列表渲染完毕的锚点
+STATE_KEY = 'construction_bidding_01'
+RENDER_ANCHOR = 'text:SR'
+
+# [V2.4.0 新增] 业务列表地址 (尚未挂载筛选条件时的页面地址)
+# 首次经菜单导航进入列表后自动记录，供备用检索标签页按地址直达构建，跳过首页菜单导航。
+LIST_URL = None
+
+
 def reset_and_back_to_home(page):
     """
     页面状态重置模块 (复用逻辑)
@@ -41,6 +52,10 @@ def apply_search_conditions(tab):
     # 这一步是为了防止 DOM 树还未构建完成就急着操作。
     tab.wait(2)
 
+    # [V2.4.0 新增] 页面稳定后、挂载条件前，记录业务列表地址
+    global LIST_URL
+    LIST_URL = tab.url
+
     print("[参数配置] 正在设置业务筛选条件...")
 
     # 【定位与操作 1】：通过元素属性锁定单选按钮
@@ -76,37 +91,66 @@ def apply_search_conditions(tab):
         print(f"[系统警报] 致命超时：30秒内未检测到 'SR' 数据，网络严重阻塞！")
         raise Exception("ListRenderTimeout: 列表渲染严重超时。")
 
+    # [V2.4.0 新增] 筛选条件挂载成功，存档列表地址与筛选区状态，后续可直达已配置的列表
+    erp_list_state.capture_list_state(STATE_KEY, LIST_URL, tab)
+
+
+def open_search_tab(page):
+    """
+    查询标签页单次构建模块 (功能2入口)
+    功能：导航至“施工委托（招标）”并挂载筛选条件，只尝试一次、失败直接抛出，不触发页面重置。
+    """
+    # 1. 点击一级菜单 '流程查询'
+    page.ele('text:流程查询', timeout=15).click()
+    print("[环境导航] 触发菜单栏 '流程查询'")
+
+    # 移交控制权至新页面
+    tab = page.latest_tab
+
+    # 2. 点击二级菜单 (注意：这里是功能2的核心差异点！)
+    # 功能1点的是“施工委托招标(项目)”，这里我们要点“施工委托（招标）”
+    tab.ele('text:施工委托（招标）', timeout=15).click()
+    print("[环境导航] 成功进入【施工委托（招标）】业务列表...")
+
+    # 3. 执行筛选条件挂载
+    apply_search_conditions(tab)
+
+    print("[环境导航] 业务查询环境初始化完毕，检索条件已挂载。")
+    return tab
+
+
+def restore_search_tab(page, tab_guard=None, on_created=None):
+    """
+    [V2.4.0 新增] 查询标签页存档直达模块
+    功能：按已存档的列表状态直接打开已挂载筛选条件的列表并校验筛选状态，跳过菜单导航与筛选点击。
+    返回：校验通过的标签页；无存档或校验失败时返回 None。
+    """
+    global LIST_URL
+    tab = erp_list_state.open_configured_tab(page, STATE_KEY, RENDER_ANCHOR,
+                                             tab_guard=tab_guard, on_created=on_created)
+    if tab is not None and not LIST_URL:
+        LIST_URL = erp_list_state.load_list_state(STATE_KEY).get("list_url")
+    return tab
+
 
 def setup_search_environment(page):
     """
     查询环境导航总控模块 (功能2入口)
     功能：导航至“施工委托（招标）”并初始化。
     """
+    # [V2.4.0 新增] 优先按存档直达已配置的列表，存档缺失或校验失败时再走菜单导航
+    tab = restore_search_tab(page)
+    if tab is not None:
+        return tab
+
     max_try = 3  # 定义最大容错重试次数
 
     for attempt in range(1, max_try + 1):
         print(f"\n[环境导航 - 第 {attempt}/{max_try} 次尝试] 正在进入【施工委托（招标）】界面...")
 
         try:
-            # 1. 点击一级菜单 '流程查询'
-            page.ele('text:流程查询', timeout=15).click()
-            print("[环境导航] 触发菜单栏 '流程查询'")
-
-            # 移交控制权至新页面
-            tab = page.latest_tab
-
-            # 2. 点击二级菜单 (注意：这里是功能2的核心差异点！)
-            # 功能1点的是“施工委托招标(项目)”，这里我们要点“施工委托（招标）”
-            tab.ele('text:施工委托（招标）', timeout=15).click()
-            print("[环境导航] 成功进入【施工委托（招标）】业务列表...")
-
-            # 3. 执行筛选条件挂载
-            apply_search_conditions(tab)
-
-            print("[环境导航] 业务查询环境初始化完毕，检索条件已挂载。")
-
             # 返回初始化完毕的标签页对象
-            return tab
+            return open_search_tab(page)
 
         except Exception as e:
             print(f"[系统警报] 第 {attempt} 次加载未响应或渲染超时，错误详情：{e}")
@@ -1,6 +1,16 @@
 import time
+import config
 import erp_construction_bidding  # 导入页面初始化模块，用于调用其内置的页面重置功能
 import data_excel  # [V2.0.0 新增] 引入数据 I/O 模块，用于实现实时自动存档机制
+import erp_list_search  # [V2.4.0 新增] 引入通用列表检索原子库
+import erp_search_pool  # [V2.4.0 新增] 引入检索标签页池，支持对冲检索
+import erp_watchdog  # [V2.4.0 新增] 引入单任务看门狗，防止卡死的浏览器调用拖住整批任务
+import erp_recovery  # [V2.4.0 新增] 引入分级自愈策略，按代价从低到高逐级恢复
+import erp_page_reader  # [V2.4.0 新增] 引入页面批量读取模块，单次往返读取整张详情表单
+import erp_http  # [V2.4.0 新增] 引入详情页 HTTP 直取通道，浏览器只负责列表检索
+import erp_cache  # [V2.4.0 新增] 引入单据内容缓存，已结束单据提取一次即可长期复用
+import erp_list_mirror  # [V2.4.0 新增] 引入业务列表本地镜像，检索改为本地查询
+import erp_refresh  # [V2.4.0 新增] 引入增量刷新，自动存档保留底稿中尚未处理的行
 
 
 def get_empty_record(code, status):
@@ -9,19 +19,85 @@ def get_empty_record(code, status):
     功能：为每个项目编号初始化统一的字典映射模板。
     无论业务执行成功、匹配失败还是网络异常，均强制返回包含所有字段的字典。
     这保证了后续利用 Pandas 导出数据时，DataFrame 的列名严格对齐，防止表格错位。
+    [V2.4.0] 详情字段只包含列投影选中的字段 (detail_fields)，输出列随之收窄。
     """
-    return {
-        "项目编号": code,
-        "项目名称": 0,
-        "项目工程总造价(元)": 0,
-        "市政道路修复费": 0,
-        "小区道路修复费": 0,
-        "绿化修复费": 0,
-        "发包金额": 0,
-        "打捆招标名称": 0,
-        "项目中标金额": 0,
-        "状态": status
-    }
+    record = {"项目编号": code}
+    for field in detail_fields():
+        record[field] = 0
+    record["状态"] = status
+    return record
+
+
+# 详情页需要按序提取的字段名列表
+DETAIL_FIELDS = [
+    "项目名称", "项目工程总造价(元)", "市政道路修复费",
+    "小区道路修复费", "绿化修复费", "发包金额",
+    "打捆招标名称", "项目中标金额"
+]
+
+
+def detail_fields():
+    """
+    [V2.4.0 新增] 本次运行需要提取的详情字段 (列投影 F1_FIELDS，留空为全部字段)
+    """
+    return data_excel.select_fields(config.F1_FIELDS, DETAIL_FIELDS, "F1_FIELDS", fixed=("项目编号", "状态"))
+
+
+def project_cached(cached, code):
+    """
+    [V2.4.0 新增] 内容缓存中存放的是完整提取结果，按列投影裁剪后作答
+    """
+    record = get_empty_record(code, cached["状态"])
+    for field in detail_fields():
+        record[field] = cached.get(field, "抓取缺失")
+    return record
+
+
+# [V2.4.0 新增] 单据内容缓存的业务线标识与提取模式标签 (解析规则变化时递增版本号，旧缓存自动作废)
+CACHE_NAMESPACE = "f1_detail"
+CACHE_SCHEMA = erp_cache.schema_tag(1, DETAIL_FIELDS)
+# [V2.4.0 新增] 空结果缓存的业务线标识
+NEGATIVE_NAMESPACE = "f1_search"
+
+
+def is_final(row, count=None):
+    """
+    [V2.4.0 新增] 增量刷新的终态判定：精确命中且已提取出项目中标金额的记录不会再变化
+    (列投影不含项目中标金额时，精确命中即为终态)；未发包、待确认、字段异常与各类失败记录仍需重新查询。
+    项目维度不涉及工程数，count 仅为与功能2/3 统一签名。
+    """
+    if not row or row.get("状态") != "完成":
+        return False
+    return "项目中标金额" not in row or str(row["项目中标金额"]).strip() not in ("", "0", "0.0")
+
+
+def fill_detail_record(record, mapped):
+    """
+    字段映射回填模块
+    功能：将按字段名映射好的表单数据写入记录，缺失表头与缺失数据单元格分别标记，并联动“部分字段异常”状态。
+    """
+    for field in detail_fields():
+        if field not in mapped:
+            print(f"[数据提取] 警告：页面中未找到表头 [{field}]")
+            record[field] = "抓取缺失"
+            record["状态"] = "部分字段异常"
+        elif mapped[field] is None:
+            record[field] = "数据节点缺失"
+            record["状态"] = "部分字段异常"
+        else:
+            record[field] = mapped[field]
+    return record
+
+
+def mark_detail_failure(record, error):
+    """
+    表单整体读取失败：全部字段记录异常并不中断程序
+    """
+    print(f"[数据提取] 详情表单读取异常，底层错误: {error}")
+    for field in detail_fields():
+        record[field] = "抓取异常"
+    record["状态"] = "部分字段异常"
+    return record
 
 
 def extract_detail_data(detail_tab, code):
@@ -35,191 +111,221 @@ def extract_detail_data(detail_tab, code):
     # 初始化默认的返回模板，并标记初始状态为完成
     record = get_empty_record(code, "完成")
 
-    # 显式等待 2 秒：确保新打开的详情页面 DOM 树和内部 AJAX 数据完全渲染完毕
-    detail_tab.wait(2)
+    try:
+        # [V2.4.0 优化] 单次往返批量读取
+        # 逻辑：一次页面内脚本调用读取表单中所有 td.td_normal_title 表头及其后第一个 <td> 数据单元格，
+        # 再在 Python 侧按字段名映射。取代原先“固定等待 2 秒 + 每字段 ele()/next() 两次往返”的逐字段定位，
+        # 缺失字段也不再白白耗尽 3 秒的隐式等待。轮询等待表单就绪，取代固定的 2 秒强制等待。
+        pairs = erp_page_reader.read_label_pairs(detail_tab)
+    except Exception as e:
+        return mark_detail_failure(record, e)
 
-    # 定义需要按序提取的字段名列表
-    fields_to_extract = [
-        "项目名称", "项目工程总造价(元)", "市政道路修复费",
-        "小区道路修复费", "绿化修复费", "发包金额",
-        "打捆招标名称", "项目中标金额"
-    ]
+    return fill_detail_record(record, erp_page_reader.map_fields(pairs, detail_fields()))
 
-    for field in fields_to_extract:
-        try:
-            # 【定位策略 1：左侧表头严格匹配】
-            # 语法解析：tag:td@@class=td_normal_title@@text():{field}
-            # 逻辑：限定节点必须是 <td> 标签，且 class 属性必须为 td_normal_title，同时内部文本包含目标字段。
-            # 作用：这种强约束可以防止误抓页面上其他包含该字段文本的无关大模块。
-            label_td = detail_tab.ele(f'tag:td@@class=td_normal_title@@text():{field}', timeout=3)
-
-            # [V2.0.0 健壮性增强] 防御性编程：确保表头真实存在后再进行相对偏移
-            if not label_td:
-                print(f"[数据提取] 警告：页面中未找到表头 [{field}]")
-                record[field] = "抓取缺失"
-                record["状态"] = "部分字段异常"
-                continue
-
-            # 【定位策略 2：右侧数据宽泛匹配 (相对节点偏移)】
-            # 逻辑：获取上一步定位到的 label_td 节点的下一个兄弟节点 (next sibling)，限定其为 <td> 标签。
-            # 作用：因为 ERP 系统部分数据单元格缺失规范的 class 属性，所以放弃精确匹配 class，
-            # 只要它是紧随表头之后的单元格，即认定为包含目标金额的数据节点。
-            value_td = label_td.next('tag:td', timeout=2)
-
-            if value_td:
-                # 提取数据节点内的纯文本内容
-                raw_text = value_td.text
-
-                # 【数据清洗逻辑】
-                # 将系统底层自带的换行符 (\n) 与制表符 (\t) 替换为空字符串，最后用 strip() 移除首尾残留的空白字符。
-                clean_text = raw_text.replace('\n', '').replace('\t', '').strip()
-                record[field] = clean_text
-            else:
-                record[field] = "数据节点缺失"
-                record["状态"] = "部分字段异常"
 
-        except Exception as e:
-            # 容错处理：若该页面缺失某个字段（如无绿化费），或页面结构发生改变，记录异常并不中断程序
-            print(f"[数据提取] 字段解析异常: {field}，底层错误: {e}")
-            record[field] = "抓取异常"
-            record["状态"] = "部分字段异常"
+def parse_detail_html(raw_html, code):
+    """
+    [V2.4.0 新增] 详情页离线解析模块 (运行于后台解析线程)
+    功能：从详情页 HTML 快照中解析表单，规则与 extract_detail_data 完全一致。任何异常均转为字段异常标记，绝不向外抛出。
+    """
+    record = get_empty_record(code, "完成")
+    try:
+        pairs = erp_page_reader.label_pairs_from_html(erp_page_reader.parse_html(raw_html))
+    except Exception as e:
+        return mark_detail_failure(record, e)
 
-    return record
+    return fill_detail_record(record, erp_page_reader.map_fields(pairs, detail_fields()))
 
 
-def search_and_process_single(page, search_tab, code):
+def submit_search(search_tab, code, cancel_event=None):
     """
-    单一项目检索与状态判定模块
-    功能：处理目标查询页面的残留状态，输入目标编号发起检索，并根据检索结果的数量
-    进行条件分支处理（未发包/工程维度发包、待确认、精确命中）。
+    单一项目检索阶段 (可被对冲)
+    功能：处理目标查询页面的残留状态，输入目标编号发起检索，返回所有匹配的记录节点。
+    本函数不涉及详情页操作，可被检索标签页池在主/备两个标签页上同时执行。
     """
-    try:
-        # ==========================================
-        # 阶段 1：页面状态重置 (残留标签清理)
-        # ==========================================
-        # 逻辑：系统执行搜索后，输入框会被隐藏，取而代之的是“主题: Dxxx”的展示标签。
-        # 必须定位并清除该标签，才能恢复搜索输入框进行下一次查询。
-        old_tag = search_tab.ele('text:主题:', timeout=2)
+    erp_list_search.submit_subject_search(search_tab, code, box_timeout=10, tag_timeout=2, tag_settle=2,
+                                          settle=4, cancel_event=cancel_event)
+
+    # 利用项目编号附带的短横杠（如 D123-）作为业务唯一标识，获取所有匹配的记录节点。
+    return search_tab.eles(f'text:{code}-')
+
 
-        if old_tag:
-            print("[检索准备] 检测到历史查询残留标签，正在执行清除操作...")
+def fetch_detail(search_pool, row, code):
+    """
+    详情页获取与提取模块
+    返回：提取完成的记录，或后台解析任务 (离线解析 / HTTP 直取模式)。
+    """
+    if erp_http.enabled():
+        # [V2.4.0 新增] HTTP 直取模式：读取单据链接后投递后台下载与离线解析，浏览器立即转入下一个编号
+        detail_url = erp_list_search.row_link(row)
+        if detail_url:
+            return erp_http.submit_fetch(
+                detail_url, parse_detail_html, code,
+                on_error=lambda e: mark_detail_failure(get_empty_record(code, "完成"), e))
+
+    # [V2.4.0 优化] 读取该记录的单据链接，在常驻详情标签页中原地导航，取代“点击 -> 等待 1 秒 -> latest_tab -> 关闭”
+    # (行内找不到链接时由标签页池退回点击打开的方式，并在用后关闭)
+    with search_pool.open_detail(row) as detail_tab:
+        if config.OFFLINE_PARSE:
+            # [V2.4.0 新增] 离线解析模式：只抓取一次整页快照，解析移交后台线程，标签页随即转入下一条单据
             try:
-                # 优先逻辑：通过 parent() 向上一层寻找包裹标签的父容器，再寻找包含 cancel 样式的关闭按钮
-                old_tag.parent().ele('@class=cancel').click()
-            except:
-                # 备用逻辑：若父容器结构变化，直接尝试点击标签文本旁边的下一个相邻节点
-                old_tag.next().click()
+                raw_html = erp_page_reader.snapshot_html(detail_tab, 'td.td_normal_title')
+            except Exception as e:
+                return mark_detail_failure(get_empty_record(code, "完成"), e)
+            return erp_page_reader.submit_parse(parse_detail_html, raw_html, code)
 
-            # 标签被清除后，页面会触发局部重绘显示输入框，需强制挂起等待 2 秒
-            search_tab.wait(2)
+        return extract_detail_data(detail_tab, code)
 
-        # ==========================================
-        # 阶段 2：输入框定位与检索触发
-        # ==========================================
-        # 优先使用 Landray 框架底层静态属性 data-lui-placeholder 定位，避免受页面状态影响
-        search_box = search_tab.ele('@data-lui-placeholder=请输入主题', timeout=10)
 
-        # 若底层属性失效，降级使用常规的 placeholder 属性进行定位
-        if not search_box:
-            search_box = search_tab.ele('@placeholder=请输入主题', timeout=10)
+def search_and_process_single(page, search_pool, code, answers=None, cancel_event=None):
+    """
+    单一项目检索与状态判定模块
+    功能：通过检索标签页池发起检索，并根据检索结果的数量
+    进行条件分支处理（未发包/工程维度发包、待确认、精确命中）。
+    [V2.4.0] answers 为前缀批量检索的结果 {编号: [列表行, ...]}，已回答的编号不再检索；
+    cancel_event 为看门狗的取消信号，任务被放弃后不再操作浏览器。
+    """
+    # [V2.4.0 新增] 空结果缓存：有效期内已确认未发包的编号直接本地作答，不再检索
+    known_empty = erp_cache.get_negative(NEGATIVE_NAMESPACE, code)
+    if known_empty is not None:
+        print(f"[空结果缓存] 编号 [{code}] 近期已确认无记录，直接标记：{known_empty}。")
+        return get_empty_record(code, known_empty)
 
-        # 清除输入框内可能存在的数据，填入新编号，并追加换行符 \n 模拟物理回车操作，触发搜索
-        search_box.clear().input(f'{code}\n')
+    try:
+        # ==========================================
+        # 阶段 1 & 2：残留标签清理 + 检索触发 (对冲模式下可能由备用标签页胜出)
+        # ==========================================
+        results = None
+        if erp_list_mirror.ready(search_pool.nav_module.STATE_KEY):
+            # [V2.4.0 新增] 列表镜像已同步：命中时由本地索引直接给出检索结果，浏览器只负责打开详情
+            results = erp_list_mirror.lookup(search_pool.nav_module.STATE_KEY, f"{code}-") or None
+            if results:
+                print(f"[本地索引] 编号 [{code}] 在列表镜像中匹配到 {len(results)} 条记录。")
+            else:
+                # 镜像可能漏掉近期才结束的旧单据：未命中不能据此判定为未发包，改为界面检索确认
+                print(f"[本地索引] 编号 [{code}] 在列表镜像中未匹配，转界面检索确认...")
+        elif answers and code in answers:
+            # [V2.4.0 新增] 已由前缀批量检索回答：匹配规则与界面检索一致 (主题中包含“编号-”)
+            results = [row for row in answers[code] if f"{code}-" in row.subject]
+            print(f"[批量检索] 编号 [{code}] 在前缀检索结果中匹配到 {len(results)} 条记录。")
 
-        print(f"[数据检索] 检索指令已发送，当前处理编号：[{code}]，等待服务器响应...")
-        search_tab.wait(4)
+        if results is None:
+            print(f"[数据检索] 检索指令已发送，当前处理编号：[{code}]，等待服务器响应...")
+            search_tab, results = search_pool.search('f1_search', submit_search, code, cancel_event=cancel_event)
 
         # ==========================================
         # 阶段 3：检索结果校验与分流
         # ==========================================
-        # 利用项目编号附带的短横杠（如 D123-）作为业务唯一标识，获取所有匹配的记录节点。
-        results = search_tab.eles(f'text:{code}-')
         result_count = len(results)
 
         if result_count == 0:
             print("[业务判定] 数据库未返回匹配记录，状态标记：未发包/工程维度发包。")
+            erp_cache.put_negative(NEGATIVE_NAMESPACE, code, "未发包/工程维度发包")
             return get_empty_record(code, "未发包/工程维度发包")
 
-        elif result_count > 1:
+        # 已检索到记录，清除可能残留的空结果记录
+        erp_cache.drop_negative(NEGATIVE_NAMESPACE, code)
+
+        if result_count > 1:
             print(f"[业务判定] 检测到 {result_count} 条同名记录，为避免数据混淆，状态标记：待确认。")
             return get_empty_record(code, "待确认")
 
         else:
-            print("[业务判定] 精确命中单一业务记录，准备深入抓取明细...")
-            # 触发唯一记录的点击事件，打开详情页
-            results[0].click()
+            if not detail_fields():
+                # [V2.4.0 新增] 列投影不含任何详情字段：命中判定即为全部所需结果，不再打开详情页
+                print("[业务判定] 精确命中单一业务记录 (列投影不含详情字段，跳过详情页)。")
+                return get_empty_record(code, "完成")
 
-            # 给底层系统留出响应打开新标签页的微小时间差
-            page.wait(1)
+            print("[业务判定] 精确命中单一业务记录，准备深入抓取明细...")
 
-            # 获取最新弹出的详情页句柄
-            detail_tab = page.latest_tab
+            # [V2.4.0 新增] 单据内容缓存：已结束单据的内容不会再变化，命中时直接复用，跳过详情页
+            doc_key = erp_list_search.document_key(results[0])
+            cached = erp_cache.get_content(CACHE_NAMESPACE, CACHE_SCHEMA, doc_key)
+            if cached is not None:
+                print(f"[内容缓存] 单据 [{doc_key}] 已提取过，直接复用缓存内容，跳过详情页。")
+                return project_cached(cached, code)
 
-            # [V2.0.0 健壮性增强] 引入 try...finally 确保即使提取报错也能强制销毁标签页，防止内存溢出
-            try:
-                final_record = extract_detail_data(detail_tab, code)
-                return final_record
-            finally:
-                print(f"[资源回收] 正在关闭编号 [{code}] 的详情层对象。")
-                detail_tab.close()
+            # 只缓存完整无异常的提取结果 (列投影运行只提取了部分字段，不写入缓存)
+            complete = len(detail_fields()) == len(DETAIL_FIELDS)
+            erp_list_search.check_cancelled(cancel_event)
+            return erp_cache.put_content_when_ready(CACHE_NAMESPACE, CACHE_SCHEMA, doc_key,
+                                                    fetch_detail(search_pool, results[0], code),
+                                                    accept=lambda record: complete and record["状态"] == "完成")
 
     except Exception as e:
         # 捕获检索及 DOM 交互过程中引发的系统级异常（如断网、页面彻底卡死无响应）
         print(f"[系统警报] 处理编号 [{code}] 时发生页面崩溃或响应超时，错误信息：{e}")
-        # 向上级总控模块抛出自定义异常，请求介入处理
-        raise Exception("SearchTimeout")
+        # 向上级总控模块抛出自定义异常，请求介入处理 (保留原始异常链，供分级自愈策略判定故障类型)
+        raise Exception("SearchTimeout") from e
 
 
-def run_data_cycle(page, search_tab, codes_list, output_file):
+def run_data_cycle(page, search_pool, codes_list, output_file, previous=None):
     """
     批量数据检索主控循环模块
     功能：遍历待处理的编号列表，调用单次查询逻辑。包含应对页面级卡顿的自愈重启策略。
+    [V2.4.0] previous 为增量刷新的底稿 {编号: 上次输出的行}，终态编号直接沿用上次结果，不再检索。
     """
     total = len(codes_list)
     all_results = []
+    policy = erp_recovery.for_search_pool(search_pool)
+    previous = previous or {}
+    pending = [code for code in codes_list if not is_final(previous.get(code))]
+
+    # [V2.4.0 新增] 列表镜像：接口可用时先增量同步本地索引，此后检索改为本地查询
+    erp_list_mirror.prepare(search_pool, pending, submit_search)
+    # [V2.4.0 新增] 镜像不可用时，密集成段的编号按共享前缀批量检索
+    answers = erp_list_mirror.resolve_batches(search_pool, pending, submit_search)
 
     # 利用 enumerate 生成带序号的迭代，提供任务进度监控
     for index, code in enumerate(codes_list, start=1):
         print(f"\n[任务进度 {index}/{total}] 开始分配任务，当前执行编号: {code}")
 
-        # 设定单次任务的最大容错重试次数
-        max_retries = 2
-
-        for attempt in range(1, max_retries + 1):
-            try:
-                # 尝试执行单一查询处理链
-                record = search_and_process_single(page, search_tab, code)
-                all_results.append(record)
+        if is_final(previous.get(code)):
+            # [V2.4.0 新增] 增量刷新：上次结果已是终态，原样沿用
+            print(f"[增量刷新] 编号 [{code}] 上次结果已是终态，直接沿用。")
+            all_results.append(dict(previous[code]))
+            continue
 
+        try:
+            # 尝试执行单一查询处理链 (由看门狗强制执行墙钟截止时间)
+            # [V2.4.0] 失败时交由分级自愈策略，按故障类型与各级实测代价选择起点逐级恢复并重试
+            record = policy.run(lambda: erp_watchdog.run_with_deadline(
+                search_pool.page, search_and_process_single, (search_pool.page, search_pool, code, answers),
+                suspect_tabs=search_pool.suspect_tabs,
+                protected_tabs=search_pool.protected_tab_ids, cancellable=True), label=f"编号 [{code}]")
+            all_results.append(record)
+
+            if erp_page_reader.is_pending(record):
+                print(f"[任务完成] 编号 [{code}] 的详情页解析已移交后台线程。")
+            else:
                 print(f"[任务完成] 成功构建数据映射: {record}")
-                break  # 当前编号处理成功，跳出重试循环，执行下一个编号
 
-            except Exception as e:
-                # 接收来自下层 search_and_process_single 抛出的异常
-                print(f"[自愈干预] 第 {attempt} 次处理失败，正在启动浏览器环境重置程序...")
-
-                if attempt < max_retries:
-                    # 调用页面初始化模块的重置功能，清理多余标签并刷新首页
-                    erp_construction_bidding.reset_and_back_to_home(page)
-                    # 重新执行从首页导航至查询页面、重置筛选条件的初始化操作
-                    search_tab = erp_construction_bidding.setup_search_environment(page)
-                    print(f"[自愈干预] 浏览器状态已重置，准备对编号 [{code}] 重新发起请求...")
-                else:
-                    # 超过最大重试次数，判定该数据异常或网络中断严重
-                    print(f"[业务放弃] 编号 [{code}] 导致程序反复超时，已跳过该节点。")
-                    # 保留业务日志，记录错误状态，确保总体进度不受单一数据影响
-                    all_results.append(get_empty_record(code, "网页连续卡死失败"))
+        except Exception as e:
+            # 自愈步数耗尽，判定该数据异常或网络中断严重
+            print(f"[业务放弃] 编号 [{code}] 导致程序反复超时，已跳过该节点。")
+            # 保留业务日志，记录错误状态，确保总体进度不受单一数据影响
+            all_results.append(get_empty_record(code, "网页连续卡死失败"))
 
         # ======================================================================
         # 【V2.0.0 新增：极致护航级实时自动存档机制】
-        # 垂直水平对齐说明：本行代码与上面的 for attempt 循环对齐。
-        # 逻辑：每当一个编号经过 1~2 次重试处理完毕（无论结果是成功还是失败标记），
+        # 垂直水平对齐说明：本行代码与上面的 try 容错块对齐。
+        # 逻辑：每当一个编号经过重试与自愈处理完毕（无论结果是成功还是失败标记），
         # 立即将当前内存中已搜集的 all_results 序列化并覆盖写入硬盘。
         # 作用：确保即便程序在下一秒崩溃，之前的所有劳动成果都已安全落盘，绝不白跑。
         # ======================================================================
-        print(f"[自动存档] 正在执行结算进度同步，当前已安全保存 {len(all_results)} 条业务记录...")
+        # [V2.4.0] 离线解析模式下，只落盘从头开始连续已解析完毕的记录，保证表格行序与任务顺序一致
+        settled = erp_page_reader.settle_results(all_results)
+        print(f"[自动存档] 正在执行结算进度同步，当前已安全保存 {len(settled)} 条业务记录...")
+        # [V2.4.0] 输出表即增量刷新的底稿：尚未处理编号的上次结果随存档保留
+        data_excel.save_data_to_excel(erp_refresh.with_baseline(settled, codes_list, previous), output_file)
+
+    # 等待后台解析全部完成，执行最终存档
+    if any(erp_page_reader.is_pending(item) for item in all_results):
+        print("[自动存档] 正在等待后台解析线程收尾...")
+        all_results = erp_page_reader.settle_results(all_results, wait_all=True)
         data_excel.save_data_to_excel(all_results, output_file)
 
+    erp_recovery.summary()
     return all_results
 
 
@@ -233,7 +339,9 @@ if __name__ == '__main__':
 
     # 接管当前处于激活状态的浏览器进程
     page = ChromiumPage()
-    current_search_tab = page
+    # 将当前页面直接登记为主检索标签页，跳过导航
+    current_search_pool = erp_search_pool.SearchTabPool(page, erp_construction_bidding)
+    current_search_pool.active = page
 
     # 定义包含各类边界情况的测试用例列表
     test_codes = [
@@ -243,7 +351,7 @@ if __name__ == '__main__':
     ]
 
     # 执行批处理流程
-    final_data = run_data_cycle(page, current_search_tab, test_codes)
+    final_data = run_data_cycle(page, current_search_pool, test_codes)
 
     print("\n[调试结束] 最终合并的结构化数据列表如下：")
     for data in final_data:
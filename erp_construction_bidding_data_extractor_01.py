@@ -16,16 +16,26 @@ ValkyrieEngine 工程维度中标查询-数据提取模块 (V2.2.6 完美对齐
 3. 【版本不统一】：历史数据（老版本）和新数据（新版本）字段不一致，需动态识别。
 
 【核心特性】
-- 🛡️ 智能熔断：利用 `known_count`（工程数）精准控制搜索次数，绝不浪费一次 HTTP 请求。
-- 🕵️ 深度挖掘：内置 `get_deep_text` 穿透器，无视前端嵌套层级。
+- 🛡️ 智能熔断：利用 `known_count`（工程数）精准控制详情页打开次数，绝不浪费一次 HTTP 请求。
+- 🔎 单次检索：[V2.4.0] 每个项目只按根编号检索一次，从同一结果列表中定位全部工程单据。
+- 🕵️ 深度挖掘：span.val / xformflag / 文本三级穿透，无视前端嵌套层级；[V2.4.0] 表头与候选值一次读出，版本判定与别名匹配在本地完成。
 - 🚑 异常熔断：子工程任何一个报错，总状态立即标记为“需复核”，实现一票否决。
 - 💾 实时落地：每处理完一条，立即存入 Excel，确保数据资产零风险。
 - 📟 实时监控：终端全字段、高精度透视输出，所见即所得。
 """
 
 import time
-import erp_construction_bidding_01  # 导入环境导航模块，用于“回城卷轴”自愈
+import config
 import data_excel  # 导入数据 I/O 模块，用于“实时存档”
+import erp_list_search  # [V2.4.0 新增] 通用列表检索原子库
+import erp_watchdog  # [V2.4.0 新增] 单任务看门狗
+import erp_recovery  # [V2.4.0 新增] 分级自愈策略
+import erp_page_reader  # [V2.4.0 新增] 页面批量读取与离线解析
+import erp_fundamental  # [V2.4.0 新增] 工程数无法由检索结果推导时，回退至工作台单查
+import erp_http  # [V2.4.0 新增] 详情页 HTTP 直取通道
+import erp_cache  # [V2.4.0 新增] 单据内容缓存
+import erp_list_mirror  # [V2.4.0 新增] 业务列表本地镜像
+import erp_refresh  # [V2.4.0 新增] 增量刷新的工程数核对
 
 # =========================================================
 # 🛠️ 基础工具区：数值清洗与字典初始化
@@ -59,105 +69,154 @@ def get_mega_record_template(code, known_count):
     现在：编号 -> 名称 -> 各类金额 -> 总状态 -> 工程数 -> 子工程...
     目的：与功能1的表头对齐，方便合并。
     """
-    record = {
-        # --- [父级] 项目维度汇总信息 ---
-        "项目编号": code,
-        "项目名称": "",      # 将从任一子工程中回填
-        "项目工程总造价(元)": 0.0,
-        "市政道路修复费": 0.0,
-        "小区道路修复费": 0.0,
-        "绿化修复费": 0.0,
-        "发包金额": 0.0,
-        "打捆招标名称": "",
-        "项目中标金额": 0.0,
-
-        # [V2.2.6] 移动到父级末尾，方便 Excel 对齐
-        "总状态": "初始化",
-        "工程数": known_count,
-    }
+    # [V2.4.0] 只生成列投影选中的字段 (selected_fields)，输出列随之收窄
+    fields = selected_fields()
+    record = {"项目编号": code}
+
+    # --- [父级] 项目维度汇总信息 ---
+    for parent_key, source, default in PARENT_COLUMNS:
+        if source in fields:
+            record[parent_key] = default
+
+    # [V2.2.6] 移动到父级末尾，方便 Excel 对齐
+    record["总状态"] = "初始化"
+    record["工程数"] = known_count
 
     # --- [子级] 工程维度详情 (儿子 _01 到 _05) ---
     for i in range(1, 6):
         suffix = f"_{i:02d}"  # 生成 _01, _02 ...
-        record[f"工程名称{suffix}"] = ""
-        record[f"工程造价(元){suffix}"] = 0.0
-        record[f"市政道路修复费{suffix}"] = 0.0
-        record[f"小区道路修复费{suffix}"] = 0.0
-        record[f"绿化修复费{suffix}"] = 0.0
-        record[f"发包金额{suffix}"] = 0.0
-        record[f"打捆招标名称{suffix}"] = ""
-        record[f"中标金额{suffix}"] = 0.0
+        for field in ENGINEERING_FIELDS:
+            if field in fields:
+                record[f"{field}{suffix}"] = "" if field in ("工程名称", "打捆招标名称") else 0.0
         record[f"状态{suffix}"] = "初始化"
 
     return record
 
 
+# [V2.4.0 新增] 工程级字段 (按输出列序)：列投影 F2_FIELDS 的可选字段，另可选“项目名称”
+ENGINEERING_FIELDS = [
+    "工程名称", "工程造价(元)", "市政道路修复费", "小区道路修复费",
+    "绿化修复费", "发包金额", "打捆招标名称", "中标金额"
+]
+
+# [V2.4.0 新增] 父级列：(列名, 来源字段, 默认值)。金额列为各工程对应字段之和，名称列取自任一工程
+PARENT_COLUMNS = [
+    ("项目名称", "项目名称", ""),
+    ("项目工程总造价(元)", "工程造价(元)", 0.0),
+    ("市政道路修复费", "市政道路修复费", 0.0),
+    ("小区道路修复费", "小区道路修复费", 0.0),
+    ("绿化修复费", "绿化修复费", 0.0),
+    ("发包金额", "发包金额", 0.0),
+    ("打捆招标名称", "打捆招标名称", ""),
+    ("项目中标金额", "中标金额", 0.0),
+]
+
+
+def selected_fields():
+    """
+    [V2.4.0 新增] 本次运行需要提取的字段 (列投影 F2_FIELDS，留空为全部字段)
+    """
+    return data_excel.select_fields(config.F2_FIELDS, ["项目名称"] + ENGINEERING_FIELDS, "F2_FIELDS",
+                                    fixed=("项目编号", "总状态", "工程数", "状态"))
+
+
+# [V2.4.0 新增] 增量刷新：工程单据已定位且内容可沿用的终态
+FINAL_SUFFIX_STATES = ("新版本工程维度发包", "老版本工程维度发包", "工程维度发包")
+
+
+def final_suffix(row, suffix):
+    """
+    [V2.4.0 新增] 增量刷新的工程级终态判定：已提取出中标金额的工程维度发包 (列投影不含中标金额时，定位到单据即可)，
+    或“无此工程”；未发包、提取异常与卡死失败的工程仍需重新查询
+    """
+    status = row.get(f"状态{suffix}", "")
+    if status == "无此工程":
+        return True
+    if status not in FINAL_SUFFIX_STATES:
+        return False
+    return f"中标金额{suffix}" not in row or parse_money(row[f"中标金额{suffix}"]) > 0
+
+
+def is_final(row, count):
+    """
+    [V2.4.0 新增] 增量刷新的项目级终态判定：总状态无异常、全部工程均为终态，
+    且记录的工程数与当前真实工程数 count 一致 (项目新增工程后，原先的“无此工程”不再成立) 时，整行沿用
+    """
+    if not row or "异常" in str(row.get("总状态", "")) or not erp_refresh.count_matches(row, count):
+        return False
+    return all(final_suffix(row, f"_{i:02d}") for i in range(1, 6))
+
+
+def carry_suffix(mega_record, row, suffix):
+    """
+    [V2.4.0 新增] 增量刷新：终态工程直接沿用上次输出的各列 (父级汇总随后照常由各工程重新计算)
+    """
+    for key in mega_record:
+        if key.endswith(suffix) and key in row:
+            mega_record[key] = row[key]
+
+
+def project_sub_data(sub_data, suffix):
+    """
+    [V2.4.0 新增] 内容缓存中存放的是完整提取结果，按列投影裁剪后回填
+    """
+    fields = selected_fields()
+    projected = {}
+    for key, value in sub_data.items():
+        if key == "_TEMP_PROJECT_NAME":
+            keep = "项目名称" in fields
+        else:
+            keep = key == f"状态{suffix}" or key[:-len(suffix)] in fields
+        if keep:
+            projected[key] = value
+    return projected
+
+
 # =========================================================
 # 🕵️ DOM 深度挖掘工具区 (核心黑科技)
 # =========================================================
 
-def get_deep_text(value_td):
+def version_fields(is_new_version):
     """
-    [核心工具] DOM 穿透提取器
-    -------------------------------------------------------
-    痛点：ERP 系统的前端代码极不规范，数据可能藏在 span.val, xformflag, input 等位置。
-    本函数像一个“钻地机”，层层向下嗅探，直到挖出数据。
+    [字段映射] 在版本字段映射表的基础上，追加“项目名称” (用于填充父级)
     """
-    try:
-        # 策略 A: 优先匹配 .val (工程造价特征)
-        val_span = value_td.ele('.val', timeout=0.1)
-        if val_span:
-            return val_span.text.strip()
-
-        # 策略 B: 匹配 xformflag (通用表单特征)
-        xform = value_td.ele('tag:xformflag', timeout=0.1)
-        if xform:
-            return xform.text.strip()
-
-        # 策略 C: 兜底逻辑，直接取 TD 的直属文本
-        return value_td.text.strip()
-    except:
-        return ""
+    status_text, fields_map = get_fields_map(is_new_version)
+    # [V2.4.0] 列投影未选中的字段不再探测与提取
+    fields = selected_fields()
+    fields_map = {field: aliases for field, aliases in fields_map.items() if field in fields}
+    if "项目名称" in fields:
+        fields_map["_TEMP_PROJECT_NAME"] = ["项目名称"]
+    return status_text, fields_map
 
 
-def extract_field_by_label(tab, label_keywords):
+def build_detail_result(entries, suffix):
     """
-    [核心工具] 模糊标签定位器 (Relative Positioning)
+    [核心工具] 按字段映射表提取详情数据
     -------------------------------------------------------
-    原理：模拟人类视觉逻辑——“先找到表头(Label)，再找它右边那个格子(Data)”。
+    原理：全部表头及其数据格的三种候选值已在一次往返中读出 (entries)，
+    版本判定 (是否存在“绿化修复费”表头)、别名匹配与穿透取值 (span.val / xformflag / 文本) 均在本地完成，不再产生浏览器探测。
     """
-    for label in label_keywords:
-        try:
-            # 1. 定位表头 Label (精确匹配文本)
-            label_ele = tab.ele(f'tag:label@@text():{label}', timeout=0.5)
-
-            if label_ele:
-                # 2. 相对定位：找父级 TD 的下一个兄弟 TD
-                data_td = label_ele.parent().next('tag:td', timeout=0.5)
-                if data_td:
-                    # 3. 调用穿透器提取数据
-                    return get_deep_text(data_td)
-        except:
-            continue
-    return ""
+    is_new_version = any("绿化修复费" in label for label, _ in entries)
+    status_text, fields_map = version_fields(is_new_version)
+
+    result = {f"状态{suffix}": status_text}
+    for inner_key, val in erp_page_reader.map_label_entries(entries, fields_map).items():
+        if inner_key == "_TEMP_PROJECT_NAME":
+            if val:
+                result["_TEMP_PROJECT_NAME"] = val
+        else:
+            result[f"{inner_key}{suffix}"] = val
+    return result
 
 
 # =========================================================
 # 📄 页面动作区：详情提取与版本判断
 # =========================================================
 
-def extract_detail_data(detail_tab, suffix):
+def get_fields_map(is_new_version):
     """
-    [业务逻辑] 单个详情页的数据提取与版本判定
+    [业务逻辑] 按详情页版本返回字段映射表与状态文本
     """
-    # 【重要】显式等待 2 秒，确保详情页 DOM 树完全渲染
-    detail_tab.wait(2)
-
-    result = {}
-
-    # 1. [版本判定锚点] 寻找“绿化修复费”
-    is_new_version = detail_tab.ele('tag:label@@text():绿化修复费', timeout=2)
-
     if is_new_version:
         status_text = "新版本工程维度发包"
         # 定义新版本字段映射表
@@ -180,118 +239,314 @@ def extract_detail_data(detail_tab, suffix):
             "打捆招标名称": ["打捆招标名称"],
             "中标金额": ["中标金额", "工程中标价", "工程中标价(元)"]
         }
+    return status_text, fields_map
 
-    result[f"状态{suffix}"] = status_text
 
-    # 2. [批量抓取] 遍历映射表
-    for inner_key, label_list in fields_map.items():
-        val = extract_field_by_label(detail_tab, label_list)
-        result[f"{inner_key}{suffix}"] = val
+# [V2.4.0 新增] 单据内容缓存的业务线标识与提取模式标签 (新老版本字段并集；解析规则变化时递增版本号，旧缓存自动作废)
+CACHE_NAMESPACE = "f2_detail"
+CACHE_SCHEMA = erp_cache.schema_tag(1, sorted(set(get_fields_map(True)[1]) | set(get_fields_map(False)[1])
+                                              | {"_TEMP_PROJECT_NAME"}))
+# [V2.4.0 新增] 空结果缓存的业务线标识 (以“项目编号_后缀”为键)
+NEGATIVE_NAMESPACE = "f2_suffix"
 
-    # 3. [特别提取] 项目名称 (用于填充父级)
-    project_name = extract_field_by_label(detail_tab, ["项目名称"])
-    if project_name:
-        result["_TEMP_PROJECT_NAME"] = project_name
 
-    return result
+def extract_detail_data(detail_tab, suffix):
+    """
+    [业务逻辑] 单个详情页的数据提取与版本判定
+    [V2.4.0 优化] 一次往返读取全部表头及候选值 (轮询等待表单就绪，取代固定的 2 秒等待)，再在本地按字段映射表提取
+    """
+    return build_detail_result(erp_page_reader.read_label_entries(detail_tab), suffix)
 
 
-def search_and_process_suffix(page, search_tab, code, i, mega_record):
+def parse_detail_html(raw_html, suffix):
     """
-    [流程控制] 单个后缀 (如 _02) 的搜索、点击、提取全流程
+    [V2.4.0 新增] 单个详情页的离线解析 (运行于后台解析线程)
+    与 extract_detail_data 的版本判定、字段映射与穿透提取规则完全一致，改为在 HTML 快照上用 lxml 完成。
+    任何异常均转为“提取异常”状态，绝不向外抛出。
     """
-    suffix = f"_{i:02d}"
-    full_code = f"{code}{suffix}"
+    try:
+        entries = erp_page_reader.label_entries_from_html(erp_page_reader.parse_html(raw_html))
+        return build_detail_result(entries, suffix)
 
-    # 1. [UI 清理] 清除输入框里的残留标签
-    old_tag = search_tab.ele('text:主题:', timeout=1)
-    if old_tag:
-        try:
-            old_tag.parent().ele('@class=cancel').click()
-        except:
-            old_tag.next().click()
-        search_tab.wait(1)
+    except Exception as e:
+        print(f"  -> [{suffix}] 数据提取异常: {e}")
+        return {f"状态{suffix}": "提取异常(需检查)"}
+
+
+def fetch_failure(suffix, error):
+    """
+    [V2.4.0 新增] HTTP 直取下载失败：与详情提取异常同样处理
+    """
+    print(f"  -> [{suffix}] 数据提取异常: {error}")
+    return {f"状态{suffix}": "提取异常(需检查)"}
 
-    # 2. [输入检索]
-    search_box = search_tab.ele('@data-lui-placeholder=请输入主题', timeout=5)
-    if not search_box:
-        search_box = search_tab.ele('@placeholder=请输入主题', timeout=5)
 
-    search_box.clear().input(f'{full_code}\n')
-    search_tab.wait(4) # 等待列表刷新
+def submit_project_search(search_tab, code, cancel_event=None):
+    """
+    [流程控制] 项目级检索阶段 (可被对冲)
+    [V2.4.0 优化] 以项目根编号检索一次，列表即同时列出该项目全部“编号_NN-”工程单据，
+    取代逐后缀检索 (每个后缀都要清除标签、输入、等待 4 秒)，每个项目的检索次数由 N 次降为 1 次。
+    返回：{后缀序号: 列表节点}
+    """
+    # 1. [UI 清理] 清除输入框里的残留标签  2. [输入检索]
+    erp_list_search.submit_subject_search(search_tab, code, box_timeout=5, tag_timeout=1, tag_settle=1,
+                                          settle=4, cancel_event=cancel_event)
+
+    # 3. [结果判定] 按“编号_NN-”识别各工程单据，同一后缀只取页面中的第一条
+    rows = {}
+    for element in search_tab.eles(f'text:{code}_', timeout=2):
+        matched = erp_list_search.match_suffix(code, element.text)
+        if matched:
+            rows.setdefault(matched[0], element)
+    return rows
+
+
+def locate_project_rows(search_pool, code, batch=None, cancel_event=None, expected=None):
+    """
+    [流程控制] 项目级检索：发起一次项目级检索 (对冲模式下可能由备用标签页胜出)，返回 {后缀序号: 列表节点}
+    [V2.4.0] 该项目已由前缀批量检索回答 (batch) 时，由批量结果直接给出；
+    列表镜像只在列出全部 expected 个工程 (工程数未知时至少一个) 时直接作答：镜像可能漏掉近期才结束的旧单据，
+    镜像中缺少的工程不能据此判定为未发包，改为界面检索确认。
+    检索结果由调用方在成功返回后存入共享的 listing，本函数不修改调用方状态 (被看门狗放弃的线程不会污染重试)。
+    """
+    if erp_list_mirror.ready(search_pool.nav_module.STATE_KEY):
+        # [V2.4.0 新增] 列表镜像已同步：工程单据齐全时由本地索引直接给出项目级检索结果
+        rows = index_project_rows(code, erp_list_mirror.lookup(search_pool.nav_module.STATE_KEY, f"{code}_"))
+        if rows and all(i in rows for i in range(1, (expected or 0) + 1)):
+            return rows
+        print(f"  [本地索引] 项目 [{code}] 的工程单据在列表镜像中不齐全，转界面检索确认...")
+    elif batch is not None:
+        return index_project_rows(code, batch)
+    _search_tab, rows = search_pool.search('f2_project_search', submit_project_search, code,
+                                           cancel_event=cancel_event)
+    return rows
+
+
+def index_project_rows(code, index_rows):
+    """
+    [V2.4.0 新增] 本地结果版的项目级检索 (列表镜像 / 前缀批量检索)：识别规则与 submit_project_search 一致，同一后缀只取最早的一条
+    返回：{后缀序号: erp_list_search.IndexRow}
+    """
+    rows = {}
+    for row in index_rows:
+        matched = erp_list_search.match_suffix(code, row.subject)
+        if matched:
+            rows.setdefault(matched[0], row)
+    return rows
+
+
+def derive_engineering_count(search_pool, policy, code, listing):
+    """
+    [V2.4.0 新增] 工程数推导 (ENGINEERING_COUNT_SOURCE = search)
+    以项目级检索结果中出现的最大后缀作为工程数，检索结果随后由各后缀直接复用；
+    项目暂无任何单据 (或检索连续失败) 时，回退至工作台单查。
+    """
+    try:
+        rows = policy.run(lambda: erp_watchdog.run_with_deadline(
+            search_pool.page, locate_project_rows, (search_pool, code, listing["batch"]),
+            suspect_tabs=search_pool.suspect_tabs,
+            protected_tabs=search_pool.protected_tab_ids, cancellable=True), label=f"项目 [{code}]")
+    except Exception as e:
+        print(f"  [工程数推导] 项目级检索失败: {e}")
+        rows = None
+    listing["rows"] = rows
+
+    if rows:
+        print(f"  [工程数推导] 由检索结果推导工程数：{max(rows)}")
+        return max(rows)
+
+    print("  [工程数推导] 检索结果中没有任何单据，回退至工作台查询工程数...")
+    return erp_fundamental.get_engineering_count(search_pool.page, code, tab_guard=search_pool.creating_tab)
+
+
+def run_suffix(search_pool, policy, code, i, listing):
+    """
+    [流程控制] 单个后缀 (如 _02) 的一次受托管处理：由看门狗强制执行截止时间，失败时交由分级自愈策略重试
+    listing 为同一项目各后缀共享的检索结果 {"rows": {后缀序号: 列表节点}, "batch": 批量检索结果}：
+    首个后缀触发项目级检索，其余后缀直接复用。共享结果只在主线程中、任务成功返回后更新。
+    返回：单个后缀的提取结果或后台解析任务。
+    """
+    def attempt():
+        # 上一次尝试未正常结束 (抛出异常或被看门狗中止) 时，随后的自愈动作可能已重载列表，共享的列表节点一并作废
+        if listing.get("pending"):
+            listing["rows"] = None
+        listing["pending"] = True
+        rows, result = erp_watchdog.run_with_deadline(
+            search_pool.page, search_and_process_suffix,
+            (search_pool.page, search_pool, code, i, listing["rows"], listing["batch"], listing["count"]),
+            suspect_tabs=search_pool.suspect_tabs,
+            protected_tabs=search_pool.protected_tab_ids, cancellable=True)
+        listing["rows"] = rows
+        listing["pending"] = False
+        return result
+
+    return policy.run(attempt, label=f"工程 [{code}_{i:02d}]")
+
+
+def search_and_process_suffix(page, search_pool, code, i, rows, batch=None, expected=None, cancel_event=None):
+    """
+    [流程控制] 单个后缀 (如 _02) 的检索复用、点击、提取全流程 (运行于看门狗的工作线程)
+    rows 为本项目已有的项目级检索结果 (尚未检索时为 None)，expected 为本项目的工程数。
+    返回：(项目级检索结果, 单个后缀的提取结果或后台解析任务)，由调用方回填，本函数不修改调用方状态。
+    """
+    suffix = f"_{i:02d}"
+
+    # [V2.4.0 新增] 空结果缓存：有效期内已确认未发包的工程直接本地作答 (全部后缀均命中时整个项目无需检索)
+    known_empty = erp_cache.get_negative(NEGATIVE_NAMESPACE, f"{code}{suffix}")
+    if known_empty is not None:
+        print(f"  -> [{suffix}] 状态: {known_empty} (空结果缓存)")
+        return rows, {f"状态{suffix}": known_empty}
+
+    # 1~3. [检索] 对冲模式下可能由备用标签页胜出
+    if rows is None:
+        rows = locate_project_rows(search_pool, code, batch, cancel_event, expected)
+    return rows, process_suffix(search_pool, code, suffix, rows.get(i), cancel_event)
 
-    # 3. [结果判定] 唯一性校验
-    target_pattern = f"{full_code}-"
-    target_ele = search_tab.ele(f'text:{target_pattern}', timeout=2)
 
+def process_suffix(search_pool, code, suffix, target_ele, cancel_event=None):
     if not target_ele:
         # [实时监控] 打印未命中状态
         print(f"  -> [{suffix}] 状态: 未发包/项目维度发包")
-        mega_record[f"状态{suffix}"] = "未发包/项目维度发包"
+        erp_cache.put_negative(NEGATIVE_NAMESPACE, f"{code}{suffix}", "未发包/项目维度发包")
+        return {f"状态{suffix}": "未发包/项目维度发包"}
+
+    erp_cache.drop_negative(NEGATIVE_NAMESPACE, f"{code}{suffix}")
+
+    if not selected_fields():
+        # [V2.4.0 新增] 列投影不含任何详情字段：列表中存在该工程单据即为全部所需结果，不再打开详情页
+        print(f"  -> [{suffix}] 状态: 工程维度发包 (列投影不含详情字段，跳过详情页)")
+        return {f"状态{suffix}": "工程维度发包"}
+
+    # [V2.4.0 新增] 单据内容缓存：已结束单据的内容不会再变化，命中时直接回填，跳过详情页
+    doc_key = erp_list_search.document_key(target_ele)
+    cached = erp_cache.get_content(CACHE_NAMESPACE, CACHE_SCHEMA, doc_key)
+    if cached is not None:
+        print(f"  -> [{suffix}] [内容缓存] 单据 [{doc_key}] 已提取过，直接复用缓存内容。")
+        return project_sub_data(cached, suffix)
+
+    # 只缓存完整无异常的提取结果 (列投影运行只提取了部分字段，不写入缓存)
+    complete = len(selected_fields()) == len(ENGINEERING_FIELDS) + 1
+    erp_list_search.check_cancelled(cancel_event)
+    return erp_cache.put_content_when_ready(
+        CACHE_NAMESPACE, CACHE_SCHEMA, doc_key, fetch_detail(search_pool, target_ele, suffix),
+        accept=lambda data: complete and "提取异常" not in data.get(f"状态{suffix}", ""))
+
+
+def fetch_detail(search_pool, target_ele, suffix):
+    """
+    [V2.4.0 新增] 详情页获取与提取
+    返回：单个后缀的提取结果，或后台解析任务 (离线解析 / HTTP 直取模式)；提取异常统一转为“提取异常”状态。
+    """
+    if erp_http.enabled():
+        # [V2.4.0 新增] HTTP 直取模式：读取单据链接后投递后台下载与离线解析，不占用浏览器
+        detail_url = erp_list_search.row_link(target_ele)
+        if detail_url:
+            return erp_http.submit_fetch(detail_url, parse_detail_html, suffix,
+                                         on_error=lambda e: fetch_failure(suffix, e))
+
+    # 4. [进入详情] [V2.4.0 优化] 读取该单据的链接，在常驻详情标签页中原地导航，不再逐条新建/关闭标签页
+    with search_pool.open_detail(target_ele) as detail_tab:
+        try:
+            if config.OFFLINE_PARSE:
+                # [V2.4.0 新增] 离线解析模式：只抓取一次整页快照，解析移交后台线程，标签页随即转入下一条单据
+                raw_html = erp_page_reader.snapshot_html(detail_tab, 'label')
+                return erp_page_reader.submit_parse(parse_detail_html, raw_html, suffix)
+
+            # 5. [提取数据]
+            return extract_detail_data(detail_tab, suffix)
+
+        except Exception as e:
+            return fetch_failure(suffix, e)
+
+
+def merge_sub_data(mega_record, suffix, sub_data):
+    """
+    [流程控制] 单个后缀的数据回填与实时全字段监控
+    """
+    # 6. [数据回填]
+    for k, v in sub_data.items():
+        if k == "_TEMP_PROJECT_NAME":
+            if not mega_record.get("项目名称"):
+                mega_record["项目名称"] = v
+        else:
+            mega_record[k] = v
+
+    # 只有打开过详情的工程需要全字段监控 (未发包、空结果缓存与提取异常已在判定时打印)
+    if "版本工程维度发包" not in mega_record.get(f"状态{suffix}", ""):
         return
 
-    # 4. [进入详情]
-    target_ele.click()
-    detail_tab = page.latest_tab
+    # 7. [实时全字段监控] (精度控制)
+    c_status = mega_record.get(f"状态{suffix}", "N/A")
+    c_name = mega_record.get(f"工程名称{suffix}", "")
+    c_bundle = mega_record.get(f"打捆招标名称{suffix}", "")
 
-    try:
-        # 5. [提取数据]
-        sub_data = extract_detail_data(detail_tab, suffix)
-
-        # 6. [数据回填]
-        for k, v in sub_data.items():
-            if k == "_TEMP_PROJECT_NAME":
-                if not mega_record["项目名称"]:
-                    mega_record["项目名称"] = v
-            else:
-                mega_record[k] = v
-
-        # 7. [实时全字段监控] (精度控制)
-        c_status = mega_record.get(f"状态{suffix}", "N/A")
-        c_name = mega_record.get(f"工程名称{suffix}", "")
-        c_bundle = mega_record.get(f"打捆招标名称{suffix}", "")
-
-        # 金额类：取出并清洗，以便打印时格式化
-        c_bid = parse_money(mega_record.get(f"中标金额{suffix}", 0))
-        c_cost = parse_money(mega_record.get(f"工程造价(元){suffix}", 0))
-        c_muni = parse_money(mega_record.get(f"市政道路修复费{suffix}", 0))
-        c_comm = parse_money(mega_record.get(f"小区道路修复费{suffix}", 0))
-        c_green = parse_money(mega_record.get(f"绿化修复费{suffix}", 0))
-        c_contract = parse_money(mega_record.get(f"发包金额{suffix}", 0))
-
-        print(f"  -> [{suffix}] 提取成功 | 状态: {c_status}")
-        print(f"      工程名称: {c_name}")
-        print(f"      标段名称: {c_bundle}")
-        print(f"      中标金额: {c_bid:.2f} | 工程造价: {c_cost:.2f}")
-        print(f"      市政修复: {c_muni:.2f} | 小区修复: {c_comm:.2f}")
-        print(f"      绿化修复: {c_green:.2f} | 发包金额: {c_contract:.2f}")
+    # 金额类：取出并清洗，以便打印时格式化
+    c_bid = parse_money(mega_record.get(f"中标金额{suffix}", 0))
+    c_cost = parse_money(mega_record.get(f"工程造价(元){suffix}", 0))
+    c_muni = parse_money(mega_record.get(f"市政道路修复费{suffix}", 0))
+    c_comm = parse_money(mega_record.get(f"小区道路修复费{suffix}", 0))
+    c_green = parse_money(mega_record.get(f"绿化修复费{suffix}", 0))
+    c_contract = parse_money(mega_record.get(f"发包金额{suffix}", 0))
 
-    except Exception as e:
-        print(f"  -> [{suffix}] 数据提取异常: {e}")
-        mega_record[f"状态{suffix}"] = "提取异常(需检查)"
-    finally:
-        detail_tab.close()
+    print(f"  -> [{suffix}] 提取成功 | 状态: {c_status}")
+    print(f"      工程名称: {c_name}")
+    print(f"      标段名称: {c_bundle}")
+    print(f"      中标金额: {c_bid:.2f} | 工程造价: {c_cost:.2f}")
+    print(f"      市政修复: {c_muni:.2f} | 小区修复: {c_comm:.2f}")
+    print(f"      绿化修复: {c_green:.2f} | 发包金额: {c_contract:.2f}")
 
 
 # =========================================================
 # 🚀 主控循环区
 # =========================================================
 
-def run_data_cycle(page, search_tab, enriched_data, output_file):
+def run_data_cycle(page, search_pool, enriched_data, output_file, previous=None):
     """
     [总控制器] 批量数据检索主循环
+    [V2.4.0] previous 为增量刷新的底稿 {编号: 上次输出的行}：终态项目整行沿用，其余项目中已是终态的工程后缀不再检索。
     """
     total = len(enriched_data)
     all_results = []
+    policy = erp_recovery.for_search_pool(search_pool)
+    previous = previous or {}
+    codes = [item.get("项目编号") for item in enriched_data]
+    pending = [item.get("项目编号") for item in enriched_data
+               if not is_final(previous.get(item.get("项目编号")), item.get("工程数"))]
+
+    # [V2.4.0 新增] 列表镜像：接口可用时先增量同步本地索引，此后项目级检索改为本地查询
+    erp_list_mirror.prepare(search_pool, pending,
+                            lambda tab, code, cancel_event=None: list(submit_project_search(tab, code, cancel_event).values()))
+    # [V2.4.0 新增] 镜像不可用时，密集成段的编号按共享前缀批量检索
+    answers = erp_list_mirror.resolve_batches(search_pool, pending,
+                                              lambda tab, code, cancel_event=None: list(submit_project_search(tab, code, cancel_event).values()))
 
     for index, item in enumerate(enriched_data, start=1):
         code = item.get("项目编号")
         known_count = item.get("工程数", 3)
+        last = previous.get(code)
 
-        print(f"\n[任务进度 {index}/{total}] 处理项目: {code} (已知工程数: {known_count})")
+        if is_final(last, known_count):
+            # [V2.4.0 新增] 增量刷新：全部工程均为终态且工程数未变，整行沿用上次结果
+            print(f"\n[任务进度 {index}/{total}] 项目 {code} 上次结果已是终态，直接沿用。")
+            all_results.append(dict(last))
+            continue
+
+        # [V2.4.0] 项目级检索结果，各后缀共享
+        listing = {"rows": None, "batch": answers.get(code), "count": None}
+
+        if known_count is None:
+            # [V2.4.0] 工程数由本业务线的项目级检索结果推导 (ENGINEERING_COUNT_SOURCE = search)
+            print(f"\n[任务进度 {index}/{total}] 处理项目: {code} (工程数由检索结果推导)")
+            known_count = derive_engineering_count(search_pool, policy, code, listing)
+        else:
+            print(f"\n[任务进度 {index}/{total}] 处理项目: {code} (已知工程数: {known_count})")
+        listing["count"] = known_count
 
         mega_record = get_mega_record_template(code, known_count)
 
+        # [V2.4.0] 离线解析模式下，各后缀的表单解析在后台线程进行，汇总前按后缀顺序统一回填
+        pending_parses = []
+
         # --- 内部循环：处理 _01 到 _05 ---
         for i in range(1, 6):
             suffix = f"_{i:02d}"
@@ -301,17 +556,28 @@ def run_data_cycle(page, search_tab, enriched_data, output_file):
                 mega_record[f"状态{suffix}"] = "无此工程"
                 continue
 
+            if last and final_suffix(last, suffix) and last.get(f"状态{suffix}") != "无此工程":
+                # [V2.4.0 新增] 增量刷新：该工程上次已是终态，沿用上次结果，不再检索与打开详情
+                print(f"  -> [{suffix}] 状态: {last[f'状态{suffix}']} (沿用上次结果)")
+                carry_suffix(mega_record, last, suffix)
+                continue
+
             # 【逻辑分支 2】搜索与提取
+            # [V2.4.0] 失败时交由分级自愈策略，按故障类型与各级实测代价选择起点逐级恢复并重试；
+            # 提取结果只在成功返回后回填，被看门狗放弃的工作线程无法改写本记录
             try:
-                search_and_process_suffix(page, search_tab, code, i, mega_record)
+                parsing = run_suffix(search_pool, policy, code, i, listing)
+                if erp_page_reader.is_pending(parsing):
+                    pending_parses.append((suffix, parsing))
+                else:
+                    merge_sub_data(mega_record, suffix, parsing)
             except Exception as e:
-                # 【严重异常处理】
+                # 【严重异常处理】自愈步数耗尽
                 print(f"  -> [{suffix}] 严重错误 (页面卡死): {e}")
                 mega_record[f"状态{suffix}"] = "网页卡死失败"
 
-                print("  [自愈程序] 正在执行环境重置...")
-                erp_construction_bidding_01.reset_and_back_to_home(page)
-                search_tab = erp_construction_bidding_01.setup_search_environment(page)
+        for suffix, parsing in pending_parses:
+            merge_sub_data(mega_record, suffix, parsing.result())
 
         # --- 循环结束：执行汇总与总状态判定 ---
         print(f"  [数据汇总] 正在聚合数据并判定总状态...")
@@ -330,7 +596,7 @@ def run_data_cycle(page, search_tab, enriched_data, output_file):
             else:
                 mega_record["总状态"] = mega_record.get("状态_01", "未知")
 
-            # 2. 金额汇总
+            # 2. 金额汇总 ([V2.4.0] 只汇总列投影选中的金额列)
             sum_mapping = [
                 ("项目工程总造价(元)", "工程造价(元)"),
                 ("市政道路修复费", "市政道路修复费"),
@@ -341,6 +607,8 @@ def run_data_cycle(page, search_tab, enriched_data, output_file):
             ]
 
             for parent_key, child_prefix in sum_mapping:
+                if parent_key not in mega_record:
+                    continue
                 total_val = 0.0
                 for i in range(1, 6):
                     child_key = f"{child_prefix}_{i:02d}"
@@ -355,7 +623,10 @@ def run_data_cycle(page, search_tab, enriched_data, output_file):
                     mega_record["打捆招标名称"] = val
                     break
 
-            if not mega_record["项目名称"]:
+            if "项目名称" in mega_record and not mega_record["项目名称"] and last:
+                # [V2.4.0 新增] 增量刷新：名称来源工程沿用了上次结果时，项目名称一并沿用
+                mega_record["项目名称"] = last.get("项目名称", "")
+            if "项目名称" in mega_record and not mega_record["项目名称"]:
                 mega_record["项目名称"] = "名称提取失败或未发包"
 
             # [实时全字段监控] (父级)
@@ -363,14 +634,14 @@ def run_data_cycle(page, search_tab, enriched_data, output_file):
             print(f"  [父级汇总] {code} 结算完毕")
             print(f"      总状态  : {mega_record['总状态']}")
             print(f"      工程数量: {known_count}")
-            print(f"      项目名称: {mega_record['项目名称']}")
-            print(f"      标段名称: {mega_record['打捆招标名称']}")
-            print(f"      总中标额: {mega_record['项目中标金额']:.2f}")
-            print(f"      总造价  : {mega_record['项目工程总造价(元)']:.2f}")
-            print(f"      市政总额: {mega_record['市政道路修复费']:.2f}")
-            print(f"      小区总额: {mega_record['小区道路修复费']:.2f}")
-            print(f"      绿化总额: {mega_record['绿化修复费']:.2f}")
-            print(f"      发包总额: {mega_record['发包金额']:.2f}")
+            print(f"      项目名称: {mega_record.get('项目名称', '')}")
+            print(f"      标段名称: {mega_record.get('打捆招标名称', '')}")
+            print(f"      总中标额: {mega_record.get('项目中标金额', 0.0):.2f}")
+            print(f"      总造价  : {mega_record.get('项目工程总造价(元)', 0.0):.2f}")
+            print(f"      市政总额: {mega_record.get('市政道路修复费', 0.0):.2f}")
+            print(f"      小区总额: {mega_record.get('小区道路修复费', 0.0):.2f}")
+            print(f"      绿化总额: {mega_record.get('绿化修复费', 0.0):.2f}")
+            print(f"      发包总额: {mega_record.get('发包金额', 0.0):.2f}")
             print("-" * 50)
 
         except Exception as agg_error:
@@ -379,7 +650,13 @@ def run_data_cycle(page, search_tab, enriched_data, output_file):
 
         all_results.append(mega_record)
 
-        # 【实时存档】
+        # 【实时存档】[V2.4.0] 输出表即增量刷新的底稿：尚未处理项目的上次结果随存档保留
+        data_excel.save_data_to_excel(erp_refresh.with_baseline(all_results, codes, previous), output_file)
+
+    if previous:
+        # [V2.4.0] 末尾沿用的项目未触发实时存档，收尾时补存一次
         data_excel.save_data_to_excel(all_results, output_file)
 
+    erp_fundamental.close_workbench()
+    erp_recovery.summary()
     return all_results
\ No newline at end of file
@@ -4,10 +4,21 @@ ValkyrieEngine ERP 基础能力原子库 (V2.1.0 延迟读取修复版)
 更新日志：
   - V2.1.0: [紧急修复] 针对列表加载后表头数字刷新延迟导致误读为0的问题，
             增加了“逻辑自洽验证”机制。当列表存在数据时，强制等待表头数字非零。
+  - V2.4.0: [HTTP 直查] COUNT_FETCH = http 时，复用登录会话直接请求工作台背后的查询接口并发查询，
+            接口地址可手工配置，或在首次界面查询时监听网络请求自动学习 (须与界面读数一致才启用)；
+            接口不可用或响应不符合预期的编号，仍走原有界面查询。
+  - V2.4.0: [持久化缓存] 查询结果写入本地缓存 (erp_cache)，有效期内的编号直接复用，只查询未命中与已过期的编号；
+            兜底值 3 不是真实数据，绝不写入缓存。
+  - V2.4.0: [共享查询引擎] 界面查询改由 erp_workbench 完成 (与功能5 共用)，以结果集比对判定新结果，取消每次查询后的清空等待。
 """
 
 import time
-import re  # 导入正则模块，用于提取 "工程数(3)" 括号里的数字
+import re  # 导入正则模块，用于从查询接口响应中识别 "编号_NN" 工程编号
+import config
+import erp_http  # [V2.4.0 新增] 工作台查询接口的 HTTP 直查通道
+import erp_cache  # [V2.4.0 新增] 工程数持久化缓存
+import erp_latency  # [V2.4.0 新增] 查询耗时统计
+import erp_workbench  # [V2.4.0 新增] 共享的工作台查询引擎
 
 def reset_and_back_to_home(page):
     """
@@ -49,114 +60,197 @@ def enter_workbench(page):
 def query_single_project_count(tab, code):
     """
     [核心组件] 单项目工程数原子查询
-    功能：输入编号 -> 查询 -> 【核心】校验列表数据 -> 【修复】延迟并循环验证表头 -> 清空 -> 校验清空状态
+    功能：输入编号 -> 查询 -> 校验列表数据 -> 读取表头工程数
+    [V2.4.0 优化] 经由共享的工作台查询引擎 (erp_workbench) 完成：以“结果集相对上一次查询是否已刷新为本编号”判定新结果，
+    表头与列表在同一次往返中读取并互相校验 (保留 V2.1.0 的表头延迟纠错)，不再每次查询后清空并死等“项目数(0)”。
     返回：该项目的工程数量 (int)
     """
+    result = erp_workbench.query(tab, code)
+
+    # 逻辑：输入框里有一个 code，列表里也应该出来一个 code；查无此项目时交由上层刷新重试
+    if not erp_workbench.own_rows(result, code):
+        raise Exception(f"ListRenderTimeout: 列表未出现编号 {code}，疑似仍在转圈")
+
+    count = result.engineerings or 0
+    if count == 0:
+        print(f"    [警告] 列表存在但表头显示 0，可能存在数据异常: {code}")
+
+    print(f"    -> [{code}] 抓取成功 | 真实工程数: {count}")
+    return count
+
+
+def open_workbench(page):
+    """
+    [导航组件] 进入工作台，首次失败时回城重置后再试一次
+    """
     try:
-        # ==========================
-        # 步骤 1: 输入编号
-        # ==========================
-        # 定位输入框 (ID: projectcode)
-        input_box = tab.ele('#projectcode', timeout=5)
-        # 必须先 clear，防止残留上一次输入的字符
-        input_box.clear().input(code)
-
-        # ==========================
-        # 步骤 2: 点击查询并硬等待
-        # ==========================
-        # 点击查询按钮 (ID: btnquery)
-        tab.ele('#btnquery', timeout=5).click()
-
-        # 硬等待：给前端 JS 渲染和转圈圈留出时间。
-        tab.wait(1)
-
-        # ==========================
-        # 步骤 3: 结果锚点验证 (抗干扰核心)
-        # ==========================
-        # 逻辑：输入框里有一个 code，列表里也应该出来一个 code。
-        # 我们寻找页面中标签为 <td> 且包含该编号的元素。
-        # 如果找到了，说明列表真正渲染出来了。
-        if not tab.ele(f'tag:td@@text():{code}', timeout=15):
-             # 如果等了 15 秒列表里还没刷出这个编号，说明大概率还在空转或者查无此人
-             raise Exception(f"ListRenderTimeout: 列表未出现编号 {code}，疑似仍在转圈")
-
-        # ==========================
-        # 步骤 4: 提取工程数量 (修复的核心战场！)
-        # ==========================
-        # 定位工程数表头 (ID: bbtest)
-        count_element = tab.ele('#bbtest', timeout=5)
-
-        # [V2.1.0 逻辑自洽验证]
-        # 小郁发现的问题：列表出来了，但表头可能还没变，还是 (0)。
-        # 解决方案：既然步骤3通过了，说明至少有1个项目。如果表头读出来是0，说明它在撒谎（延迟）。
-        # 我们给它 3 秒钟的时间改口。
-
-        count = 0
-        end_time = time.time() + 3  # 设置 3 秒的纠错超时时间
-
-        while time.time() < end_time:
-            raw_text = count_element.text  # 获取文本 "工程数(X)"
-            match = re.search(r'\((\d+)\)', raw_text)
-
-            if match:
-                temp_count = int(match.group(1))
-                if temp_count > 0:
-                    count = temp_count
-                    break # 读到了非 0 的数，说明表头刷新了，立刻跳出循环
-
-            # 如果读到是 0，或者没读到，就稍等 0.5 秒再读一次
-            time.sleep(0.5)
-
-        # 循环结束，如果还是 0，那也没办法了，只能信了（虽然理论上不可能）
-        if count == 0:
-            print(f"    [警告] 列表存在但表头显示 0，可能存在数据异常: {code}")
-
-        print(f"    -> [{code}] 抓取成功 | 真实工程数: {count}")
-
-        # ==========================
-        # 步骤 5: 闭环清空
-        # ==========================
-        # 点击清空按钮 (ID: btnclear)
-        tab.ele('#btnclear', timeout=5).click()
-
-        # 【状态复位检查】必须死等 "项目数(0)"
-        # 如果不清零，下一次循环输入新编号时，会和旧数据混在一起，导致灾难性后果。
-        if not tab.ele('text:项目数(0)', timeout=10):
-            raise Exception("ClearFailed: 清空按钮点击后，状态未归零")
-
-        return count
+        return enter_workbench(page)
+    except:
+        reset_and_back_to_home(page)
+        return enter_workbench(page)
+
+
+# ---------------- [V2.4.0 新增] HTTP 直查 ----------------
+# 项目编号在接口模板 (地址与请求体) 中的占位符
+CODE_PLACEHOLDER = "{code}"
+
+# 工作台查询接口模板：{"method", "url", "body", "content_type"}。
+# 由配置项 WORKBENCH_QUERY_URL 给出，或在首次界面查询时学习得到；尚未获得或校验未通过时为 None
+_query_endpoint = None
+
+
+def configured_endpoint():
+    """
+    按配置项构建接口模板：以表单方式 POST 项目编号
+    """
+    if not config.WORKBENCH_QUERY_URL:
+        return None
+    return {"method": "POST", "url": config.WORKBENCH_QUERY_URL,
+            "body": {config.WORKBENCH_QUERY_FIELD: CODE_PLACEHOLDER}, "content_type": None}
 
+
+def parse_count_response(text, code):
+    """
+    从查询接口的响应中解析工程数：统计响应中出现的不同“编号_NN”工程编号
+    响应中不含该项目编号或没有任何工程编号 (格式不符合预期) 时返回 None，由调用方退回界面查询。
+    """
+    if code not in text:
+        return None
+    suffixes = set(re.findall(rf'{re.escape(code)}_(\d{{2,}})', text))
+    return len(suffixes) if suffixes else None
+
+
+def query_count_http(code, endpoint=None):
+    """
+    以 HTTP 请求工作台查询接口，返回工程数；请求失败或响应不符合预期时返回 None
+    """
+    endpoint = endpoint or _query_endpoint
+    try:
+        text = erp_http.request_template(endpoint, CODE_PLACEHOLDER, code, "http_count")
     except Exception as e:
-        # 捕获任何步骤的异常（比如转圈超时、清空失败），直接抛给上层去刷新重试
-        raise e
+        print(f"    [HTTP 直查] {code} 请求失败: {e}")
+        return None
+    return parse_count_response(text, code)
+
+
+def learn_query_endpoint(tab, code):
+    """
+    接口学习：在一次界面查询期间监听工作台发出的网络请求，把携带该项目编号的请求记录为接口模板，
+    再以 HTTP 方式重放同一查询，解析出的工程数与界面读数一致才启用。
+    返回：界面查询得到的工程数
+    """
+    global _query_endpoint
+    count, candidates = erp_http.capture_templates(tab, code, CODE_PLACEHOLDER,
+                                                   lambda: query_single_project_count(tab, code))
+
+    for endpoint in candidates:
+        if query_count_http(code, endpoint) == count:
+            _query_endpoint = endpoint
+            print(f"[HTTP 直查] 已学习工作台查询接口：{endpoint['method']} {endpoint['url']}")
+            break
+    else:
+        print("[HTTP 直查] 未能识别出可重放的工作台查询接口，继续使用界面查询。")
+    return count
+
+
+def query_counts_http(codes):
+    """
+    以 HTTP 并发查询一批编号的工程数 (并发数 HTTP_WORKERS)
+    返回：{编号: 工程数}，仅包含查询成功的编号
+    """
+    futures = {code: erp_http.submit_task(query_count_http, code) for code in dict.fromkeys(codes)}
+    counts = {}
+    for code, future in futures.items():
+        count = future.result()
+        if count is not None:
+            counts[code] = count
+    print(f"[HTTP 直查] 接口并发查询完成：成功 {len(counts)} 个，{len(futures) - len(counts)} 个退回界面查询。")
+    return counts
 
 
 def batch_get_engineering_counts(page, codes_list):
     """
     [控制器] 批量获取工程数量主程序
+    [V2.4.0] 先读取持久化缓存，只对未命中与已过期的编号发起查询；真实查询结果回写缓存。
+    返回：[{'项目编号': 编号, '工程数': 数量}, ...]，与 codes_list 顺序一致。
+    """
+    counts, _ = resolve_engineering_counts(page, codes_list)
+    return [{"项目编号": code, "工程数": counts[code]} for code in codes_list]
+
+
+def resolve_engineering_counts(page, codes_list):
+    """
+    [V2.4.0] 批量获取工程数量：先读缓存，只查询未命中与已过期的编号
+    返回：({编号: 工程数}, 使用兜底值的编号集合)。兜底值不是真实数据，增量刷新不得据此核对终态。
+    """
+    cached = erp_cache.get_counts(codes_list)
+    misses = [code for code in codes_list if code not in cached]
+    if cached:
+        print(f"\n[工程数缓存] 命中 {len(cached)} 个编号，仅需查询 {len(misses)} 个未命中或已过期的编号。")
+
+    queried, fallback_codes = {}, set()
+    if misses:
+        result_data, fallback_codes = query_engineering_counts(page, misses)
+        queried = {item["项目编号"]: item["工程数"] for item in result_data}
+        # 兜底值不是真实数据，只缓存真实查询结果
+        erp_cache.put_counts({code: count for code, count in queried.items() if code not in fallback_codes})
+
+    return dict(cached, **queried), set(fallback_codes)
+
+
+def query_engineering_counts(page, codes_list):
+    """
+    [控制器] 批量查询工程数量 (不经过缓存)
     特性：具备“原地复活”能力，单点故障直接刷新当前页，不回首页。
+    返回：(结果列表, 使用兜底值的编号集合)
     """
     print(f"\n[基础能力] 启动批量工程数嗅探，目标数量：{len(codes_list)}")
 
-    # 初始化：先尝试进入工作台
-    try:
-        workbench_tab = enter_workbench(page)
-    except:
-        reset_and_back_to_home(page)
-        workbench_tab = enter_workbench(page)
+    global _query_endpoint
+    workbench_tab = None
+    http_counts = {}
+
+    # [V2.4.0 新增] HTTP 直查：先以接口并发查询，只有查询失败或响应不符合预期的编号才进入界面查询
+    if erp_http.enabled(config.COUNT_FETCH):
+        if _query_endpoint is None:
+            _query_endpoint = configured_endpoint()
+        if _query_endpoint is None and codes_list:
+            # 未配置接口地址：以第一个编号的界面查询学习接口
+            workbench_tab = open_workbench(page)
+            try:
+                http_counts[codes_list[0]] = learn_query_endpoint(workbench_tab, codes_list[0])
+            except Exception as e:
+                print(f"[HTTP 直查] 接口学习期间的界面查询失败，交由界面查询重试：{e}")
+                workbench_tab.refresh()
+                workbench_tab.ele('#projectcode', timeout=30)
+        if _query_endpoint is not None:
+            http_counts.update(query_counts_http([c for c in codes_list if c not in http_counts]))
+
+    # 初始化：先尝试进入工作台 (全部编号均已直查完成时无需打开)
+    if workbench_tab is None and any(code not in http_counts for code in codes_list):
+        workbench_tab = open_workbench(page)
 
     result_data = []
+    fallback_codes = set()
 
     for index, code in enumerate(codes_list, start=1):
         # 进度日志
         print(f"[嗅探进度 {index}/{len(codes_list)}] 正在探测: {code}")
 
+        if code in http_counts:
+            result_data.append({"项目编号": code, "工程数": http_counts[code]})
+            print(f"    -> [{code}] 抓取成功 | 真实工程数: {http_counts[code]}")
+            continue
+
         max_retries = 2
 
         for attempt in range(1, max_retries + 1):
             try:
                 # 调用原子查询
+                start = time.time()
                 count = query_single_project_count(workbench_tab, code)
+                # [V2.4.0] 界面查询耗时，供运行规划预估
+                erp_latency.record_latency('workbench_count', time.time() - start)
 
                 # 成功则存入
                 result_data.append({"项目编号": code, "工程数": count})
@@ -184,6 +278,7 @@ def batch_get_engineering_counts(page, codes_list):
                     print(f"    [放弃] {code} 连续失败，启用兜底值 3")
                     # 兜底策略：为了不卡死整个流程，给一个默认值
                     result_data.append({"项目编号": code, "工程数": 3})
+                    fallback_codes.add(code)
 
                     # 即使放弃了，为了下一个编号能跑，也得刷新一下保持环境干净
                     workbench_tab.refresh()
@@ -195,8 +290,74 @@ def batch_get_engineering_counts(page, codes_list):
     if workbench_tab:
         workbench_tab.close()
 
-    return result_data
+    return result_data, fallback_codes
+
 
+# ---------------- [V2.4.0 新增] 按需单查 ----------------
+# 常驻工作台标签页：仅在业务线检索结果无法推导工程数时按需打开，之后反复复用，整批任务结束时关闭
+_workbench_tab = None
+
+
+def get_engineering_count(page, code, tab_guard=None):
+    """
+    [V2.4.0 新增] 单项目工程数按需查询 (ENGINEERING_COUNT_SOURCE = search 模式下的兜底)
+    功能：优先读取持久化缓存；工作台标签页首次使用时打开并常驻复用；单次失败原地刷新重试，连续失败启用兜底值 3 (不写入缓存)。
+    参数 tab_guard：可选的新标签页创建临界区 (检索标签页池的 creating_tab)，防止新开的工作台被误认为备用检索标签页。
+    """
+    global _workbench_tab
+    max_retries = 2
+
+    cached = erp_cache.get_counts([code])
+    if code in cached:
+        print(f"    -> [{code}] 工程数缓存命中: {cached[code]}")
+        return cached[code]
+
+    # [V2.4.0] HTTP 直查优先 (接口已配置或已学习时)
+    if erp_http.enabled(config.COUNT_FETCH) and (_query_endpoint or configured_endpoint()):
+        count = query_count_http(code, _query_endpoint or configured_endpoint())
+        if count is not None:
+            print(f"    -> [{code}] 抓取成功 | 真实工程数: {count}")
+            erp_cache.put_counts({code: count})
+            return count
+
+    for attempt in range(1, max_retries + 1):
+        try:
+            if _workbench_tab is None:
+                if tab_guard is not None:
+                    with tab_guard():
+                        _workbench_tab = enter_workbench(page)
+                else:
+                    _workbench_tab = enter_workbench(page)
+            count = query_single_project_count(_workbench_tab, code)
+            erp_cache.put_counts({code: count})
+            return count
+
+        except Exception as e:
+            print(f"    [异常] {code} 第 {attempt} 次工作台单查失败: {e}")
+            if _workbench_tab is None:
+                continue
+            try:
+                # 原地复活：刷新工作台，清除转圈、遮罩层与残留查询条件
+                _workbench_tab.refresh()
+                _workbench_tab.ele('#projectcode', timeout=30)
+            except Exception:
+                close_workbench()
+
+    print(f"    [放弃] {code} 连续失败，启用兜底值 3")
+    return 3
+
+
+def close_workbench():
+    """
+    [V2.4.0 新增] 关闭按需打开的常驻工作台标签页
+    """
+    global _workbench_tab
+    if _workbench_tab is not None:
+        try:
+            _workbench_tab.close()
+        except Exception:
+            pass
+        _workbench_tab = None
 
 # ---------------- 单独测试入口 ----------------
 if __name__ == '__main__':
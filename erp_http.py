@@ -0,0 +1,186 @@
+"""
+ValkyrieEngine 详情页 HTTP 直取模块 (Browser-free Detail Fetch)
+功能：复用登录时保存的会话快照 (Cookie 与 User-Agent)，以长连接 HTTP 客户端直接拉取 SR 单据详情页，
+在后台线程池中并发下载并离线解析，浏览器只负责列表检索。
+
+【设计背景】
+功能1/2 的详情页是服务端渲染、只读的表单。经浏览器打开时，每条单据都要经历导航、脚本执行与渲染，
+吞吐受 Chrome 渲染速度约束，想提高并发只能多开标签页，代价是成倍的内存与渲染进程。
+直接以 HTTP 拉取同一地址即可得到完全相同的表单 HTML，一个连接池即可支撑数个并发请求，开销远低于多开标签页。
+
+【处理流程】
+1. 浏览器线程在列表中定位单据并读取其链接 (erp_list_search.row_link)，随即投递下载任务，立即转入下一个编号；
+2. 后台线程以各自的长连接会话 (Keep-Alive) 拉取 HTML，并调用业务线的离线解析函数 (与浏览器离线解析模式规则一致)；
+3. 返回 Future，由 erp_page_reader.settle_results 按任务顺序结算落盘。
+[V2.4.0] 工作台工程数查询 (erp_fundamental) 同样复用本模块的会话与线程池，以 HTTP 并发直查。
+
+【请求模板】
+页面背后的数据接口 (工作台查询、业务列表数据) 通过“请求模板”重放：在一次界面操作期间监听标签页发出的网络请求，
+把携带关键字的请求记录为模板 (关键字替换为占位符)，此后以不同关键字填充模板即可直接请求，无需驱动界面。
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+import erp_latency
+import erp_login
+
+# 浏览器实例以 --ignore-certificate-errors 访问内网 ERP (自签名证书)，HTTP 通道与其保持一致
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# 每个下载线程持有独立的长连接会话，避免多线程共享同一会话对象
+_local = threading.local()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _build_session():
+    """
+    按登录时保存的会话快照构建 HTTP 会话：注入全域 Cookie 与浏览器 User-Agent，挂载带重试的长连接池
+    """
+    snapshot = erp_login.session_snapshot()
+    if snapshot is None:
+        raise Exception("SessionUnavailable: 未保存登录会话快照，无法启用 HTTP 直取")
+
+    session = requests.Session()
+    session.verify = False
+    if snapshot.get("user_agent"):
+        session.headers["User-Agent"] = snapshot["user_agent"]
+    for cookie in snapshot["cookies"]:
+        session.cookies.set(cookie["name"], cookie["value"],
+                            domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    # 仅对连接错误与网关类状态码做有限次退避重试，业务层错误原样交给调用方判定 (查询类 POST 同样幂等，可安全重试)
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET", "POST"))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _get_session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _build_session()
+        _local.session = session
+    return session
+
+
+def request_text(method, url, op_name, **kwargs):
+    """
+    以当前线程的长连接会话发起请求并返回响应文本
+    非 200 状态码、或被重定向回登录页 (会话失效) 时抛出 Exception。
+    """
+    start = time.time()
+    response = _get_session().request(method, url, timeout=config.HTTP_TIMEOUT, **kwargs)
+    erp_latency.record_latency(op_name, time.time() - start)
+
+    if response.status_code != 200:
+        raise Exception(f"HttpError: {url} 返回状态码 {response.status_code}")
+
+    # 服务端未声明字符集时，requests 会退回 ISO-8859-1，需按内容推断以免中文乱码
+    if 'charset' not in response.headers.get('Content-Type', '').lower():
+        response.encoding = response.apparent_encoding
+    text = response.text
+
+    if 'j_username' in text:
+        raise Exception("SessionExpired: 请求被重定向至登录页，登录会话已失效")
+    return text
+
+
+def fetch_html(url):
+    """
+    拉取单据详情页 HTML，失败时抛出 Exception，由调用方转为字段异常标记
+    """
+    return request_text("GET", url, "http_detail")
+
+
+def _fetch_and_parse(url, parse_fn, args, on_error):
+    try:
+        raw_html = fetch_html(url)
+    except Exception as e:
+        return on_error(e)
+    return parse_fn(raw_html, *args)
+
+
+def capture_templates(tab, keyword, placeholder, action):
+    """
+    请求模板学习：执行 action() (一次界面操作) 期间监听标签页发出的网络请求，
+    把 URL 或请求体中携带关键字的请求记录为模板 {"method", "url", "body", "content_type"}，关键字替换为占位符。
+    返回：(action() 的返回值, [模板, ...])，按请求发出顺序排列，由调用方重放校验后选用。
+    """
+    tab.listen.start()
+    try:
+        result = action()
+        templates = []
+        for packet in tab.listen.steps(timeout=1):
+            request = packet.request
+            body = request.postData
+            if body is not None and not isinstance(body, str):
+                body = json.dumps(body, ensure_ascii=False)
+            if keyword not in request.url and keyword not in (body or ''):
+                continue
+            templates.append({
+                "method": request.method,
+                "url": request.url.replace(keyword, placeholder),
+                "body": body.replace(keyword, placeholder) if body else None,
+                "content_type": request.headers.get('Content-Type') or request.headers.get('content-type'),
+            })
+    finally:
+        tab.listen.stop()
+    return result, templates
+
+
+def request_template(template, placeholder, value, op_name):
+    """
+    以 value 填充请求模板中的占位符并发起请求，返回响应文本 (失败时抛出 Exception)
+    模板的 body 可以是表单字典 (逐项填充) 或原始请求体文本。
+    """
+    kwargs = {}
+    body = template["body"]
+    if isinstance(body, dict):
+        kwargs["data"] = {k: v.replace(placeholder, value) for k, v in body.items()}
+    elif body:
+        kwargs["data"] = body.replace(placeholder, value).encode('utf-8')
+    if template.get("content_type"):
+        kwargs["headers"] = {"Content-Type": template["content_type"]}
+    return request_text(template["method"], template["url"].replace(placeholder, value), op_name, **kwargs)
+
+
+def submit_task(fn, *args):
+    """
+    将任务投递至 HTTP 后台线程池 (并发数 HTTP_WORKERS)，返回 Future
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.HTTP_WORKERS, thread_name_prefix="http-worker")
+    return _executor.submit(fn, *args)
+
+
+def submit_fetch(url, parse_fn, *args, on_error):
+    """
+    投递一个“下载 + 离线解析”任务，返回 Future
+    参数：
+      - parse_fn: 业务线的离线解析函数，签名为 parse_fn(raw_html, *args)，自身负责容错。
+      - on_error: 下载失败时调用 on_error(异常)，其返回值作为该任务的结果。
+    """
+    return submit_task(_fetch_and_parse, url, parse_fn, args, on_error)
+
+
+def enabled(mode=None):
+    """
+    是否启用 HTTP 直取：配置开启且已保存登录会话快照
+    参数 mode：对应的配置项取值，缺省为详情页获取方式 DETAIL_FETCH
+    """
+    mode = config.DETAIL_FETCH if mode is None else mode
+    return mode == 'http' and erp_login.session_snapshot() is not None
\ No newline at end of file
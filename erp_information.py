@@ -7,8 +7,7 @@ ValkyrieEngine 模块五：环境导航与状态嗅探组件
 以及关键业务指标（项目数、工程数）的预解析。
 """
 
-import time
-import re
+import erp_workbench  # [V2.4.0 新增] 共享的工作台查询引擎
 
 def reset_and_back_to_home(page):
     """
@@ -68,20 +67,12 @@ def get_header_counts(tab):
     1. 数据非标解析：系统顶部的汇总信息通常以“指标名(数值)”的非结构化字符串形式存在。
     2. 正则表达式驱动：利用 re 库精准捕获括号内的整数值，实现从 UI 文本到程序逻辑变量的类型转换。
     3. 逻辑解耦：将“查到了多少个项目”与“如何查询”分离，为 Case 1/2/3 的逻辑分流提供判别依据。
+    [V2.4.0] 解析规则统一由共享查询引擎 (erp_workbench) 提供，一次往返读取两个表头；查询后的结果刷新等待由 erp_workbench.query 负责。
     """
     try:
-        # 强制同步等待，确保 AJAX 回调已完成 UI 数据更新
-        tab.wait(1)
-
         # 严格映射业务 ID：#aatest(项目数) 与 #bbtest(工程数)
-        p_text = tab.ele('#aatest', timeout=10).text
-        e_text = tab.ele('#bbtest', timeout=10).text
-
-        # 提取数值元数据
-        p_count = int(re.search(r'\((\d+)\)', p_text).group(1)) if p_text else 0
-        e_count = int(re.search(r'\((\d+)\)', e_text).group(1)) if e_text else 0
-
-        return p_count, e_count
+        snapshot = erp_workbench.read_snapshot(tab)
+        return snapshot.projects or 0, snapshot.engineerings or 0
     except Exception as e:
         print(f"    [警告] 元数据解析失败，可能由于 AJAX 响应结构异常: {e}")
         return 0, 0
\ No newline at end of file
@@ -9,13 +9,25 @@ ValkyrieEngine 模块五：项目基础信息查询与数据提取核心
 【核心机制解析】
 1. 状态分流逻辑：通过读取页面顶部的“项目数”与“工程数”，动态将任务划分至三种处理分支（Case 1/2/3）。
 2. 异步加载校验：通过持续轮询特定的DOM（文档对象模型）元素文本状态，确保在提取前前端数据已完全渲染，避免数据为空或读取脏数据。
-3. 梯度容错机制：针对网络延迟或DOM结构卡死，设定最大重试次数。异常发生时，优先尝试局部页面刷新；若局部恢复失效，则触发跨模块的全局环境重置。
+3. 梯度容错机制：针对网络延迟或DOM结构卡死，设定最大自愈步数。异常发生时，由统一的分级自愈策略按故障类型与实测代价
+   选择起点（清空条件 / 直接重试 / 局部页面刷新 / 全局环境重置 / 浏览器重启），失败则逐级升级。
 4. 数据聚合与后处理：在底层数据提取完成后，执行业务层面的数据清洗（如去除空白项）和去重合并，直接生成可用于最终报表的汇总前置列。
 """
 
 import time
+import config
 import data_excel
 import erp_information
+import erp_login
+import erp_workbench  # [V2.4.0 新增] 共享的工作台查询引擎
+import erp_watchdog  # [V2.4.0 新增] 单任务看门狗
+import erp_list_search  # [V2.4.0 新增] 协作取消检查点 (看门狗放弃任务后停止操作浏览器)
+import erp_recovery  # [V2.4.0 新增] 分级自愈策略
+import erp_cache  # [V2.4.0 新增] 空结果缓存与工程数缓存
+import erp_latency  # [V2.4.0 新增] 查询耗时统计
+
+# [V2.4.0 新增] 空结果缓存的业务线标识
+NEGATIVE_NAMESPACE = "f5_information"
 
 def get_field_mapping():
     """
@@ -39,6 +51,31 @@ def get_field_mapping():
         "项目负责人": "#xmfzr"
     }
 
+def panel_fields():
+    """
+    [V2.4.0 新增] 本次运行需要输出的详情面板字段 (列投影 F5_FIELDS，留空为全部字段)
+    """
+    return data_excel.select_fields(config.F5_FIELDS, list(get_field_mapping()), "F5_FIELDS",
+                                    fixed=("项目编号", "工程数"))
+
+
+def panel_mapping():
+    """
+    [V2.4.0 新增] 本次运行需要读取的字段：列投影选中的字段，外加渲染校验所需的工程编号与项目名称
+    """
+    fields = set(panel_fields()) | {"工程编号", "项目名称"}
+    return {field: selector for field, selector in get_field_mapping().items() if field in fields}
+
+
+# [V2.4.0 新增] 汇总列及其来源字段：来源字段被列投影排除时，汇总列一并省略
+SUMMARY_SOURCES = {
+    "汇总_项目名称": "项目名称",
+    "汇总_项目状态": "项目状态",
+    "汇总_施工单位": "施工单位",
+    "汇总_分包单位": "分包单位",
+}
+
+
 def get_information_template(code, status):
     """
     数据结构初始化模块
@@ -48,75 +85,195 @@ def get_information_template(code, status):
     record = {
         "项目编号": code,
         "工程数": status,
-        # 预留用于最终报表展示的聚合字段
-        "汇总_项目名称": "",
-        "汇总_项目状态": "",
-        "汇总_施工单位": "",
-        "汇总_分包单位": ""
     }
 
+    # 预留用于最终报表展示的聚合字段 ([V2.4.0] 与下方明细列一样，只生成列投影选中的字段)
+    fields = panel_fields()
+    for summary_key, source in SUMMARY_SOURCES.items():
+        if source in fields:
+            record[summary_key] = ""
+
     # 根据字段注册表，按顺序生成01到05的占位符
-    mapping = get_field_mapping()
     for i in range(1, 6):
         suffix = f"_{i:02d}"
-        for field in mapping.keys():
+        for field in fields:
             record[f"{field}{suffix}"] = ""
 
     return record
 
-def wait_for_data_load(tab, suffix_id, exact_suffix=None):
+def read_engineering_panel(tab, list_item, suffix_id, code, exact_suffix=None):
     """
-    异步数据渲染校验组件
+    异步数据渲染校验与批量提取组件
     用于解决点击列表项后，右侧详情面板数据加载存在延迟的问题。
+    [V2.4.0 优化] 每次轮询通过一次页面脚本调用读取映射表中的全部字段 (含校验字段 #gcbh / #xmmc)，
+    渲染校验通过时本次读取的结果即为提取结果，“面板就绪校验”与“字段提取”在同一次往返中完成，
+    取代原先每个字段一次 ele() 往返 (字段缺失时每个白白等待 2 秒) 的逐字段提取。
+    [V2.4.0 优化] 查询之间不再清空工作台，面板上可能残留上一个项目的数据：点击前先记录面板现有内容，
+    由共享查询引擎 (erp_workbench) 轮询至面板数据属于本次点击的工程，取代点击后的固定 1.5 秒缓冲。
 
     参数说明:
         tab: 当前浏览器标签页对象
+        list_item: 待点击的列表项
         suffix_id: 当前处理的工程编号后缀（仅用于日志输出记录进度）
+        code: 项目编号
         exact_suffix: 期望出现的单据尾标（如 "_02"）。若传入此参数，则启用严格比对模式。
+    返回：{字段名: 文本}，缺失字段默认赋空值。
     """
+    # [V2.4.0] 只读取列投影选中的字段与校验字段
+    mapping = panel_mapping()
+    before = erp_workbench.read_snapshot(tab, mapping.values()).panel
+
+    list_item.click()
     print(f"        -> [{suffix_id}] 校验模块启动：轮询监测详情面板数据渲染状态...")
-    end_time = time.time() + 15  # 设定全局超时阈值为15秒
 
-    while time.time() < end_time:
+    def ready(panel):
+        gcbh_val = panel.get(mapping["工程编号"]) or ""
         if exact_suffix:
             # 【严格比对模式】适用于多工程切换场景（Case 3）
-            # 持续读取工程编号元素，必须确认内容已变更为当前指定的尾标，防止提取到上一次点击的缓存数据
-            gcbh_val = tab.ele('#gcbh', timeout=0.1).text.strip()
-            if exact_suffix in gcbh_val:
-                # 确认数据刷新后，强制等待0.8秒，确保前端的全局透明加载遮罩完全被移除
-                tab.wait(0.8)
-                print(f"        -> [{suffix_id}] 尾标校验通过: 当前获取编号为 {gcbh_val}")
-                return True
+            # 工程编号必须已变更为当前指定的完整工程编号，防止提取到上一次点击 (或上一个项目) 的缓存数据
+            return f"{code}{exact_suffix}" in gcbh_val
+        # 【基础比对模式】适用于单工程加载场景（Case 2）
+        # 核心必填字段（项目名称）不为空，且面板已属于本项目：工程编号包含本编号；或点击前面板为空；
+        # 或点击前已有内容的字段全部已刷新 (查询之间不再清空，只刷新了部分字段的面板可能混有上一个项目的数据)
+        if not panel.get(mapping["项目名称"]):
+            return False
+        return code in gcbh_val or all(panel.get(s) != v for s, v in before.items() if v)
+
+    try:
+        panel = erp_workbench.read_panel(tab, mapping.values(), ready)
+    except Exception:
+        # 若超出15秒条件仍未成立，主动抛出异常，中断当前逻辑并交由外层重试机制接管
+        raise Exception(f"[{suffix_id}] 页面异步数据请求超时，触发异常阻断逻辑")
+
+    # 捕获因字段缺失引发的空值，默认赋空字符串，保证程序平稳运行
+    data = {field: panel.get(selector) or "" for field, selector in mapping.items()}
+    # 确认数据刷新后，强制等待0.8秒，确保前端的全局透明加载遮罩完全被移除，不阻断后续点击
+    tab.wait(0.8)
+    if exact_suffix:
+        print(f"        -> [{suffix_id}] 尾标校验通过: 当前获取编号为 {data['工程编号']}")
+    else:
+        print(f"        -> [{suffix_id}] 数据渲染完成: 首字段获取内容为 {data['项目名称'][:10]}...")
+    return data
+
+def fill_panel(record, data, suffix):
+    """
+    [V2.4.0 新增] 面板数据回填：校验字段未被列投影选中时只用于渲染校验，不写入记录
+    """
+    for k, v in data.items():
+        if f"{k}{suffix}" in record:
+            record[f"{k}{suffix}"] = v
+
+
+def query_and_extract(tab, code, attempt, cancel_event=None):
+    """
+    单编号查询与分类提取模块 (单次尝试)
+    功能：完成“输入编号 -> 查询 -> 读取总览 -> 分类提取”的完整交互，返回该编号的数据记录。
+    本函数以独立单元的形式被看门狗托管执行，任何异常均直接抛出，交由 run_data_cycle 的容错机制处理。
+    [V2.4.0] 每次点击前检查看门狗的取消信号 (cancel_event)，任务被放弃后不再操作浏览器。
+    """
+    current_record = None
+
+    # ---------------------------------------------------------
+    # 第一、二阶段：查询触发与数据总览状态嗅探
+    # ---------------------------------------------------------
+    # [V2.4.0 优化] 经由共享的工作台查询引擎完成：以结果集比对判定新结果，表头计数与结果列表在同一次往返中读取，
+    # 取代“查询后固定挂起 3.5 秒 + 表头解析前再等 1 秒”
+    print(f"    [系统状态] 尝试次数 {attempt}：发送查询指令，等待结果刷新...")
+    result = erp_workbench.query(tab, code)
+    p_count, e_count = result.projects or 0, result.engineerings or 0
+    print(f"    [数据分析] 识别到当前列表信息：包含项目数 {p_count}，工程数 {e_count}")
+
+    # ---------------------------------------------------------
+    # 第三阶段：依据工程结构特征的分类提取逻辑
+    # ---------------------------------------------------------
+    if p_count == 0:
+        # 分支1：无数据情况，生成查无此项目记录
+        print("    [逻辑流向] 执行 Case 1 流程: 未检索到有效数据。")
+        current_record = get_information_template(code, "查无此项目")
+    else:
+        # 设定工程状态标签，无子工程时默认标识为0
+        status_label = e_count if e_count > 0 else 0
+        current_record = get_information_template(code, status_label)
+
+        if not panel_fields():
+            # [V2.4.0 新增] 列投影不含任何面板字段：总览中的工程数即为全部所需结果，不再逐个点开详情面板
+            print("    [逻辑流向] 列投影不含详情面板字段，跳过详情面板提取。")
+        elif e_count == 0:
+            # 分支2：单工程模式。根据编号直接在列表DOM中定位并点击跳转
+            print(f"    [逻辑流向] 执行 Case 2 流程: 触发编号 {code} 详情页跳转...")
+            erp_list_search.check_cancelled(cancel_event)
+            list_item = tab.ele(f'text:{code}', timeout=5)
+            if list_item:
+                # 调用异步校验与批量提取模块（基础比对模式）
+                data = read_engineering_panel(tab, list_item, "_01", code)
+                fill_panel(current_record, data, "_01")
+            else:
+                raise Exception(f"Case 2 DOM寻址失败：未能在查询结果中定位到预期编号 {code}")
+
         else:
-            # 【基础比对模式】适用于单工程加载场景（Case 2）
-            # 无需校验尾标，只需确认核心必填字段（项目名称）已不再为空字符串
-            name_val = tab.ele('#xmmc', timeout=0.1).text.strip()
-            if name_val != "":
-                tab.wait(0.8)
-                print(f"        -> [{suffix_id}] 数据渲染完成: 首字段获取内容为 {name_val[:10]}...")
-                return True
+            # 分支3：多子工程模式。通过构建具有顺序后缀的编号循环定位点击
+            print(f"    [逻辑流向] 执行 Case 3 流程: 侦测到 {e_count} 个子项目，启动顺序提取机制...")
+            for i in range(1, min(e_count, 5) + 1):
+                suffix = f"_{i:02d}"
+                target_code = f"{code}{suffix}"
+
+                erp_list_search.check_cancelled(cancel_event)
+                target_ele = tab.ele(f'text:{target_code}', timeout=5)
+                if target_ele:
+                    # 调用异步校验与批量提取模块（严格比对模式：传入当前后缀，确保数据源变更）
+                    data = read_engineering_panel(tab, target_ele, suffix, code, exact_suffix=suffix)
+                    fill_panel(current_record, data, suffix)
+                else:
+                    raise Exception(f"Case 3 DOM寻址失败：列表内缺失单据 {target_code}")
+
+        # 对于未达到最高列数（5个）的剩余字段，进行占位符填充处理
+        start_fill = max(e_count, 1 if e_count == 0 else e_count) + 1
+        for j in range(start_fill, 6):
+            if f"项目名称_{j:02d}" in current_record:
+                current_record[f"项目名称_{j:02d}"] = "无此工程"
 
-        # 每次轮询间隔0.5秒，降低对CPU和DOM渲染引擎的占用
-        time.sleep(0.5)
+    # [V2.4.0 优化] 不再清空查询条件 (第四阶段)：下一次查询由共享查询引擎比对结果集判定新结果
 
-    # 若超出15秒条件仍未成立，主动抛出异常，中断当前逻辑并交由外层重试机制接管
-    raise Exception(f"[{suffix_id}] 页面异步数据请求超时，触发异常阻断逻辑")
+    return current_record
 
-def extract_one_engineering(tab, suffix_id):
+
+def build_recovery_policy(env):
     """
-    单节点DOM解析与数据提取模块
-    遍历映射表，通过精确ID选择器快速提取当前页面的文本内容。
+    [V2.4.0 新增] 工作台分级自愈策略
+    将原有的“局部视图重载 -> 全局环境重建”两级容错，纳入统一的分级自愈策略：
+    直接重试 -> 清空查询条件 -> 视图重载 -> 环境重建 -> 浏览器重启。
     """
-    mapping = get_field_mapping()
-    data = {}
-    for field, selector in mapping.items():
-        try:
-            val = tab.ele(selector, timeout=2).text.strip()
-            data[field] = val
-        except:
-            # 捕获因字段缺失引发的异常，默认赋空值，保证程序平稳运行
-            data[field] = ""
-    return data
+    def research():
+        env["tab"].wait(1)
+
+    def clear_tag():
+        env["tab"].ele('#btnclear', timeout=2).click()
+        env["tab"].wait(1)
+
+    def reload():
+        env["tab"].refresh()
+        env["tab"].wait(3)
+        # 视图重载后执行二次校验，确认核心DOM元素是否恢复
+        if not env["tab"].ele('#projectcode', timeout=2):
+            raise Exception("刷新后核心DOM结构依然残缺")
+
+    def rebuild():
+        # 当系统级假死导致局部刷新无效时，执行跨页签的彻底清理与重新导航
+        erp_information.reset_and_back_to_home(env["page"])
+        env["tab"] = erp_information.setup_search_environment(env["page"])
+
+    def restart():
+        env["page"] = erp_login.restart_browser(env["page"])
+        env["tab"] = erp_information.setup_search_environment(env["page"])
+
+    return erp_recovery.RecoveryPolicy({
+        "research": research,
+        "clear_tag": clear_tag,
+        "reload": reload,
+        "rebuild": rebuild,
+        "restart": restart if erp_login.can_restart() else None,
+    })
+
 
 def run_data_cycle(page, tab, codes_list, output_file):
     """
@@ -125,125 +282,55 @@ def run_data_cycle(page, tab, codes_list, output_file):
     total = len(codes_list)
     all_results = []
 
+    # [V2.4.0] 浏览器与工作台句柄可能在自愈过程中被替换，统一经由 env 引用
+    env = {"page": page, "tab": tab}
+    policy = build_recovery_policy(env)
+
     for index, code in enumerate(codes_list, start=1):
         print(f"\n[任务进度 {index}/{total}] 开始分配处理线程: {code}")
 
-        max_try = 3
         current_record = None
-
-        # 异常容错机制：针对单个编号设定最高三次的执行尝试
-        for attempt in range(1, max_try + 1):
+        attempts = [0]
+
+        def attempt_once():
+            attempts[0] += 1
+            start = time.time()
+            # 第一至第四阶段：查询、分类提取与状态重置 (由看门狗强制执行墙钟截止时间)
+            record = erp_watchdog.run_with_deadline(env["page"], query_and_extract, (env["tab"], code, attempts[0]),
+                                                    suspect_tabs=lambda: [env["tab"]], cancellable=True)
+            # [V2.4.0] 单个编号的查询耗时，供运行规划预估
+            erp_latency.record_latency('f5_query', time.time() - start)
+            return record
+
+        # [V2.4.0 新增] 空结果缓存：有效期内已确认查无此项目的编号直接本地作答，不再查询
+        known_empty = erp_cache.get_negative(NEGATIVE_NAMESPACE, code)
+        if known_empty is not None:
+            print(f"    [空结果缓存] 编号 {code} 近期已确认{known_empty}，跳过查询。")
+            current_record = get_information_template(code, known_empty)
+        else:
             try:
-                # ---------------------------------------------------------
-                # 第一阶段：系统交互与查询触发
-                # ---------------------------------------------------------
-                input_box = tab.ele('#projectcode', timeout=10)
-                if not input_box:
-                    raise Exception("无法定位查询输入框，判定页面DOM结构已失效")
-
-                input_box.clear().input(code)
-                tab.ele('#btnquery', timeout=5).click()
-
-                # 查询指令发出后，系统会触发全局遮罩阻断用户操作。
-                # 此处强制挂起3.5秒，规避因过早执行后续DOM查询导致的交互无效问题。
-                print(f"    [系统状态] 尝试次数 {attempt}：查询指令已发送，执行系统响应等待...")
-                tab.wait(3.5)
-
-                # ---------------------------------------------------------
-                # 第二阶段：数据总览状态嗅探
-                # ---------------------------------------------------------
-                p_count, e_count = erp_information.get_header_counts(tab)
-                print(f"    [数据分析] 识别到当前列表信息：包含项目数 {p_count}，工程数 {e_count}")
-
-                # ---------------------------------------------------------
-                # 第三阶段：依据工程结构特征的分类提取逻辑
-                # ---------------------------------------------------------
-                if p_count == 0:
-                    # 分支1：无数据情况，生成查无此项目记录
-                    print("    [逻辑流向] 执行 Case 1 流程: 未检索到有效数据。")
-                    current_record = get_information_template(code, "查无此项目")
-                else:
-                    # 设定工程状态标签，无子工程时默认标识为0
-                    status_label = e_count if e_count > 0 else 0
-                    current_record = get_information_template(code, status_label)
-
-                    if e_count == 0:
-                        # 分支2：单工程模式。根据编号直接在列表DOM中定位并点击跳转
-                        print(f"    [逻辑流向] 执行 Case 2 流程: 触发编号 {code} 详情页跳转...")
-                        list_item = tab.ele(f'text:{code}', timeout=5)
-                        if list_item:
-                            list_item.click()
-                            tab.wait(1.5)  # 交互延迟缓冲
-
-                            # 调用异步校验模块（基础比对模式）
-                            wait_for_data_load(tab, "_01", exact_suffix=None)
-
-                            data = extract_one_engineering(tab, "_01")
-                            for k, v in data.items(): current_record[f"{k}_01"] = v
-                        else:
-                            raise Exception(f"Case 2 DOM寻址失败：未能在查询结果中定位到预期编号 {code}")
-
-                    else:
-                        # 分支3：多子工程模式。通过构建具有顺序后缀的编号循环定位点击
-                        print(f"    [逻辑流向] 执行 Case 3 流程: 侦测到 {e_count} 个子项目，启动顺序提取机制...")
-                        for i in range(1, min(e_count, 5) + 1):
-                            suffix = f"_{i:02d}"
-                            target_code = f"{code}{suffix}"
-
-                            target_ele = tab.ele(f'text:{target_code}', timeout=5)
-                            if target_ele:
-                                target_ele.click()
-                                tab.wait(1.5)
-
-                                # 调用异步校验模块（严格比对模式：传入当前后缀，确保数据源变更）
-                                wait_for_data_load(tab, suffix, exact_suffix=suffix)
-
-                                data = extract_one_engineering(tab, suffix)
-                                for k, v in data.items(): current_record[f"{k}{suffix}"] = v
-                            else:
-                                raise Exception(f"Case 3 DOM寻址失败：列表内缺失单据 {target_code}")
-
-                    # 对于未达到最高列数（5个）的剩余字段，进行占位符填充处理
-                    start_fill = max(e_count, 1 if e_count == 0 else e_count) + 1
-                    for j in range(start_fill, 6):
-                        current_record[f"项目名称_{j:02d}"] = "无此工程"
-
-                # ---------------------------------------------------------
-                # 第四阶段：状态重置与正常跳出
-                # ---------------------------------------------------------
-                tab.ele('#btnclear').click()
-                tab.wait(1)
-                break  # 当前编号所有流程执行无误，主动终止重试循环
-
+                # [V2.4.0] 失败时交由分级自愈策略，按故障类型与各级实测代价选择起点逐级恢复并重试
+                current_record = policy.run(attempt_once, label=f"编号 [{code}]")
             except Exception as e:
-                # ---------------------------------------------------------
-                # 异常接管与自愈处理模块
-                # ---------------------------------------------------------
-                print(f"    [异常捕获] 流程中断: {e}")
-                if attempt < max_try:
-                    print("    [容错机制] 尝试执行局部视图重载 (DOM Refresh)...")
-                    try:
-                        tab.refresh()
-                        tab.wait(3)
-                        # 视图重载后执行二次校验，确认核心DOM元素是否恢复
-                        if not tab.ele('#projectcode', timeout=2):
-                            raise Exception("刷新后核心DOM结构依然残缺")
-                    except Exception as inner_e:
-                        print(f"    [深度容错] 局部恢复失败 ({inner_e})，触发全局环境重建机制！")
-                        # 当系统级假死导致局部刷新无效时，调用外部模块执行跨页签的彻底清理与重新导航
-                        erp_information.reset_and_back_to_home(page)
-                        tab = erp_information.setup_search_environment(page)
-                else:
-                    print("    [中断判定] 已达到最大重试上限，记录异常状态并跳过该任务。")
-                    current_record = get_information_template(code, "运行异常跳过")
+                print(f"    [中断判定] 自愈步数已耗尽 ({e})，记录异常状态并跳过该任务。")
+                current_record = get_information_template(code, "运行异常跳过")
+
+            if current_record.get("工程数") == "查无此项目":
+                erp_cache.put_negative(NEGATIVE_NAMESPACE, code, "查无此项目")
+            elif current_record.get("工程数") != "运行异常跳过":
+                erp_cache.drop_negative(NEGATIVE_NAMESPACE, code)
+                # [V2.4.0 新增] 表头工程数与工程数嗅探 (功能2/3) 读取的是同一工作台表头，顺带写入工程数缓存
+                erp_cache.put_counts({code: current_record["工程数"]})
 
         # ---------------------------------------------------------
         # 第五阶段：数据清洗与聚合（后处理）
         # ---------------------------------------------------------
         if current_record and current_record.get("工程数") not in ["查无此项目", "运行异常跳过"]:
-            # 直接提取首个工程的核心属性映射至汇总级
-            current_record["汇总_项目名称"] = current_record.get("项目名称_01", "")
-            current_record["汇总_项目状态"] = current_record.get("项目状态_01", "")
+            # 直接提取首个工程的核心属性映射至汇总级 ([V2.4.0] 汇总列随列投影省略时不再回填)
+            if "汇总_项目名称" in current_record:
+                current_record["汇总_项目名称"] = current_record.get("项目名称_01", "")
+            if "汇总_项目状态" in current_record:
+                current_record["汇总_项目状态"] = current_record.get("项目状态_01", "")
 
             sg_list = []
             fb_list = []
@@ -261,8 +348,10 @@ def run_data_cycle(page, tab, codes_list, output_file):
                     fb_list.append(fb_val)
 
             # 将归集后的数组元素通过固定分隔符拼接为最终可展示的字符串格式
-            current_record["汇总_施工单位"] = " / ".join(sg_list)
-            current_record["汇总_分包单位"] = " / ".join(fb_list)
+            if "汇总_施工单位" in current_record:
+                current_record["汇总_施工单位"] = " / ".join(sg_list)
+            if "汇总_分包单位" in current_record:
+                current_record["汇总_分包单位"] = " / ".join(fb_list)
 
             # 在控制台格式化输出最终聚合结果，提供实时状态监控
             print("-" * 50)
@@ -281,4 +370,5 @@ def run_data_cycle(page, tab, codes_list, output_file):
         all_results.append(current_record)
         data_excel.save_data_to_excel(all_results, output_file)
 
+    erp_recovery.summary()
     return all_results
\ No newline at end of file
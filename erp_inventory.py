@@ -3,6 +3,16 @@ ValkyrieEngine 盘点流程查询业务模块 (V2.1.0版)
 功能：负责处理【项目材料竣工数量盘点】业务线的前期页面导航与环境初始化。
 """
 
+import erp_list_state  # [V2.4.0 新增] 列表检索状态存档，支持按地址直达已配置的列表
+
+# [V2.4.0 新增] 列表状态存档的业务键，以及列表渲染完毕的锚点
+STATE_KEY = 'inventory'
+RENDER_ANCHOR = 'text:_01-'
+
+# [V2.4.0 新增] 业务列表地址 (尚未挂载筛选条件时的页面地址)
+# 首次经菜单导航进入列表后自动记录，供备用检索标签页按地址直达构建，跳过首页菜单导航。
+LIST_URL = None
+
 
 def reset_and_back_to_home(page):
     """
@@ -39,6 +49,10 @@ def apply_search_conditions(tab):
     # [核心防错机制] 强制等待 2 秒，确保 AJAX 异步数据渲染完毕，护航级稳定性保障！
     tab.wait(2)
 
+    # [V2.4.0 新增] 页面稳定后、挂载条件前，记录业务列表地址
+    global LIST_URL
+    LIST_URL = tab.url
+
     print("[参数配置] 正在设置业务筛选条件...")
 
     # 【定位与操作 1】：通过元素属性锁定单选按钮
@@ -74,35 +88,65 @@ def apply_search_conditions(tab):
         print(f"[系统警报] 致命超时：30秒内未检测到 '_01-' 数据，网络严重阻塞！")
         raise Exception("ListRenderTimeout: 列表渲染严重超时，拒绝执行后续脏数据抓取。")
 
+    # [V2.4.0 新增] 筛选条件挂载成功，存档列表地址与筛选区状态，后续可直达已配置的列表
+    erp_list_state.capture_list_state(STATE_KEY, LIST_URL, tab)
+
+
+def open_search_tab(page):
+    """
+    查询标签页单次构建模块
+    功能：导航至【项目材料竣工数量盘点】列表并挂载初始筛选条件，只尝试一次、失败直接抛出，不触发页面重置。
+    """
+    # 触发菜单栏 '流程查询'
+    page.ele('text:流程查询', timeout=15).click()
+    print("[环境导航] 触发菜单栏 '流程查询'")
+
+    # 将代码的控制权（句柄）移交至最新弹出的页面对象上
+    tab = page.latest_tab
+
+    # 【核心修改点】：在新的页面中，寻找盘点业务专属的入口并点击
+    tab.ele('text:项目材料竣工数量盘点', timeout=15).click()
+    print("[环境导航] 成功进入【项目材料竣工数量盘点】业务列表...")
+
+    # 页面导航完成，调用独立模块执行具体的筛选框勾选逻辑
+    apply_search_conditions(tab)
+
+    print("[环境导航] 盘点业务查询环境初始化完毕，检索条件已挂载。")
+    return tab
+
+
+def restore_search_tab(page, tab_guard=None, on_created=None):
+    """
+    [V2.4.0 新增] 查询标签页存档直达模块
+    功能：按已存档的列表状态直接打开已挂载筛选条件的盘点列表并校验筛选状态，跳过菜单导航与筛选点击。
+    返回：校验通过的标签页；无存档或校验失败时返回 None。
+    """
+    global LIST_URL
+    tab = erp_list_state.open_configured_tab(page, STATE_KEY, RENDER_ANCHOR,
+                                             tab_guard=tab_guard, on_created=on_created)
+    if tab is not None and not LIST_URL:
+        LIST_URL = erp_list_state.load_list_state(STATE_KEY).get("list_url")
+    return tab
+
+
 def setup_search_environment(page):
     """
     查询环境导航总控模块
     功能：控制浏览器从首页逐步导航至具体的盘点业务查询列表，并挂载初始筛选条件。
     """
+    # [V2.4.0 新增] 优先按存档直达已配置的列表，存档缺失或校验失败时再走菜单导航
+    tab = restore_search_tab(page)
+    if tab is not None:
+        return tab
+
     max_try = 3  # 定义最大容错重试次数
 
     for attempt in range(1, max_try + 1):
         print(f"\n[环境导航 - 第 {attempt}/{max_try} 次尝试] 正在进入盘点流程查询界面...")
 
         try:
-            # 触发菜单栏 '流程查询'
-            page.ele('text:流程查询', timeout=15).click()
-            print("[环境导航] 触发菜单栏 '流程查询'")
-
-            # 将代码的控制权（句柄）移交至最新弹出的页面对象上
-            tab = page.latest_tab
-
-            # 【核心修改点】：在新的页面中，寻找盘点业务专属的入口并点击
-            tab.ele('text:项目材料竣工数量盘点', timeout=15).click()
-            print("[环境导航] 成功进入【项目材料竣工数量盘点】业务列表...")
-
-            # 页面导航完成，调用独立模块执行具体的筛选框勾选逻辑
-            apply_search_conditions(tab)
-
-            print("[环境导航] 盘点业务查询环境初始化完毕，检索条件已挂载。")
-
             # 返回初始化完毕的标签页对象，供后续的数据提取模块使用
-            return tab
+            return open_search_tab(page)
 
         except Exception as e:
             print(f"[系统警报] 第 {attempt} 次加载未响应，错误详情：{e}")
@@ -10,11 +10,30 @@ ValkyrieEngine 盘点流程查询-数据提取模块 (V2.1.0 报表结构优化
   5. [V2.1.0 新增] 报表结构扩展：
      - 新增“工程数”列，展示该项目实际包含的工程数量。
      - 扩展状态列至 _05 (max_columns=5)，覆盖更多业务场景，且不影响检索效率。
+  6. [V2.4.0 优化] 单次列表扫描：一次页面脚本调用读取该项目的全部单据行，
+     工程数超过 5 个的项目按需追加 _06 及以后的状态列，不再被固定上限隐藏。
+  7. [V2.4.0 新增] 整表采集模式：输入编号较多时，改为经列表数据接口分页采集整张盘点列表，
+     在本地索引中直接回答全部编号 (与逐个检索的取舍由 erp_list_harvest 实测估算后自动决定)；
+     不整表采集时，密集成段的编号按共享前缀批量检索 (erp_query_planner)。
 """
 
 import time
-import erp_inventory  # 导入盘点的专属页面初始化模块，用于调用异常自愈重置功能
+import config
 import data_excel  # 引入数据 I/O 模块，用于实现实时自动存档
+import erp_list_search  # [V2.4.0 新增] 通用列表检索原子库
+import erp_watchdog  # [V2.4.0 新增] 单任务看门狗
+import erp_recovery  # [V2.4.0 新增] 分级自愈策略
+import erp_page_reader  # [V2.4.0 新增] 页面批量读取
+import erp_latency  # [V2.4.0 新增] 检索耗时统计，用于整表采集的取舍估算
+import erp_fundamental  # [V2.4.0 新增] 工程数无法由检索结果推导时，回退至工作台单查
+import erp_http  # [V2.4.0 新增] 列表数据请求模板的学习与重放
+import erp_list_harvest  # [V2.4.0 新增] 盘点列表整表采集
+import erp_query_planner  # [V2.4.0 新增] 前缀批量检索
+import erp_login  # [V2.4.0 新增] 整表采集复用登录会话快照
+import erp_refresh  # [V2.4.0 新增] 增量刷新的工程数核对
+
+# [V2.4.0 新增] 整表采集前最多以几个编号的界面检索学习列表数据接口 (须有单据行才能校验)
+HARVEST_PROBES = 3
 
 
 def get_inventory_record(code, known_count=3, max_columns=5):
@@ -25,8 +44,8 @@ def get_inventory_record(code, known_count=3, max_columns=5):
 
     参数解析：
       - known_count: 该项目实际拥有的工程数量。目前版本默认传 3，未来通过新模块传入准确值。
-      - max_columns: [V2.1.0 修改] 默认值扩展为 5。无论实际有几个工程，Excel 表格固定输出 5 列状态。
-                     (强制对齐 _01 到 _05 列不塌陷)。
+      - max_columns: [V2.1.0 修改] 默认值扩展为 5。无论实际有几个工程，Excel 表格至少输出 5 列状态。
+                     (强制对齐 _01 到 _05 列不塌陷；[V2.4.0] 工程数更多时由调用方按需传入更大的列数)。
     """
     # 建立基础字典，存入项目维度的根编号
     # 【V2.1.0 新增】初始化 '项目名称' 字段。默认值为 "未找到已结束单据"。
@@ -78,171 +97,304 @@ def extract_project_name(full_text):
         return "名称解析错误"
 
 
-def search_and_process_single(page, search_tab, code, known_count=3):
+def parse_list_rows(code, texts):
     """
-    单一项目检索与定向嗅探模块
-    功能：处理目标查询页面的残留状态，输入目标编号发起检索，并对已知范围内的工程节点进行独立无序扫描。
+    [V2.4.0 新增] 列表行解析器
+    功能：把列表中所有包含该项目编号的主题文本解析为 {后缀序号: 项目名称}。
+    识别规则见 erp_list_search.match_suffix，后缀不设上限，不再受 5 个工程的上限约束。
     """
-    try:
-        # ==========================================
-        # 阶段 1：页面状态重置 (残留标签清理)
-        # ==========================================
-        # 逻辑：系统执行搜索后，输入框会被隐藏，取而代之的是“主题: Dxxx”的展示标签。
-        # 必须定位并清除该标签，才能恢复搜索输入框进行下一次查询。
-        old_tag = search_tab.ele('text:主题:', timeout=2)
-
-        if old_tag:
-            print("[检索准备] 检测到历史查询残留标签，正在执行清除操作...")
-            try:
-                # 优先逻辑：通过 parent() 向上一层寻找包裹标签的父容器，再寻找包含 cancel 样式的关闭按钮
-                old_tag.parent().ele('@class=cancel').click()
-            except:
-                # 备用逻辑：若父容器结构变化，直接尝试点击标签文本旁边的下一个相邻节点
-                old_tag.next().click()
-
-            # 【护航级维稳】标签被清除后，页面会触发局部重绘显示输入框，需强制挂起等待 2 秒
-            search_tab.wait(2)
+    rows = {}
+    for text in texts:
+        matched = erp_list_search.match_suffix(code, text)
+        if matched:
+            index, start = matched
+            rows.setdefault(index, extract_project_name(text[start:]))
+    return rows
 
-        # ==========================================
-        # 阶段 2：输入框定位与检索触发
-        # ==========================================
-        # 优先使用 Landray 框架底层静态属性 data-lui-placeholder 定位，避免受页面状态影响
-        search_box = search_tab.ele('@data-lui-placeholder=请输入主题', timeout=10)
 
-        # 若底层属性失效，降级使用常规的 placeholder 属性进行定位
-        if not search_box:
-            search_box = search_tab.ele('@placeholder=请输入主题', timeout=10)
+def read_project_rows(search_tab, code, cancel_event=None):
+    """
+    单一项目检索与列表读取阶段 (可被对冲)
+    功能：处理目标查询页面的残留状态，输入目标编号发起检索，并一次性读取列表中该项目的全部单据行。
+    返回：{后缀序号: 项目名称}
+    """
+    # ==========================================
+    # 阶段 1 & 2：残留标签清理 + 检索触发
+    # ==========================================
+    print(f"[数据检索] 检索指令已发送，当前处理编号：[{code}]，等待服务器响应...")
+    erp_list_search.submit_subject_search(search_tab, code, box_timeout=10, tag_timeout=2, tag_settle=2,
+                                          settle=0, cancel_event=cancel_event)
+
+    # ==========================================
+    # 阶段 3：列表渲染等待 + 单次全量读取
+    # ==========================================
+    # [V2.4.0 优化] 取代“固定等待 6 秒 + 逐后缀 ele(timeout=1) 嗅探”：
+    # 每次轮询用一次页面脚本读取全部含 “编号_” 的单据行，一旦出现该项目的单据即视为列表渲染完毕。
+    # 【V2.1.0 经验保留】6 秒仍是列表渲染的宽容上限：超过 6 秒仍无单据，才判定该项目暂无已结束单据。
+    rows = {}
+    deadline = time.time() + 6
+    while True:
+        erp_list_search.check_cancelled(cancel_event)
+        rows = parse_list_rows(code, erp_page_reader.find_texts(search_tab, f"{code}_"))
+        if rows or time.time() >= deadline:
+            break
+        time.sleep(0.5)
+    return rows
+
+
+def scan_project(search_tab, code, known_count=3, cancel_event=None):
+    """
+    单一项目检索与列表扫描阶段 (可被对冲)
+    本阶段只在列表页读取数据，可被检索标签页池在主/备两个标签页上同时执行。
+    """
+    return build_inventory_record(code, known_count, read_project_rows(search_tab, code, cancel_event))
+
 
-        # 清除输入框内可能存在的数据，填入新编号，并追加换行符 \n 模拟物理回车操作，触发强力搜索
-        search_box.clear().input(f'{code}\n')
-        print(f"[数据检索] 检索指令已发送，当前处理编号：[{code}]，等待服务器响应...")
+def build_inventory_record(code, known_count, rows):
+    """
+    按列表中该项目的单据行 ({后缀序号: 项目名称}) 生成盘点记录
+    [V2.4.0] known_count 为 None 时 (ENGINEERING_COUNT_SOURCE = search)，以列表中出现的最大后缀作为工程数；
+    列表中没有任何单据时返回 None，由调用方回退至工作台单查。
+    """
+    if known_count is None:
+        if not rows:
+            return None
+        known_count = max(rows)
+        print(f"[工程数推导] [{code}] 由检索结果推导工程数：{known_count}")
+
+    # 状态列数按需扩展：覆盖已知工程数与列表中实际出现的最大后缀，下限保持 5 列
+    max_columns = max([5, known_count] + list(rows))
+    record = get_inventory_record(code, known_count=known_count, max_columns=max_columns)
+
+    print(f"[业务判定] [{code}] 列表中共发现 {len(rows)} 条已结束单据 (系统已知该项目工程数: {known_count})")
+
+    for index in sorted(rows):
+        suffix = f"_{index:02d}"
+        # 更新状态：哪怕只有这一个存在，状态也能被正确记录 (乱序流转、超出已知工程数的单据同样如实记录)
+        record[f"{suffix}工程状态"] = "结束"
+        print(f"  --> [命中] 发现靶标 [{code}{suffix}-]，状态更新为：结束")
+
+        # [V2.2.0] 顺手牵羊抓取项目名称：取后缀最小的一条单据
+        if record["项目名称"] == "未找到已结束单据":
+            record["项目名称"] = rows[index]
+            print(f"      [信息捕获] 已从单据 [{suffix}] 中提取名称：{rows[index]}")
+
+    for index in range(1, known_count + 1):
+        if index not in rows:
+            # 没找到就脱靶，get_inventory_record 里已经把它设为了"未盘点"，这里什么都不用做
+            print(f"  --> [脱靶] 未见靶标 [{code}_{index:02d}-]，维持合法状态：未盘点")
+
+    # 扫描完毕，直接返回这张映射得清清楚楚的字典
+    return record
 
-        # 【V2.1.0 修复：放慢节奏】将原本的 4 秒增加到 6 秒。
-        # 给 ERP 系统的后台数据库留出足够的检索与渲染时间，防止我们过快介入导致“竞态条件”错过数据。
-        search_tab.wait(6)
 
-        # ==========================================
-        # 阶段 3：工程维度独立无序嗅探 (核心狙击逻辑 + 动态边界 + 名称抓取)
-        # ==========================================
-        # 调用初始化函数，把 known_count 传进去
-        # 【V2.1.0】这里 max_columns 默认已经是 5 了，record 里会预置好 5 个状态坑位
-        record = get_inventory_record(code, known_count=known_count)
-
-        print(f"[业务判定] 正在对 [{code}] 展开工程维度雷达扫描 (系统已知该项目工程数: {known_count})...")
-
-        # 标记位：用于防止重复抓取名称。
-        is_name_extracted = False
-
-        # 【核心性能优化】：只扫描已知范围内的后缀！
-        # 这里的循环保证了我们不会错过任何一个存在的后缀。
-        # 【重要】即使 max_columns 是 5，如果 known_count 是 2，循环只跑 2 次。绝不浪费时间！
-        for i in range(1, known_count + 1):
-            # 格式化生成当前需要扫描的后缀，如 "_01"
-            suffix = f"_{i:02d}"
-            # 组合成精确的特征靶标，必须附带短横杠（如 "D1221420034_01-"），这是防止误判其他相似编号的定海神针！
-            target_text = f"{code}{suffix}-"
-
-            # 使用隐式等待短暂探测（timeout=1 足矣，因为我们前面 wait(6) 已经确保列表渲染完毕了）
-            # 【V2.2.0 修改】我们需要获取这个元素对象，不仅仅是判断它存在，还要读它的文本
-            target_element = search_tab.ele(f'text:{target_text}', timeout=1)
-
-            if target_element:
-                # 1. 更新状态：哪怕只有这一个存在，状态也能被正确记录
-                record[f"{suffix}工程状态"] = "结束"
-                print(f"  --> [命中] 发现靶标 [{target_text}]，状态更新为：结束")
-
-                # 2. [V2.2.0 新增] 顺手牵羊抓取项目名称
-                if not is_name_extracted:
-                    full_text = target_element.text # 获取整行主题文本
-                    extracted_name = extract_project_name(full_text)
-                    record["项目名称"] = extracted_name
-                    is_name_extracted = True # 标记已完成
-                    print(f"      [信息捕获] 已从单据 [{suffix}] 中提取名称：{extracted_name}")
-            else:
-                # 没找到就脱靶，由于我们在 get_inventory_record 里已经把它设为了"未盘点"，这里其实什么都不用做
-                print(f"  --> [脱靶] 未见靶标 [{target_text}]，维持合法状态：未盘点")
+def prepare_harvest(search_pool, tasks):
+    """
+    [V2.4.0 新增] 整表采集 / 批量检索准备
+    功能：以前几个编号的界面检索学习列表数据接口 (直至某个编号在列表中有单据行、可供校验)，
+    再交由 erp_list_harvest 估算“整表采集”与“逐个检索”的耗时，并在前者更快时完成采集；
+    不整表采集时，改由 erp_query_planner 对密集成段的编号按前缀批量检索。
+    参数 tasks：[(编号, 工程数), ...]
+    返回：(已回答的编号 {项目编号: [主题文本, ...]} 或 None, {编号: 学习期间已完成的记录})
+    """
+    done = {}
+    for code, known_count in tasks[:HARVEST_PROBES]:
+        tab = search_pool.active
+        start = time.time()
+        try:
+            rows, templates = erp_http.capture_templates(
+                tab, code, erp_list_harvest.KEYWORD_PLACEHOLDER,
+                lambda: erp_watchdog.run_with_deadline(search_pool.page, read_project_rows, (tab, code),
+                                                       suspect_tabs=search_pool.suspect_tabs,
+                                                       protected_tabs=search_pool.protected_tab_ids,
+                                                       cancellable=True))
+        except Exception as e:
+            print(f"[整表采集] 接口学习期间的检索失败，改为逐个检索: {e}")
+            return None, done
+        erp_latency.record_latency('f3_search', time.time() - start)
+
+        record = build_inventory_record(code, known_count, rows)
+        if record is not None:
+            done[code] = record
+        if not rows:
+            continue
+
+        template = erp_list_harvest.pick_template(templates, code, rows, parse_list_rows)
+        if template is None:
+            return None, done
+
+        pending = [c for c, _ in tasks if c not in done]
+        if config.LIST_HARVEST != 'off':
+            search_seconds = erp_latency.get_percentile('f3_search', 50)
+            index = erp_list_harvest.plan_harvest(template, code, rows, parse_list_rows, len(pending), search_seconds)
+            if index is not None:
+                return {c: index.get(c, []) for c in pending}, done
+
+        if config.PREFIX_BATCH:
+            # [V2.4.0 新增] 不整表采集时，密集成段的编号按共享前缀批量检索
+            return erp_query_planner.resolve(template, pending, erp_list_harvest.subject_list, lambda text: text), done
+        return None, done
+
+    print("[整表采集] 前几个编号在列表中均无单据，无法校验列表数据接口，改为逐个检索。")
+    return None, done
+
+
+def is_final(row, count):
+    """
+    [V2.4.0 新增] 增量刷新的终态判定：全部工程均为“结束”或“无此工程”，且记录的工程数与当前真实工程数 count 一致时，
+    整行不会再变化 (项目新增工程后，原先的“无此工程”不再成立)；
+    含“未盘点”或检索失败的记录仍需重新查询 (一次列表检索即可读出全部工程，按项目整行重新查询)
+    """
+    if not row or not erp_refresh.count_matches(row, count):
+        return False
+    statuses = [value for key, value in row.items() if key.endswith("工程状态")]
+    return bool(statuses) and all(value in ("结束", "无此工程") for value in statuses)
+
 
-        # 扫描完毕，直接返回这张映射得清清楚楚的字典
+def align_status_columns(records):
+    """
+    [V2.4.0 新增] 状态列对齐
+    功能：个别项目的工程数超过 5 个时会动态追加 _06 及以后的状态列，
+    导出前为其余记录补齐这些列 (填“无此工程”)，保证 Excel 列名严格对齐、不出现空白格。
+    """
+    status_keys = []
+    for record in records:
+        for key in record:
+            if key.endswith("工程状态") and key not in status_keys:
+                status_keys.append(key)
+
+    for record in records:
+        for key in status_keys:
+            record.setdefault(key, "无此工程")
+    return records
+
+
+def search_and_process_single(page, search_pool, code, known_count=3, answers=None, cancel_event=None):
+    """
+    单一项目检索与定向嗅探模块
+    功能：通过检索标签页池执行检索与扫描，统一将页面级异常转换为 SearchTimeout 交由上层自愈。
+    [V2.4.0] 编号已由整表采集或前缀批量检索回答 (answers) 时，直接由其结果生成记录，不再检索；
+    cancel_event 为看门狗的取消信号，任务被放弃后不再操作浏览器。
+    """
+    try:
+        if answers is not None and code in answers:
+            record = build_inventory_record(code, known_count, parse_list_rows(code, answers[code]))
+        else:
+            _, record = search_pool.search('f3_search', scan_project, code, known_count, cancel_event=cancel_event)
+
+        if record is None:
+            # [V2.4.0] 项目暂无任何已结束单据，无法由检索结果推导工程数：回退至工作台单查
+            erp_list_search.check_cancelled(cancel_event)
+            print(f"[工程数推导] [{code}] 检索结果中没有任何单据，回退至工作台查询工程数...")
+            known_count = erp_fundamental.get_engineering_count(page, code, tab_guard=search_pool.creating_tab)
+            record = get_inventory_record(code, known_count=known_count, max_columns=max(5, known_count))
         return record
 
     except Exception as e:
         # 捕获检索及 DOM 交互过程中引发的系统级异常（如断网、页面彻底卡死无响应）
         print(f"[系统警报] 处理编号 [{code}] 时发生页面崩溃或响应超时，错误信息：{e}")
-        # 向上级总控模块抛出自定义异常，请求重置干预
-        raise Exception("SearchTimeout")
+        # 向上级总控模块抛出自定义异常，请求重置干预 (保留原始异常链，供分级自愈策略判定故障类型)
+        raise Exception("SearchTimeout") from e
 
 
-def run_data_cycle(page, search_tab, codes_data, output_file):
+def run_data_cycle(page, search_pool, codes_data, output_file, previous=None):
     """
     批量数据检索主控循环模块
     功能：遍历待处理的数据，调用单次查询逻辑。包含应对页面级卡顿的自愈重启策略与实时存档。
 
     参数解析：
       - codes_data: 接收包含字典的列表 (如 [{'项目编号': 'D123', '工程数': 2}])。
+                    [V2.4.0] 工程数为 None 表示由检索结果推导 (ENGINEERING_COUNT_SOURCE = search)。
+      - previous: [V2.4.0] 增量刷新的底稿 {编号: 上次输出的行}，终态编号直接沿用上次结果，不再检索。
     """
     total = len(codes_data)
     all_results = []
+    policy = erp_recovery.for_search_pool(search_pool)
+    previous = previous or {}
 
-    for index, item in enumerate(codes_data, start=1):
-
+    tasks = []
+    for item in codes_data:
         # ==========================================
         # 兼容层：智能解析传入的数据类型
         # ==========================================
         if isinstance(item, dict):
             # 未来的理想状态：item 是一个字典，直接提取编号和准确的工程数
-            code = item.get("项目编号")
             # 【重点】这里获取到的真实工程数，会一路传给 get_inventory_record，覆盖掉默认的 3
-            known_count = item.get("工程数", 3)
+            tasks.append((item.get("项目编号"), item.get("工程数", 3)))
         else:
             # 现在的状态：item 只是一个字符串编号，我们就保守起见，默认查到 3
-            code = item
-            known_count = 3
-
-        print(f"\n[任务进度 {index}/{total}] 开始分配任务，当前执行编号: {code} (计划精确嗅探 {known_count} 个工程)")
-
-        # 设定单次任务的最大容错重试次数
-        max_retries = 2
+            tasks.append((item, 3))
+    codes = [task[0] for task in tasks]
+
+    # [V2.4.0 新增] 整表采集 / 前缀批量检索：接口可用时，由整表索引或批量检索结果直接回答编号
+    # (增量刷新沿用的编号不参与采集的取舍估算)
+    pending = [task for task in tasks if not is_final(previous.get(task[0]), task[1])]
+    answers, done = None, {}
+    if (config.LIST_HARVEST != 'off' or config.PREFIX_BATCH) and erp_login.session_snapshot() is not None \
+            and len(pending) > 1:
+        answers, done = prepare_harvest(search_pool, pending)
+
+    for index, (code, known_count) in enumerate(tasks, start=1):
+
+        if is_final(previous.get(code), known_count):
+            # [V2.4.0 新增] 增量刷新：全部工程均已结束且工程数未变，原样沿用上次结果
+            print(f"\n[任务进度 {index}/{total}] 编号 {code} 上次结果已是终态，直接沿用。")
+            all_results.append(dict(previous[code]))
+            continue
+
+        if known_count is None:
+            print(f"\n[任务进度 {index}/{total}] 开始分配任务，当前执行编号: {code} (工程数由检索结果推导)")
+        else:
+            print(f"\n[任务进度 {index}/{total}] 开始分配任务，当前执行编号: {code} (计划精确嗅探 {known_count} 个工程)")
 
-        for attempt in range(1, max_retries + 1):
-            try:
+        try:
+            if code in done:
+                # 整表采集的接口学习期间已完成检索
+                record = done[code]
+            else:
                 # 把解析出的 code 和 known_count 透传给底层核心处理函数
-                record = search_and_process_single(page, search_tab, code, known_count=known_count)
-                all_results.append(record)
-
-                print(f"[任务完成] [{code}] 处理完毕，已压入内存栈。")
-                break  # 当前编号处理成功，跳出重试循环，执行下一个编号
-
-            except Exception as e:
-                # 接收来自下层抛出的超时异常，触发自愈干预
-                print(f"[自愈干预] 第 {attempt} 次处理失败，正在启动浏览器环境重置程序...")
-
-                if attempt < max_retries:
-                    # 联动专属盘点模块的重置功能，清理多余标签并刷新恢复干净的业务页面
-                    erp_inventory.reset_and_back_to_home(page)
-                    search_tab = erp_inventory.setup_search_environment(page)
-                else:
-                    # 超过最大重试次数，判定该数据异常或网络中断严重
-                    print(f"[业务放弃] 编号 [{code}] 导致程序反复超时，已跳过该节点。")
-
-                    # 【核心容错机制】：生成一个包含已知信息的报错字典，保证总体进度不受单一数据影响，且列名依旧对齐！
-                    # 这里调用的 get_inventory_record 也会生成带有“工程数”字段的记录，保持队形整齐
-                    error_record = get_inventory_record(code, known_count=known_count)
-
-                    # 报错时，名称也得占位
-                    error_record["项目名称"] = "抓取失败(网页卡死)"
-
-                    # 强行遍历，把带有"工程状态"的键的值全部覆盖为报错提示
-                    for k in error_record:
-                        if "工程状态" in k:
-                            error_record[k] = "网页连续卡死失败"
-                    all_results.append(error_record)
+                # [V2.4.0] 失败时交由分级自愈策略，按故障类型与各级实测代价选择起点逐级恢复并重试
+                record = policy.run(lambda: erp_watchdog.run_with_deadline(
+                    search_pool.page, search_and_process_single,
+                    (search_pool.page, search_pool, code, known_count, answers),
+                    suspect_tabs=search_pool.suspect_tabs,
+                    protected_tabs=search_pool.protected_tab_ids, cancellable=True), label=f"编号 [{code}]")
+            all_results.append(record)
+
+            print(f"[任务完成] [{code}] 处理完毕，已压入内存栈。")
+
+        except Exception as e:
+            # 自愈步数耗尽，判定该数据异常或网络中断严重
+            print(f"[业务放弃] 编号 [{code}] 导致程序反复超时，已跳过该节点。")
+
+            # 【核心容错机制】：生成一个包含已知信息的报错字典，保证总体进度不受单一数据影响，且列名依旧对齐！
+            # 这里调用的 get_inventory_record 也会生成带有“工程数”字段的记录，保持队形整齐
+            # [V2.4.0] 工程数尚未推导出来时，沿用工作台嗅探失败时的兜底值 3
+            error_record = get_inventory_record(code, known_count=3 if known_count is None else known_count)
+
+            # 报错时，名称也得占位
+            error_record["项目名称"] = "抓取失败(网页卡死)"
+
+            # 强行遍历，把带有"工程状态"的键的值全部覆盖为报错提示
+            for k in error_record:
+                if "工程状态" in k:
+                    error_record[k] = "网页连续卡死失败"
+            all_results.append(error_record)
 
         # ======================================================================
         # 【极致护航级实时自动存档机制】
-        # 逻辑：每当一个编号经过 1~2 次重试处理完毕，立即序列化并覆盖写入硬盘。
+        # 逻辑：每当一个编号经过重试与自愈处理完毕，立即序列化并覆盖写入硬盘。
         # 作用：确保即便程序在下一秒崩溃，之前的所有劳动成果都已安全落盘。
         # ======================================================================
         print(f"[自动存档] 正在执行进度同步，当前已安全保存 {len(all_results)} 条业务记录...")
-        data_excel.save_data_to_excel(all_results, output_file)
+        # [V2.4.0] 输出表即增量刷新的底稿：尚未处理编号的上次结果随存档保留
+        data_excel.save_data_to_excel(align_status_columns(erp_refresh.with_baseline(all_results, codes, previous)),
+                                      output_file)
+
+    if previous:
+        # [V2.4.0] 末尾沿用的编号未触发实时存档，收尾时补存一次
+        data_excel.save_data_to_excel(align_status_columns(all_results), output_file)
 
+    erp_fundamental.close_workbench()
+    erp_recovery.summary()
     return all_results
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+ValkyrieEngine 运行时延迟统计模块
+功能：以滑动窗口的方式记录各类浏览器操作（检索、详情提取、环境重建等）的真实耗时，
+并对外提供分位数查询能力（如 p95），供对冲检索等自适应调度策略作为决策依据。
+"""
+
+import math
+import threading
+from collections import deque
+
+import erp_cache
+
+# 每类操作最多保留的最近样本数量。窗口过大会让统计对网络状况的变化反应迟钝，过小则分位数抖动明显。
+WINDOW_SIZE = 200
+
+# 样本池：{操作名称: deque([耗时秒数, ...])}
+_samples = {}
+
+# 对冲检索会在多个线程中同时记录耗时，必须加锁保护样本池
+_lock = threading.Lock()
+
+
+def record_latency(op_name, seconds):
+    """
+    [统计组件] 记录一次操作耗时
+    """
+    with _lock:
+        bucket = _samples.get(op_name)
+        if bucket is None:
+            bucket = deque(maxlen=WINDOW_SIZE)
+            _samples[op_name] = bucket
+        bucket.append(float(seconds))
+
+
+def get_sample_count(op_name):
+    """
+    [统计组件] 查询某类操作当前已积累的样本数量
+    """
+    with _lock:
+        return len(_samples.get(op_name, ()))
+
+
+def get_percentile(op_name, percent, min_samples=1):
+    """
+    [统计组件] 分位数查询
+    功能：返回某类操作耗时的指定分位数（如 percent=95 即 p95）。
+    若样本数量不足 min_samples，说明统计尚未“学会”该操作的耗时分布，返回 None 由调用方自行兜底。
+    """
+    with _lock:
+        data = sorted(_samples.get(op_name, ()))
+
+    if not data or len(data) < min_samples:
+        return None
+
+    # 最近秩法 (nearest-rank)：样本量较小时也不会插值出并不存在的耗时
+    rank = max(1, math.ceil(percent / 100.0 * len(data)))
+    return data[min(rank, len(data)) - 1]
+
+
+def persist():
+    """
+    [V2.4.0 新增] 将本次运行各类操作的耗时中位数与样本数写入本地缓存 (与历次记录按样本数加权合并)，
+    供运行规划 (erp_run_planner) 预估下次运行的耗时
+    """
+    with _lock:
+        ops = [op for op, bucket in _samples.items() if bucket]
+    erp_cache.put_latency_stats({op: (get_percentile(op, 50), get_sample_count(op)) for op in ops})
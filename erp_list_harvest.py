@@ -0,0 +1,191 @@
+"""
+ValkyrieEngine 业务列表整表采集模块 (List Harvest)
+功能：复用登录会话，直接分页请求业务列表背后的数据接口，一次性采集整张已筛选列表 (如盘点列表“结束”状态、无时间限制)，
+在本地建立“项目编号 -> 单据主题”索引，由索引直接回答全部输入编号，取代逐个编号的“检索 + 渲染等待”。
+
+【设计背景】
+盘点业务线在首次检索前已挂载好筛选条件，整张列表即为全部候选数据。输入编号数以千计时，
+逐个检索的代价约为“编号数 × 单次检索耗时 (含 6 秒渲染宽容)”；而按最大每页条数翻页一遍，
+代价只是“页数 × 单页请求耗时”，且可多连接并发。两者孰快取决于输入规模与列表总条数，由 plan_harvest 实测估算后自动选择。
+
+【处理流程】
+1. 首个编号照常经界面检索，期间监听列表数据请求，记录为请求模板 (检索关键字替换为占位符，erp_http.capture_templates)；
+2. 以同一编号重放模板，解析结果与界面读数一致才可信；再以空关键字请求第 1 页，读出列表总条数并实测单页耗时；
+3. 估算两种方式的总耗时，采集更快时并发拉取其余各页，建立索引；
+4. 整表采集结果与首个编号的界面读数再次比对，不一致 (如接口不接受空关键字) 时放弃采集，回退逐个检索。
+[V2.4.0] 逐个检索更快 (输入编号较少) 时，校验通过的请求模板仍可用于前缀批量检索 (erp_query_planner)。
+"""
+
+import json
+import math
+import re
+import time
+
+import config
+import erp_http
+import erp_latency
+
+KEYWORD_PLACEHOLDER = "{keyword}"
+
+# 单据主题中的工程编号：“项目编号_NN-”，后缀至少两位数字 (与 erp_list_search.match_suffix 的识别规则一致)
+SUBJECT_RE = re.compile(r'(?<![A-Za-z0-9])([A-Za-z0-9]+)_\d{2,}-')
+
+# 列表数据响应中的总条数字段 (Landray 列表接口为 page.totalSize，兼容常见的其他写法)
+TOTAL_RE = re.compile(r'"?(?:totalSize|totalrows|totalCount|total)"?\s*[:=]\s*"?(\d+)', re.IGNORECASE)
+
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def with_params(template, params):
+    """
+    改写请求模板中的分页参数：模板的 URL 或请求体中已有该参数时原位替换，否则追加至 URL 查询串
+    """
+    template = dict(template)
+    for name, value in params.items():
+        pattern = re.compile(rf'(?<=[?&]){re.escape(name)}=[^&]*')
+        body = template["body"]
+        if pattern.search(template["url"]):
+            template["url"] = pattern.sub(f"{name}={value}", template["url"])
+        elif isinstance(body, dict) and name in body:
+            template["body"] = dict(body, **{name: str(value)})
+        elif isinstance(body, str) and re.search(rf'(?:^|&){re.escape(name)}=', body):
+            template["body"] = re.sub(rf'(^|&){re.escape(name)}=[^&]*', rf'\g<1>{name}={value}', body)
+        else:
+            template["url"] += ('&' if '?' in template["url"] else '?') + f"{name}={value}"
+    return template
+
+
+def request_page(template, keyword, page_no, page_size):
+    """
+    请求列表的一页数据，返回响应文本 (失败时抛出 Exception)
+    """
+    paged = with_params(template, {config.HARVEST_PAGE_PARAM: page_no, config.HARVEST_SIZE_PARAM: page_size})
+    return erp_http.request_template(paged, KEYWORD_PLACEHOLDER, keyword, "http_list_page")
+
+
+def _strings(node):
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _strings(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _strings(value)
+
+
+def subject_texts(text):
+    """
+    从列表数据响应中取出全部单据主题文本
+    返回：{项目编号: [自“项目编号_NN-”起的主题文本, ...]}。响应为 JSON 时逐个字符串值识别，否则按 HTML/文本整体识别。
+    """
+    try:
+        strings = list(_strings(json.loads(text)))
+    except ValueError:
+        strings = [text]
+
+    found = {}
+    for raw in strings:
+        plain = TAG_RE.sub('', raw)
+        for match in SUBJECT_RE.finditer(plain):
+            # 主题文本截至行尾，名称解析规则 (两个短横杠之间) 由业务线自行处理
+            found.setdefault(match.group(1), []).append(plain[match.start():].split('\n')[0])
+    return found
+
+
+def total_count(text):
+    matched = TOTAL_RE.search(text)
+    return int(matched.group(1)) if matched else None
+
+
+def subject_list(text):
+    """
+    一页列表数据中的全部单据主题文本 (供前缀批量检索逐个匹配编号)
+    """
+    return [item for items in subject_texts(text).values() for item in items]
+
+
+def merge_index(index, texts):
+    for code, items in texts.items():
+        index.setdefault(code, []).extend(items)
+    return index
+
+
+def validate_template(template, code, rows, parse_rows):
+    """
+    以首个编号重放模板：解析出的后缀集合与界面读数一致才可信
+    """
+    try:
+        text = request_page(template, code, 1, config.HARVEST_PAGE_SIZE)
+    except Exception as e:
+        print(f"[整表采集] 列表接口重放失败: {e}")
+        return False
+    return set(parse_rows(code, subject_texts(text).get(code, []))) == set(rows)
+
+
+def pick_template(templates, code, rows, parse_rows):
+    """
+    从界面检索期间捕获的请求模板中选出可重放的列表数据接口
+    参数 code / rows / parse_rows 见 validate_template。返回：校验通过的模板；均不可用时返回 None。
+    """
+    template = next((t for t in templates if validate_template(t, code, rows, parse_rows)), None)
+    if template is None:
+        print("[整表采集] 未能识别出可重放的列表数据接口，继续逐个检索。")
+    return template
+
+
+def plan_harvest(template, code, rows, parse_rows, remaining, search_seconds):
+    """
+    [控制器] 采集决策与执行
+    参数：
+      - template: 已校验的列表数据请求模板 (pick_template)
+      - code / rows: 首个编号及其界面读数 ({后缀序号: ...})，用于校验
+      - parse_rows: 业务线的列表行解析函数，签名 parse_rows(code, texts) -> {后缀序号: ...}
+      - remaining: 尚待处理的编号数量
+      - search_seconds: 单个编号逐个检索的实测耗时 (秒)
+    返回：{项目编号: [主题文本, ...]} 整表索引；请求失败、校验失败或逐个检索更快时返回 None。
+    """
+    page_size = config.HARVEST_PAGE_SIZE
+    try:
+        start = time.time()
+        first = request_page(template, "", 1, page_size)
+        page_seconds = time.time() - start
+    except Exception as e:
+        print(f"[整表采集] 整表第 1 页请求失败，继续逐个检索: {e}")
+        return None
+
+    total = total_count(first)
+    if total is None:
+        print("[整表采集] 列表响应中未找到总条数，无法估算翻页代价，继续逐个检索。")
+        return None
+
+    pages = max(1, math.ceil(total / page_size))
+    harvest_cost = math.ceil((pages - 1) / config.HTTP_WORKERS) * page_seconds
+    search_cost = remaining * search_seconds
+    print(f"[整表采集] 列表共 {total} 条 ({pages} 页 × {page_size} 条)。预估耗时：整表采集 {harvest_cost:.0f} 秒，"
+          f"逐个检索 {search_cost:.0f} 秒 ({remaining} 个编号)。")
+    if config.LIST_HARVEST != 'force' and harvest_cost >= search_cost:
+        print("[整表采集] 逐个检索更快，本次不采集。")
+        return None
+
+    index = merge_index({}, subject_texts(first))
+    futures = [erp_http.submit_task(request_page, template, "", page_no, page_size) for page_no in range(2, pages + 1)]
+    try:
+        for page_no, future in enumerate(futures, start=2):
+            merge_index(index, subject_texts(future.result()))
+            if page_no % 10 == 0:
+                print(f"[整表采集] 已采集 {page_no}/{pages} 页...")
+    except Exception as e:
+        for future in futures:
+            future.cancel()
+        print(f"[整表采集] 翻页请求失败，放弃采集并回退逐个检索: {e}")
+        return None
+
+    # 空关键字可能被接口当作“无结果”或忽略筛选：整表结果须与首个编号的界面读数一致
+    if set(parse_rows(code, index.get(code, []))) != set(rows):
+        print("[整表采集] 整表结果与界面检索不一致，放弃采集并回退逐个检索。")
+        return None
+
+    erp_latency.record_latency("list_harvest", time.time() - start)
+    print(f"[整表采集] 采集完成：共 {len(index)} 个项目，耗时 {time.time() - start:.1f} 秒。")
+    return index
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+ValkyrieEngine 业务列表本地镜像模块 (List Mirror)
+功能：在本地 SQLite (erp_cache) 中维护“施工委托招标”业务列表索引行的副本 (单据身份、主题、SR 编号、单据地址、创建时间)，
+功能1/2 的“未发包 / 待确认 / 精确命中”判定与详情地址均由本地索引直接给出，浏览器只负责打开详情。
+
+【设计背景】
+功能1/2 每个编号都要在同一张列表上重新检索一次 (清除标签、输入、等待 4 秒渲染)，而这张列表本身变化缓慢：
+每次运行新增的只是上次运行以来新结束的少量单据。首次运行整表翻页同步一次，此后每次运行只增量拉取新单据，
+已发包编号的检索即退化为本地查询 (微秒级)。
+
+【处理流程】
+1. 接口学习：首次使用时以一个编号的界面检索监听列表数据请求 (erp_http.capture_templates)，
+   重放结果须覆盖界面检索到的全部单据才可信；同时由界面单据链接得出单据地址模板 (fdId 占位)。
+   请求模板与地址模板随同步状态一并存档，后续运行无需再次学习；
+2. 同步：按创建时间倒序翻页 (MIRROR_ORDER_PARAMS)。镜像为空时整表同步 (多连接并发)；
+   否则自最新一页向后翻，直至越过“镜像中最新创建时间 - 重叠窗口 (MIRROR_OVERLAP_DAYS)”为止。
+   列表只显示“结束”状态的单据，创建较早、近期才结束的单据会出现在较旧的位置，重叠窗口用于覆盖这部分单据；
+   结束时间早于窗口的单据仍可能漏同步，因此镜像只用于“命中”：编号 (或功能2 项目的某个工程) 在镜像中未命中时，
+   业务线改为界面检索确认，镜像未命中的结论不作为“未发包”，也不写入空结果缓存；
+3. 同步失败 (会话失效、接口变更) 时作废存档的接口模板，本次运行回退界面检索，下次运行重新学习；
+   已有索引行保留，重新学习后照常增量同步。
+"""
+
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl
+
+import config
+import erp_cache
+import erp_http
+import erp_list_harvest
+import erp_list_search
+import erp_login
+import erp_query_planner
+import erp_watchdog
+
+# Landray 列表数据接口的行字段：单据 ID、主题、创建时间
+ID_FIELD = "fdId"
+SUBJECT_FIELD = "docSubject"
+TIME_FIELD = "docCreateTime"
+
+FD_ID_PLACEHOLDER = "{fdId}"
+
+# 接口学习最多尝试的编号数 (须有界面检索结果才能校验)
+LEARN_PROBES = 3
+
+# 本次运行中已同步完毕、可直接查询的列表
+_ready = set()
+
+
+def index_rows(text, view_url):
+    """
+    解析一页列表数据：Landray 列表接口的 datas 为行数组，每行为 [{"col": 列名, "value": 值}, ...] (兼容直接以字典表示的行)
+    返回：[{"doc_key", "subject", "sr_no", "link", "created_at"}, ...]；响应不是列表数据格式时抛出 Exception。
+    """
+    rows = []
+    for raw in json.loads(text)["datas"]:
+        cells = {c["col"]: c.get("value") for c in raw} if isinstance(raw, list) else raw
+        fd_id = cells.get(ID_FIELD)
+        subject = erp_list_harvest.TAG_RE.sub('', str(cells.get(SUBJECT_FIELD) or '')).strip()
+        if not fd_id or not subject:
+            continue
+        sr_no = re.search(r'\bSR\d+', " ".join(str(v) for v in cells.values()))
+        rows.append({
+            "doc_key": f"fdId:{fd_id}",
+            "subject": subject,
+            "sr_no": sr_no.group(0) if sr_no else None,
+            "link": view_url.replace(FD_ID_PLACEHOLDER, str(fd_id)),
+            "created_at": str(cells.get(TIME_FIELD) or ''),
+        })
+    return rows
+
+
+def learn(search_pool, codes, probe):
+    """
+    接口学习：以界面检索监听列表数据请求，重放校验后返回 (请求模板, 单据地址模板)；无法学习时返回 None
+    参数 probe：业务线的界面检索函数，签名 probe(tab, code, cancel_event=None) -> [列表行节点, ...]
+    """
+    for code in codes[:LEARN_PROBES]:
+        tab = search_pool.active
+        try:
+            elements, templates = erp_http.capture_templates(
+                tab, code, erp_list_harvest.KEYWORD_PLACEHOLDER,
+                lambda: erp_watchdog.run_with_deadline(search_pool.page, probe, (tab, code),
+                                                       suspect_tabs=search_pool.suspect_tabs,
+                                                       protected_tabs=search_pool.protected_tab_ids,
+                                                       cancellable=True))
+        except Exception as e:
+            print(f"[列表镜像] 接口学习期间的检索失败: {e}")
+            return None
+        if not elements:
+            continue
+
+        link = erp_list_search.row_link(elements[0])
+        fd_id = re.search(r'[?&]fdId=([^&#]+)', link or '')
+        if fd_id is None:
+            print("[列表镜像] 列表行中没有带 fdId 的单据链接，无法建立单据地址模板。")
+            return None
+        view_url = link.replace(fd_id.group(1), FD_ID_PLACEHOLDER)
+        expected = {erp_list_search.document_key(e) for e in elements}
+
+        for template in templates:
+            try:
+                found = {r["doc_key"] for r in index_rows(
+                    erp_list_harvest.request_page(template, code, 1, config.HARVEST_PAGE_SIZE), view_url)}
+            except Exception:
+                continue
+            if expected <= found:
+                print(f"[列表镜像] 已学习列表数据接口：{template['method']} {template['url']}")
+                return template, view_url
+        print("[列表镜像] 未能识别出可重放的列表数据接口。")
+        return None
+
+    print("[列表镜像] 前几个编号均无检索结果，无法校验列表数据接口。")
+    return None
+
+
+def sync(list_key, template, view_url):
+    """
+    按创建时间倒序翻页同步：镜像为空时整表同步，否则只拉取重叠窗口之后的单据
+    返回：本次写入的索引行数。请求失败或响应格式不符时抛出 Exception。
+    """
+    ordered = erp_list_harvest.with_params(template, dict(parse_qsl(config.MIRROR_ORDER_PARAMS)))
+    page_size = config.HARVEST_PAGE_SIZE
+    watermark = erp_cache.mirror_watermark(list_key)
+
+    first = erp_list_harvest.request_page(ordered, "", 1, page_size)
+    total = erp_list_harvest.total_count(first)
+    pages = max(1, -(-total // page_size)) if total is not None else None
+    rows = index_rows(first, view_url)
+
+    if not watermark:
+        if pages is None:
+            raise Exception("MirrorSyncError: 列表响应中未找到总条数，无法整表同步")
+        print(f"[列表镜像] [{list_key}] 首次同步：共 {total} 条 ({pages} 页)，正在整表拉取...")
+        futures = [erp_http.submit_task(erp_list_harvest.request_page, ordered, "", page_no, page_size)
+                   for page_no in range(2, pages + 1)]
+        for future in futures:
+            rows.extend(index_rows(future.result(), view_url))
+    else:
+        cutoff = (datetime.strptime(watermark[:10], "%Y-%m-%d")
+                  - timedelta(days=config.MIRROR_OVERLAP_DAYS)).strftime("%Y-%m-%d")
+        print(f"[列表镜像] [{list_key}] 增量同步：拉取 {cutoff} 之后创建的单据 (镜像最新 {watermark})...")
+        page_rows, page_no = rows, 1
+        # 倒序翻页：一页中出现早于重叠窗口的单据，即说明更早的页面均已在镜像中
+        while page_rows and min(r["created_at"] for r in page_rows)[:10] >= cutoff \
+                and (pages is None or page_no < pages):
+            page_no += 1
+            page_rows = index_rows(erp_list_harvest.request_page(ordered, "", page_no, page_size), view_url)
+            rows.extend(page_rows)
+
+    erp_cache.put_mirror_rows(list_key, rows)
+    return len(rows)
+
+
+def prepare(search_pool, codes, probe):
+    """
+    [控制器] 本次运行前准备列表镜像：读取存档或学习接口，随后同步
+    返回：镜像是否可用。不可用时调用方照常界面检索。
+    """
+    list_key = search_pool.nav_module.STATE_KEY
+    _ready.discard(list_key)
+    if not config.LIST_MIRROR or erp_login.session_snapshot() is None:
+        return False
+
+    try:
+        state = erp_cache.get_mirror_state(list_key)
+        if state is None:
+            learned = learn(search_pool, codes, probe)
+            if learned is None:
+                print("[列表镜像] 本次运行使用界面检索。")
+                return False
+            state = {"template": learned[0], "view_url": learned[1]}
+            erp_cache.put_mirror_state(list_key, state["template"], state["view_url"])
+
+        start = time.time()
+        count = sync(list_key, state["template"], state["view_url"])
+        erp_cache.put_mirror_state(list_key, state["template"], state["view_url"], synced_at=time.time())
+    except Exception as e:
+        print(f"[列表镜像] 同步失败，本次回退界面检索 (下次运行重新学习接口)：{e}")
+        try:
+            erp_cache.drop_mirror_state(list_key)
+        except Exception:
+            pass
+        return False
+
+    print(f"[列表镜像] [{list_key}] 同步完成：写入 {count} 条索引行，耗时 {time.time() - start:.1f} 秒。")
+    _ready.add(list_key)
+    return True
+
+
+def ready(list_key):
+    return list_key in _ready
+
+
+def lookup(list_key, keyword):
+    """
+    以本地索引代替界面主题检索
+    返回：[erp_list_search.IndexRow, ...]，按创建时间排列
+    """
+    return [erp_list_search.IndexRow(*row) for row in erp_cache.find_mirror_rows(list_key, keyword)]
+
+
+def resolve_batches(search_pool, codes, probe):
+    """
+    [V2.4.0 新增] 前缀批量检索 (列表镜像未启用或同步失败时)：沿用存档或学习得到的列表数据接口，
+    由 erp_query_planner 按共享前缀批量回答密集成段的编号
+    返回：{编号: [erp_list_search.IndexRow, ...]}；镜像已可用、未开启批量检索或接口不可用时返回空字典。
+    """
+    list_key = search_pool.nav_module.STATE_KEY
+    if ready(list_key) or not config.PREFIX_BATCH or erp_login.session_snapshot() is None:
+        return {}
+    if not erp_query_planner.group_codes(codes)[0]:
+        return {}
+
+    try:
+        state = erp_cache.get_mirror_state(list_key)
+        if state is None:
+            learned = learn(search_pool, codes, probe)
+            if learned is None:
+                return {}
+            state = {"template": learned[0], "view_url": learned[1]}
+            erp_cache.put_mirror_state(list_key, state["template"], state["view_url"])
+    except Exception as e:
+        print(f"[批量检索] 列表数据接口不可用，全部逐个检索：{e}")
+        return {}
+
+    return erp_query_planner.resolve(
+        state["template"], codes,
+        lambda text: [erp_list_search.IndexRow(r["doc_key"], r["subject"], r["link"])
+                      for r in index_rows(text, state["view_url"])],
+        lambda row: row.subject)
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+ValkyrieEngine Landray 列表检索原子库
+功能：封装“施工委托招标”“盘点”等 Landray 流程列表页通用的主题检索动作
+（清除残留的“主题:”标签 -> 定位主题输入框 -> 输入关键字并回车 -> 等待列表刷新）。
+各业务线的数据提取模块均复用本模块，保证检索动作在单标签页与对冲检索（多标签页并发）场景下行为一致。
+"""
+
+import re
+from collections import namedtuple
+
+
+class SearchCancelled(Exception):
+    """
+    检索被主动取消
+    对冲检索中，当另一个标签页已率先拿到结果时，落后的一方会在下一个检查点抛出此异常并放弃本次检索；
+    [V2.4.0] 任务超过截止时间被看门狗放弃时，工作线程同样在下一个检查点停止操作浏览器。
+    """
+    pass
+
+
+# [V2.4.0 新增] 来自本地列表镜像 (erp_list_mirror) 的列表行：不对应任何页面节点，单据身份、主题与地址均已知。
+# row_link / document_key 直接返回其中记录的值，各业务线的详情打开与内容缓存流程对两种列表行一视同仁。
+IndexRow = namedtuple("IndexRow", ["doc_key", "subject", "link"])
+
+
+def check_cancelled(cancel_event):
+    """
+    [协作取消检查点] 若取消信号已置位，立即中止当前检索
+    (对冲的另一标签页已抢先完成，或本次任务已超过截止时间被看门狗放弃)
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise SearchCancelled("检索已被取消 (对冲的另一标签页抢先完成，或任务已被看门狗放弃)")
+
+
+def clear_subject_tag(search_tab, timeout=2, settle=2):
+    """
+    残留标签清理
+    逻辑：系统执行搜索后，输入框会被隐藏，取而代之的是“主题: Dxxx”的展示标签。
+    必须定位并清除该标签，才能恢复搜索输入框进行下一次查询。
+    返回：是否执行了清除动作。
+    """
+    old_tag = search_tab.ele('text:主题:', timeout=timeout)
+
+    if not old_tag:
+        return False
+
+    print("[检索准备] 检测到历史查询残留标签，正在执行清除操作...")
+    try:
+        # 优先逻辑：通过 parent() 向上一层寻找包裹标签的父容器，再寻找包含 cancel 样式的关闭按钮
+        old_tag.parent().ele('@class=cancel').click()
+    except:
+        # 备用逻辑：若父容器结构变化，直接尝试点击标签文本旁边的下一个相邻节点
+        old_tag.next().click()
+
+    # 标签被清除后，页面会触发局部重绘显示输入框，需强制挂起等待
+    search_tab.wait(settle)
+    return True
+
+
+def submit_subject_search(search_tab, keyword, box_timeout=10, tag_timeout=2, tag_settle=2, settle=4,
+                          cancel_event=None):
+    """
+    主题检索触发
+    功能：清理残留标签后，在主题输入框中输入关键字并回车，随后挂起 settle 秒等待服务器响应。
+    参数 cancel_event：对冲检索使用的取消信号，每个耗时动作前后都会检查一次，被取消时抛出 SearchCancelled。
+    """
+    check_cancelled(cancel_event)
+    clear_subject_tag(search_tab, timeout=tag_timeout, settle=tag_settle)
+    check_cancelled(cancel_event)
+
+    # 优先使用 Landray 框架底层静态属性 data-lui-placeholder 定位，避免受页面状态影响
+    search_box = search_tab.ele('@data-lui-placeholder=请输入主题', timeout=box_timeout)
+
+    # 若底层属性失效，降级使用常规的 placeholder 属性进行定位
+    if not search_box:
+        search_box = search_tab.ele('@placeholder=请输入主题', timeout=box_timeout)
+
+    check_cancelled(cancel_event)
+
+    # 清除输入框内可能存在的数据，填入关键字，并追加换行符 \n 模拟物理回车操作，触发搜索
+    search_box.clear().input(f'{keyword}\n')
+
+    search_tab.wait(settle)
+    check_cancelled(cancel_event)
+
+
+def match_suffix(code, text):
+    """
+    工程后缀识别
+    功能：从列表主题文本中识别“编号_NN-”格式的工程单据 (必须附带短横杠，防止误判其他相似编号)。
+    返回：(后缀序号, 匹配起点)；文本不属于该项目的工程单据时返回 None。后缀至少两位、不设上限。
+    """
+    match = re.search(rf'{re.escape(code)}_(\d{{2,}})-', text)
+    if not match or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)), match.start()
+
+
+# 单据链接读取脚本 (在列表行节点上执行，this 指向该节点)：
+# 自身及各级祖先节点中，取第一个可直接导航的 href / data-href / kmss_href 属性，补全为绝对地址；
+# 仍未找到时再查找节点内部的 <a href>。javascript: 伪链接不可直接导航，一律跳过。
+ROW_LINK_JS = """
+function usable(v) { return v && v.indexOf('javascript:') !== 0 && v.charAt(0) !== '#'; }
+var node = this;
+while (node && node.getAttribute) {
+    var attrs = ['href', 'data-href', 'kmss_href'];
+    for (var i = 0; i < attrs.length; i++) {
+        var v = node.getAttribute(attrs[i]);
+        if (usable(v)) { return new URL(v, location.href).href; }
+    }
+    if (node.tagName === 'TR' || node.tagName === 'BODY') { break; }
+    node = node.parentElement;
+}
+var a = this.querySelector ? this.querySelector('a[href]') : null;
+if (a && usable(a.getAttribute('href'))) { return a.href; }
+return null;
+"""
+
+
+def row_link(row):
+    """
+    读取列表行对应的单据地址
+    返回：绝对地址；行内没有可直接导航的链接 (或读取失败) 时返回 None，由调用方退回点击打开的方式。
+    """
+    if isinstance(row, IndexRow):
+        return row.link
+    try:
+        return row.run_js(ROW_LINK_JS)
+    except Exception:
+        return None
+
+
+# 单据所在列表行的完整文本 (在列表行节点上执行，this 指向该节点)
+ROW_TEXT_JS = """
+var tr = this.closest ? this.closest('tr') : null;
+return (tr || this).innerText;
+"""
+
+
+def document_key(row):
+    """
+    读取列表行对应单据的身份标识，用于单据内容缓存
+    优先取单据链接中的 fdId，其次取所在行中的 SR 编号；均无法识别时返回 None (不缓存)。
+    """
+    if isinstance(row, IndexRow):
+        return row.doc_key
+    url = row_link(row)
+    if url:
+        match = re.search(r'[?&]fdId=([^&#]+)', url)
+        if match:
+            return f"fdId:{match.group(1)}"
+    try:
+        text = row.run_js(ROW_TEXT_JS) or ""
+    except Exception:
+        return None
+    match = re.search(r'\bSR\d+', text)
+    return f"SR:{match.group(0)}" if match else None
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+ValkyrieEngine 列表检索状态存档模块
+功能：在业务列表首次挂载筛选条件（勾选“结束”、清除“创建时间”限制）后，记录该列表的页面地址（Landray 列表会把检索条件编码在 URL/hash 中）
+以及筛选区的 DOM 状态指纹，并持久化到本地 JSON 文件。
+
+此后无论是程序启动还是异常自愈，均可直接按已配置的地址打开列表，
+跳过“流程查询”菜单导航与反复的筛选点击（这两步是环境初始化中最慢、最不稳定的环节）。
+打开后会重新采集筛选区指纹，与存档时的基准比对，确认筛选条件确实生效后才移交控制权；
+比对不一致则作废存档，调用方退回经典的菜单导航流程并重新存档。
+"""
+
+import json
+import os
+import threading
+
+import config
+
+# 筛选区状态指纹采集脚本：
+# 1. “结束”选项自身及其上两级容器的 class 与勾选状态 (反映单据状态筛选是否已选中)；
+# 2. “创建时间”筛选块内取消按钮的可见性 (反映默认时间限制是否已清除)。
+# 指纹只与存档时从“已知正确”的页面采集的基准做相等比对，不依赖对具体 class 名称的猜测。
+PROBE_JS = """
+function chain(el, depth) {
+    var out = [];
+    for (var i = 0; i < depth && el; i++) { out.push(el.className || ''); el = el.parentElement; }
+    return out.join('|');
+}
+var fin = document.querySelector('[title="结束"]');
+var box = document.querySelector('[data-criterion-key="docCreateTime"]');
+var cancel = box ? box.querySelector('.cancel') : null;
+return JSON.stringify({
+    finished: fin ? chain(fin, 3) + '#' + (fin.checked ? 1 : 0) : null,
+    create_time: cancel ? (cancel.offsetParent !== null ? 'visible' : 'hidden') : 'none'
+});
+"""
+
+# 多个标签页 (主标签页与后台预热的备用标签页) 可能同时读写存档文件
+_lock = threading.Lock()
+
+
+def _load_all():
+    if not os.path.exists(config.LIST_STATE_FILE):
+        return {}
+    try:
+        with open(config.LIST_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[状态存档] 列表状态存档读取失败，将按首次运行处理：{e}")
+        return {}
+
+
+def _save_all(data):
+    try:
+        with open(config.LIST_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"[状态存档] 列表状态存档写入失败：{e}")
+
+
+def load_list_state(key):
+    """
+    读取指定业务列表的存档，不存在时返回 None
+    """
+    with _lock:
+        return _load_all().get(key)
+
+
+def invalidate_list_state(key):
+    """
+    作废指定业务列表的存档 (筛选条件校验不通过时调用)
+    """
+    with _lock:
+        data = _load_all()
+        if data.pop(key, None) is not None:
+            _save_all(data)
+
+
+def probe_filter_state(tab):
+    """
+    采集当前标签页筛选区的状态指纹
+    """
+    return tab.run_js(PROBE_JS)
+
+
+def capture_list_state(key, list_url, tab):
+    """
+    存档已挂载筛选条件的列表状态
+    参数 list_url 为挂载条件前的列表地址；若挂载后地址未发生变化，说明该列表并未把检索条件编码进 URL，
+    按地址直达无法复原筛选条件，此时放弃存档。
+    """
+    if not config.RESTORE_LIST_STATE:
+        return
+
+    try:
+        configured_url = tab.url
+        if not configured_url or configured_url == list_url:
+            print("[状态存档] 该列表未在地址中编码检索条件，跳过状态存档。")
+            return
+
+        state = {
+            "list_url": list_url,
+            "configured_url": configured_url,
+            "probe": probe_filter_state(tab),
+        }
+        with _lock:
+            data = _load_all()
+            if data.get(key) != state:
+                data[key] = state
+                _save_all(data)
+                print(f"[状态存档] 已存档列表检索状态 [{key}]，后续可直达已配置的列表。")
+    except Exception as e:
+        print(f"[状态存档] 列表状态采集失败，不影响本次运行：{e}")
+
+
+def _verify_configured(tab, key, state, render_anchor):
+    """
+    校验按存档打开的列表：渲染完毕、地址中的检索条件未被系统改写、筛选区指纹与存档基准一致。
+    渲染超时直接抛出；筛选条件不一致时作废存档并返回 False。
+    """
+    # 1. 列表渲染校验：与菜单导航流程一致，给系统 30 秒宽容度
+    if not tab.ele(render_anchor, timeout=30):
+        raise Exception("ListRenderTimeout: 直达列表后未检测到渲染锚点")
+    tab.wait(1)
+
+    # 2. 筛选条件校验
+    if tab.url != state["configured_url"] or probe_filter_state(tab) != state["probe"]:
+        print("[状态存档] 直达后的筛选条件与存档不一致，存档已作废，退回菜单导航流程。")
+        invalidate_list_state(key)
+        return False
+    return True
+
+
+def open_configured_tab(page, key, render_anchor, tab_guard=None, on_created=None):
+    """
+    按存档直达已配置的业务列表
+    参数：
+      - render_anchor: 列表渲染完毕的锚点定位语法 (如 'text:SR')。
+      - tab_guard: 可选的新标签页创建临界区 (检索标签页池的 creating_tab)。
+      - on_created: 可选回调，新标签页创建后立即以其句柄调用 (用于登记“预热中”的标签页)。
+    返回：校验通过的标签页；无存档或校验失败时返回 None，由调用方退回菜单导航流程。
+    """
+    if not config.RESTORE_LIST_STATE:
+        return None
+
+    state = load_list_state(key)
+    if not state:
+        return None
+
+    print(f"[状态存档] 正在按存档直达已配置的列表 [{key}]...")
+    tab = None
+    try:
+        if tab_guard is not None:
+            with tab_guard():
+                tab = page.new_tab(state["configured_url"])
+        else:
+            tab = page.new_tab(state["configured_url"])
+        if on_created is not None:
+            on_created(tab)
+
+        if not _verify_configured(tab, key, state, render_anchor):
+            tab.close()
+            return None
+
+        print("[状态存档] 筛选条件校验通过，已跳过菜单导航与筛选点击。")
+        return tab
+
+    except Exception as e:
+        print(f"[状态存档] 按存档直达列表失败，退回菜单导航流程：{e}")
+        if tab is not None:
+            try:
+                tab.close()
+            except:
+                pass
+        return None
+
+
+def reload_configured_tab(tab, key, render_anchor):
+    """
+    在现有标签页上按存档重新载入已配置的业务列表 (分级自愈的“重载标签页”级别)
+    返回：校验通过时返回 True；无存档或筛选条件校验不一致时返回 False，由调用方重新挂载筛选条件。
+    渲染超时等页面异常直接抛出。
+    """
+    if not config.RESTORE_LIST_STATE:
+        return False
+
+    state = load_list_state(key)
+    if not state:
+        return False
+
+    tab.get(state["configured_url"])
+    return _verify_configured(tab, key, state, render_anchor)
\ No newline at end of file
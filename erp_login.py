@@ -1,6 +1,9 @@
 from DrissionPage import ChromiumPage, ChromiumOptions
 import config
 
+# [V2.4.0 新增] 最近一次登录的会话快照，供浏览器崩溃后免登录重启
+_session = None
+
 
 def login_erp(run_mode):
     """
@@ -48,78 +51,156 @@ def login_erp(run_mode):
             print("[系统鉴权] 无法识别的输入指令，为确保流程安全，默认执行重试操作...")
 
     # [V2.0.0 新增] 会话状态的全维度跨进程迁移逻辑
+    # [V2.4.0 重构] 会话采集与注入拆分为独立组件，并保存会话快照，供分级自愈的“重启浏览器”级别复用
+    global _session
+    _session = capture_session(page, run_mode)
+
     if run_mode == '2':
         print("[进程调度] 检测到静默策略，启动全维度会话迁移序列...")
 
-        # 1. 记录重定向后的真实业务主页 URL (URL Context Capture)
-        real_home_url = page.url
+        # 释放前置图形化进程占用的系统资源
+        page.quit()
+        print("[进程调度] 前置图形化主进程已销毁。正在注入稳定性参数...")
 
-        # 2. 提取全域 Cookie 字典
-        session_cookies = page.cookies()
+        headless_page = launch_with_session(_session)
+        print("[进程调度] 身份凭证已深度激活，底层控制器控制权已交接至无头实例。")
+        return headless_page
 
+    else:
+        # 经典策略分支：直接向上层调用栈返回原始的图形化浏览器句柄
+        print("[进程调度] 经典策略已启用，维持当前可视状态，流程控制权释放。")
+        _session["page"] = page
+        return page
+
+
+def capture_session(page, run_mode):
+    """
+    [V2.4.0 新增] 会话快照采集组件
+    功能：记录重定向后的真实业务主页 URL、全域 Cookie 以及 LocalStorage / SessionStorage，
+    用于无头实例的跨进程状态迁移，以及运行期间浏览器崩溃后的免登录重启。
+    """
+    return {
+        "run_mode": run_mode,
+        # 1. 记录重定向后的真实业务主页 URL (URL Context Capture)
+        "home_url": page.url,
+        # 2. 提取全域 Cookie 字典
+        "cookies": page.cookies(),
         # 3. 提取 LocalStorage 与 SessionStorage (Web Storage Serialization)
         # 针对现代框架，将前端存储数据通过 JS 引擎序列化为 JSON 字符串
-        local_storage_data = page.run_js("return JSON.stringify(window.localStorage);")
-        session_storage_data = page.run_js("return JSON.stringify(window.sessionStorage);")
+        "local_storage": page.run_js("return JSON.stringify(window.localStorage);"),
+        "session_storage": page.run_js("return JSON.stringify(window.sessionStorage);"),
+        # 4. 记录浏览器 User-Agent，供 HTTP 直取通道 (erp_http) 以同一身份访问详情页
+        "user_agent": page.run_js("return navigator.userAgent;"),
+        "page": None,
+    }
 
-        # 释放前置图形化进程占用的系统资源
-        page.quit()
-        print("[进程调度] 前置图形化主进程已销毁。正在注入稳定性参数...")
 
+def launch_with_session(session):
+    """
+    [V2.4.0 新增] 会话注入式浏览器启动组件
+    功能：按会话快照中的运行模式拉起新的浏览器实例 (静默模式为无头实例)，注入凭证与前端存储数据并激活会话。
+    """
+    if session["run_mode"] == '2':
         # 实例化配置对象并注入稳定性补丁
-        headless_options = ChromiumOptions()
-        headless_options.auto_port()
-        headless_options.headless(True)
+        options = ChromiumOptions()
+        options.auto_port()
+        options.headless(True)
 
         # --- 稳定性核心参数注入 ---
         # A. 固化桌面级视口，防止由于无头默认小窗口导致的响应式菜单折叠 (视口坍塌陷阱防御)
-        headless_options.set_argument('--window-size=1920,1080')
-        headless_options.set_argument(
+        options.set_argument('--window-size=1920,1080')
+        options.set_argument(
             '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
 
         # B. 内存与进程隔离优化：突破沙盒共享内存限制，降低 OOM 崩溃率
-        headless_options.set_argument('--disable-dev-shm-usage')
-        headless_options.set_argument('--no-sandbox')
+        options.set_argument('--disable-dev-shm-usage')
+        options.set_argument('--no-sandbox')
 
         # C. 性能优化与网络穿透：忽略自签名证书错误，屏蔽自动化控制特征
-        headless_options.set_argument('--blink-settings=imagesEnabled=false')
-        headless_options.set_argument('--disable-gpu')
-        headless_options.set_argument('--ignore-certificate-errors')
-        headless_options.set_argument('--disable-blink-features=AutomationControlled')
+        options.set_argument('--blink-settings=imagesEnabled=false')
+        options.set_argument('--disable-gpu')
+        options.set_argument('--ignore-certificate-errors')
+        options.set_argument('--disable-blink-features=AutomationControlled')
         # -----------------------------
+    else:
+        options = ChromiumOptions()
+        options.auto_port()
+        options.set_argument('--start-maximized')
 
-        # 在后台重构一个全新的无头浏览器实例
-        headless_page = ChromiumPage(headless_options)
+    # 在后台重构一个全新的浏览器实例
+    new_page = ChromiumPage(options)
 
-        # 步骤 A：向真实的业务主页发起首次请求，建立合法的域名上下文
-        print("[进程调度] 正在建立无头实例的域名上下文...")
-        headless_page.get(real_home_url)
+    # 步骤 A：向真实的业务主页发起首次请求，建立合法的域名上下文
+    print("[进程调度] 正在建立新实例的域名上下文...")
+    new_page.get(session["home_url"])
 
-        # 步骤 B：域名上下文建立后，反序列化并注入凭证与前端存储数据
-        print("[进程调度] 正在执行跨进程 Web 状态注入...")
-        headless_page.set.cookies(session_cookies)
+    # 步骤 B：域名上下文建立后，反序列化并注入凭证与前端存储数据
+    print("[进程调度] 正在执行跨进程 Web 状态注入...")
+    new_page.set.cookies(session["cookies"])
 
-        inject_storage_js = """
-            let ls = JSON.parse(arguments[0] || '{}');
-            for (let k in ls) { window.localStorage.setItem(k, ls[k]); }
+    inject_storage_js = """
+        let ls = JSON.parse(arguments[0] || '{}');
+        for (let k in ls) { window.localStorage.setItem(k, ls[k]); }
 
-            let ss = JSON.parse(arguments[1] || '{}');
-            for (let k in ss) { window.sessionStorage.setItem(k, ss[k]); }
-        """
-        headless_page.run_js(inject_storage_js, local_storage_data, session_storage_data)
+        let ss = JSON.parse(arguments[1] || '{}');
+        for (let k in ss) { window.sessionStorage.setItem(k, ss[k]); }
+    """
+    new_page.run_js(inject_storage_js, session["local_storage"], session["session_storage"])
 
-        # 步骤 C：执行最终刷新，激活会话状态与完整 DOM 渲染
-        print(f"[进程调度] 正在激活业务系统会话：{real_home_url}")
-        headless_page.get(real_home_url)
-        headless_page.wait.load_start()
+    # 步骤 C：执行最终刷新，激活会话状态与完整 DOM 渲染
+    print(f"[进程调度] 正在激活业务系统会话：{session['home_url']}")
+    new_page.get(session["home_url"])
+    new_page.wait.load_start()
 
-        print("[进程调度] 身份凭证已深度激活，底层控制器控制权已交接至无头实例。")
-        return headless_page
+    session["page"] = new_page
+    return new_page
 
-    else:
-        # 经典策略分支：直接向上层调用栈返回原始的图形化浏览器句柄
-        print("[进程调度] 经典策略已启用，维持当前可视状态，流程控制权释放。")
-        return page
+
+def session_snapshot():
+    """
+    [V2.4.0 新增] 返回最近一次登录的会话快照 (未登录时为 None)，供 HTTP 直取通道复用 Cookie
+    """
+    return _session
+
+
+def can_restart():
+    """
+    [V2.4.0 新增] 是否已保存可用于免登录重启的会话快照
+    """
+    return _session is not None
+
+
+def restart_browser(page):
+    """
+    [V2.4.0 新增] 浏览器重启组件 (分级自愈的最高级别)
+    功能：销毁当前 (可能已崩溃的) 浏览器进程，按登录时保存的会话快照拉起新实例，返回新的浏览器句柄。
+    """
+    if _session is None:
+        raise Exception("RestartUnavailable: 未保存登录会话快照，无法免登录重启浏览器")
+
+    print("[进程调度] 正在销毁异常的浏览器进程并按会话快照重启...")
+    try:
+        page.quit()
+    except:
+        pass
+    return launch_with_session(_session)
+
+
+def quit_browser(page):
+    """
+    [V2.4.0 新增] 浏览器资源释放组件
+    功能：关闭主控程序持有的浏览器句柄；若运行期间发生过浏览器重启，一并关闭重启后的新实例。
+    """
+    pages = [page]
+    if _session is not None and _session.get("page") is not None and _session["page"] is not page:
+        pages.append(_session["page"])
+    for p in pages:
+        if p is None:
+            continue
+        try:
+            p.quit()
+        except:
+            pass
 
 
 # 模块独立测试入口：仅当直接运行本文件时执行，被主控程序导入时将被忽略。
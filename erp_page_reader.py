@@ -0,0 +1,305 @@
+"""
+ValkyrieEngine 页面批量读取模块
+功能：通过一次页面内脚本调用，整体读取 Landray 详情表单中所有“表头 -> 数据”单元格对，
+再在 Python 侧按字段名映射，替代逐字段的 ele() + next() 双次浏览器往返。
+
+【性能对比】
+逐字段定位：每个字段 2 次往返，缺失字段还要白白耗尽 3 秒的隐式等待，8 个字段最少 16 次往返。
+批量读取：整张表单 1 次往返，缺失字段不再产生任何额外等待。
+
+【离线解析模式】
+详情页就绪后一次性抓取整页 HTML 快照，随即关闭详情标签页，表单解析改由 lxml 在工作线程中离线完成，
+浏览器无需等待解析结束即可转入下一个编号。解析规则与在线 DOM 定位逐条对齐：
+  - 表头 td.td_normal_title -> 其后第一个 <td> (功能1)；
+  - <label> 表头 -> 父级 <td> 的下一个 <td> -> span.val / xformflag / 单元格文本三种候选值 (功能2)。
+在线读取使用 innerText，不含 <script>/<style> 源码与隐藏节点；lxml 的 text_content() 会把它们一并读出，
+因此解析前先剔除这些节点 (parse_html)。隐藏节点只能按 hidden 属性与内联 display:none 样式识别，
+由样式表隐藏的节点以及换行、空白的处理与 innerText 仍可能存在差异，离线解析因此默认关闭 (OFFLINE_PARSE)。
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from lxml import html as lxml_html
+
+import config
+
+# 表单读取脚本：
+# 1. 文档未加载完成或尚未渲染出任何表头时返回 null，由调用方轮询等待；
+# 2. 对每个 td.td_normal_title 表头，取其后第一个 <td> 兄弟节点作为数据单元格 (与 next('tag:td') 语义一致)，
+#    不存在数据单元格时 value 为 null。
+READ_FORM_JS = """
+if (document.readyState !== 'complete') { return null; }
+var labels = document.querySelectorAll('td.td_normal_title');
+if (!labels.length) { return null; }
+var pairs = [];
+for (var i = 0; i < labels.length; i++) {
+    var sib = labels[i].nextElementSibling;
+    while (sib && sib.tagName !== 'TD') { sib = sib.nextElementSibling; }
+    pairs.push([labels[i].innerText, sib ? sib.innerText : null]);
+}
+return JSON.stringify(pairs);
+"""
+
+
+def clean_text(raw_text):
+    """
+    【数据清洗逻辑】将系统底层自带的换行符 (\\n) 与制表符 (\\t) 替换为空字符串，最后移除首尾残留的空白字符。
+    """
+    return raw_text.replace('\n', '').replace('\t', '').strip()
+
+
+def poll_js(tab, script, *args, timeout=10, interval=0.3, error="FormRenderTimeout"):
+    """
+    轮询执行页面脚本，直至其返回非空结果；页面就绪时仅需一次往返。超时抛出 Exception(error)。
+    """
+    deadline = time.time() + timeout
+    while True:
+        raw = tab.run_js(script, *args)
+        if raw:
+            return raw
+        if time.time() >= deadline:
+            raise Exception(error)
+        time.sleep(interval)
+
+
+def read_label_pairs(tab, timeout=10, interval=0.3):
+    """
+    读取详情表单中全部“表头文本 -> 数据文本”单元格对
+    在 timeout 秒内轮询，直至文档加载完成且表头渲染完毕；页面就绪时仅需一次往返。
+    返回：[(表头文本, 数据文本或 None), ...]，保持页面中的出现顺序。超时抛出 Exception。
+    """
+    raw = poll_js(tab, READ_FORM_JS, timeout=timeout, interval=interval,
+                  error="FormRenderTimeout: 详情表单在限定时间内未渲染出任何表头")
+    return [(label, value) for label, value in json.loads(raw)]
+
+
+def map_fields(pairs, fields):
+    """
+    按字段名映射表单数据
+    匹配规则与 text():{field} 一致：表头文本包含字段名即视为命中，多处命中时取页面中的第一处。
+    返回：{字段名: 数据文本 (已清洗) / None (有表头但无数据单元格)}，未找到表头的字段不出现在结果中。
+    """
+    mapped = {}
+    for field in fields:
+        for label, value in pairs:
+            if field in label:
+                mapped[field] = None if value is None else clean_text(value)
+                break
+    return mapped
+
+
+# 选择器批量读取脚本：按传入的 CSS 选择器列表一次性返回各元素的文本 (已去除首尾空白)，元素不存在时为 null
+READ_TEXTS_JS = """
+var out = {};
+var selectors = arguments[0];
+for (var i = 0; i < selectors.length; i++) {
+    var el = document.querySelector(selectors[i]);
+    out[selectors[i]] = el ? el.innerText.trim() : null;
+}
+return JSON.stringify(out);
+"""
+
+
+def read_texts(tab, selectors):
+    """
+    一次往返读取多个元素的文本
+    返回：{选择器: 文本 / None (元素不存在)}
+    """
+    return json.loads(tab.run_js(READ_TEXTS_JS, list(selectors)))
+
+
+# 文本检索脚本：遍历页面全部文本节点，返回包含关键字的文本节点所属元素的完整文本 (去重，保持页面顺序)
+FIND_TEXTS_JS = """
+var keyword = arguments[0];
+var out = [], seen = {};
+var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, null);
+while (walker.nextNode()) {
+    var node = walker.currentNode;
+    if (node.data.indexOf(keyword) < 0 || !node.parentElement) { continue; }
+    var text = node.parentElement.innerText;
+    if (!seen[text]) { seen[text] = 1; out.push(text); }
+}
+return JSON.stringify(out);
+"""
+
+
+def find_texts(tab, keyword):
+    """
+    一次往返找出页面上所有包含关键字的文本 (等价于 eles('text:关键字') 后逐个读取 .text)
+    """
+    return json.loads(tab.run_js(FIND_TEXTS_JS, keyword))
+
+
+# <label> 表头读取脚本 (功能2 表单)：
+# 对每个 <label>，取其父节点之后第一个 <td> 作为数据单元格 (与 parent().next('tag:td') 语义一致)，
+# 并一次性给出三种取值策略的候选值：[span.val 文本, xformflag 文本, 单元格文本]，不存在的候选为 null。
+READ_LABELS_JS = """
+if (document.readyState !== 'complete') { return null; }
+var labels = document.querySelectorAll('label');
+if (!labels.length) { return null; }
+function first(td, sel) { var el = td.querySelector(sel); return el ? el.innerText.trim() : null; }
+var entries = [];
+for (var i = 0; i < labels.length; i++) {
+    var sib = labels[i].parentElement ? labels[i].parentElement.nextElementSibling : null;
+    while (sib && sib.tagName !== 'TD') { sib = sib.nextElementSibling; }
+    entries.push([labels[i].innerText, sib ? [first(sib, '.val'), first(sib, 'xformflag'), sib.innerText.trim()] : null]);
+}
+return JSON.stringify(entries);
+"""
+
+
+def read_label_entries(tab, timeout=10, interval=0.3):
+    """
+    一次往返读取表单中全部 <label> 表头及其数据单元格的三种候选值
+    返回：[(表头文本, [val 文本, xformflag 文本, 单元格文本] 或 None), ...]，保持页面中的出现顺序。
+    """
+    raw = poll_js(tab, READ_LABELS_JS, timeout=timeout, interval=interval,
+                  error="FormRenderTimeout: 详情表单在限定时间内未渲染出任何 label 表头")
+    return [(label, values) for label, values in json.loads(raw)]
+
+
+def deep_value(values):
+    """
+    穿透取值：按 span.val -> xformflag -> 单元格文本的顺序返回第一个存在的候选值
+    """
+    for value in values:
+        if value is not None:
+            return value
+    return ""
+
+
+def map_label_entries(entries, fields_map):
+    """
+    按字段别名映射 <label> 表单数据 (功能2)
+    匹配规则与 tag:label@@text():别名 一致：按别名顺序，取第一个文本包含该别名的表头；该表头没有数据单元格时尝试下一个别名。
+    返回：{输出字段: 穿透取值结果}，未命中任何别名的字段为空字符串。
+    """
+    values = {}
+    for field, aliases in fields_map.items():
+        values[field] = ""
+        for alias in aliases:
+            cells = next((cells for label, cells in entries if alias in label), None)
+            if cells is not None:
+                values[field] = deep_value(cells)
+                break
+    return values
+
+
+# ---------------- 离线解析模式 ----------------
+
+# 快照脚本：文档加载完成且就绪锚点已渲染时返回整页 HTML，否则返回 null，由调用方轮询等待
+SNAPSHOT_JS = """
+if (document.readyState !== 'complete' || !document.querySelector(arguments[0])) { return null; }
+return document.documentElement.outerHTML;
+"""
+
+
+def snapshot_html(tab, ready_selector, timeout=10, interval=0.3):
+    """
+    抓取详情页的整页 HTML 快照
+    在 timeout 秒内轮询，直至文档加载完成且 ready_selector (CSS 选择器) 已渲染；页面就绪时仅需一次往返。
+    """
+    return poll_js(tab, SNAPSHOT_JS, ready_selector, timeout=timeout, interval=interval,
+                   error=f"FormRenderTimeout: 详情页在限定时间内未渲染出 [{ready_selector}]")
+
+
+# innerText 不包含的节点：脚本、样式源码，以及 hidden 属性或内联 display:none 隐藏的节点
+INVISIBLE_XPATH = ('//script | //style | //noscript | //template | //*[@hidden]'
+                   ' | //*[contains(translate(@style, " ", ""), "display:none")]')
+
+
+def parse_html(raw_html):
+    """
+    解析 HTML 快照，并剔除在线 innerText 读不到的节点 (Landray 表单单元格中常内嵌初始化脚本)
+    drop_tree() 保留节点之后的尾随文本，与 innerText 的拼接结果一致。
+    """
+    doc = lxml_html.fromstring(raw_html)
+    for node in doc.xpath(INVISIBLE_XPATH):
+        if node.getparent() is not None:
+            node.drop_tree()
+    return doc
+
+
+def _next_td(element):
+    """
+    与 next('tag:td') 语义一致：取其后第一个 <td> 兄弟节点
+    """
+    found = element.xpath('following-sibling::td[1]')
+    return found[0] if found else None
+
+
+def label_pairs_from_html(doc):
+    """
+    离线版 read_label_pairs：返回 [(表头文本, 数据文本或 None), ...]
+    """
+    pairs = []
+    for label_td in doc.xpath('//td[contains(concat(" ", normalize-space(@class), " "), " td_normal_title ")]'):
+        value_td = _next_td(label_td)
+        pairs.append((label_td.text_content(), None if value_td is None else value_td.text_content()))
+    return pairs
+
+
+def _first_text(element, xpath):
+    found = element.xpath(xpath)
+    return found[0].text_content().strip() if found else None
+
+
+def label_entries_from_html(doc):
+    """
+    离线版 read_label_entries：规则与 READ_LABELS_JS 一致 (文本读取差异见模块说明)
+    """
+    entries = []
+    for label in doc.iter('label'):
+        parent = label.getparent()
+        data_td = _next_td(parent) if parent is not None else None
+        if data_td is None:
+            entries.append((label.text_content(), None))
+            continue
+        entries.append((label.text_content(), [
+            _first_text(data_td, './/*[contains(concat(" ", normalize-space(@class), " "), " val ")]'),
+            _first_text(data_td, './/xformflag'),
+            data_td.text_content().strip(),
+        ]))
+    return entries
+
+
+# ---------------- 后台解析调度 ----------------
+
+# 离线解析线程池：按需创建，浏览器线程只负责抓取快照，解析在这里并行完成
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit_parse(parse_fn, *args):
+    """
+    将离线解析任务提交至后台线程池，返回 Future。parse_fn 自身负责容错，不应向外抛出异常。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.PARSE_WORKERS, thread_name_prefix="parser")
+    return _executor.submit(parse_fn, *args)
+
+
+def is_pending(item):
+    return isinstance(item, Future)
+
+
+def settle_results(results, wait_all=False):
+    """
+    结算结果列表：把已完成的解析任务原地替换为其解析结果 (wait_all=True 时等待全部完成)。
+    返回：从头开始连续已结算的结果前缀，供实时存档使用，保证落盘的行顺序与任务顺序严格一致。
+    """
+    for index, item in enumerate(results):
+        if is_pending(item) and (wait_all or item.done()):
+            results[index] = item.result()
+
+    prefix = []
+    for item in results:
+        if is_pending(item):
+            break
+        prefix.append(item)
+    return prefix
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+ValkyrieEngine 前缀批量检索规划模块 (Query Planner)
+功能：项目编号是结构化的 (D + 10 位数字)，输入清单常常是连续密集的一段 (如 D1251420001 ~ D1251420099)。
+本模块把共享前缀的编号归为一组，每组只按前缀发起一次主题检索 (结果过多时翻页)，再在返回的行中逐个匹配组内编号，
+取代逐个编号的检索往返。检索经由已学习的列表数据请求 (erp_list_harvest 请求模板) 以 HTTP 完成。
+
+【前缀长度的选择】
+截去末尾 k 位数字的前缀覆盖 10^k 个可能的编号。前缀越短，一次检索能回答的编号越多，但返回行中不在清单内的也越多。
+  - 分组：从最宽的前缀 (截去 PREFIX_MAX_DIGITS 位) 开始，组内输入编号数达到“覆盖范围 × PREFIX_MIN_DENSITY”
+    (且至少 2 个) 才成组，其余编号再尝试更窄的前缀；始终凑不成组的编号仍逐个检索；
+  - 拆分：前缀检索的结果总条数超过 PREFIX_MAX_ROWS 时，不再翻页，而是按多保留一位数字拆分为更窄的前缀重新检索。
+"""
+
+import config
+import erp_list_harvest
+
+
+def group_codes(codes):
+    """
+    按共享前缀为编号分组
+    返回：({前缀: [编号, ...]}, [逐个检索的编号, ...])
+    """
+    remaining = list(dict.fromkeys(codes))
+    groups = {}
+    for digits in range(config.PREFIX_MAX_DIGITS, 0, -1):
+        buckets = {}
+        for code in remaining:
+            if len(code) > digits and code[-digits:].isdigit():
+                buckets.setdefault((len(code), code[:-digits]), []).append(code)
+
+        needed = max(2, (10 ** digits) * config.PREFIX_MIN_DENSITY)
+        grouped = set()
+        for (_, prefix), members in buckets.items():
+            if len(members) >= needed:
+                groups[prefix] = members
+                grouped.update(members)
+        remaining = [code for code in remaining if code not in grouped]
+    return groups, remaining
+
+
+def fetch_prefix(template, prefix, rows_of):
+    """
+    按前缀检索并翻页取回全部结果行
+    返回：结果行列表；结果总条数超过 PREFIX_MAX_ROWS 时返回 None，由调用方拆分前缀。请求失败时抛出 Exception。
+    """
+    page_size = config.HARVEST_PAGE_SIZE
+    first = erp_list_harvest.request_page(template, prefix, 1, page_size)
+    total = erp_list_harvest.total_count(first)
+    if total is not None and total > config.PREFIX_MAX_ROWS:
+        return None
+
+    rows = rows_of(first)
+    page_no = 1
+    # 总条数未知时，翻到不满一页为止
+    while (page_no * page_size < total) if total is not None else (len(rows) == page_no * page_size):
+        page_no += 1
+        rows.extend(rows_of(erp_list_harvest.request_page(template, prefix, page_no, page_size)))
+    return rows
+
+
+def resolve(template, codes, rows_of, subject_of):
+    """
+    [控制器] 前缀批量检索
+    参数：
+      - template: 已校验的列表数据请求模板
+      - rows_of: 把一页响应解析为结果行列表的函数
+      - subject_of: 取结果行主题文本的函数 (主题中包含编号即视为该编号的检索结果，与界面主题检索的“包含”语义一致)
+    返回：{编号: [结果行, ...]}，仅包含经批量检索回答的编号 (含结果为空的编号)；其余编号由调用方逐个检索。
+    """
+    groups, singles = group_codes(codes)
+    if not groups:
+        return {}
+
+    print(f"[批量检索] {len(codes)} 个编号归并为 {len(groups)} 个前缀组，另有 {len(singles)} 个编号逐个检索。")
+    answers = {}
+    queries = 0
+    pending = list(groups.items())
+    while pending:
+        prefix, members = pending.pop()
+        try:
+            queries += 1
+            rows = fetch_prefix(template, prefix, rows_of)
+        except Exception as e:
+            print(f"[批量检索] 前缀 [{prefix}] 检索失败，组内 {len(members)} 个编号改为逐个检索: {e}")
+            continue
+
+        if rows is None:
+            # 结果过多：多保留一位数字拆分，只保留仍有 2 个以上编号的子组
+            narrower = {}
+            for code in members:
+                narrower.setdefault(code[:len(prefix) + 1], []).append(code)
+            pending.extend((p, m) for p, m in narrower.items() if len(m) >= 2 and len(p) < len(m[0]))
+            print(f"[批量检索] 前缀 [{prefix}] 结果过多，拆分为更窄的前缀。")
+            continue
+
+        for code in members:
+            answers[code] = [row for row in rows if code in subject_of(row)]
+
+    print(f"[批量检索] 完成：{queries} 次前缀检索回答了 {len(answers)} 个编号。")
+    return answers
\ No newline at end of file
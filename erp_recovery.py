@@ -0,0 +1,253 @@
+"""
+ValkyrieEngine 分级自愈策略模块 (Tiered Recovery Policy)
+功能：为所有业务线的数据提取循环提供统一的异常自愈策略，按代价从低到高逐级升级：
+  1. research  : 不做任何页面操作，稍候 1 秒后直接重新发起检索
+  2. clear_tag : 清除列表残留的“主题:”筛选标签 (或工作台的清空按钮)，含定位与重绘等待
+  3. reload    : 重载当前检索标签页并恢复筛选条件
+  4. rebuild   : 重建检索环境 (优先热备切换，其次回首页重新导航)
+  5. restart   : 销毁并重启整个浏览器进程，注入登录时保存的会话状态
+
+【代价模型】
+每一级的代价取自运行时实测耗时 (erp_latency 中的 'recovery_<级别>' 样本，样本不足时使用经验默认值)，
+每一级对各类故障的修复成功率以经验先验为起点，并随本次运行中的实际修复结果持续修正。
+对于一次具体的故障，策略会在剩余自愈步数内计算“从第 k 级开始、失败则继续升级”的期望总代价，选择期望代价最小的级别作为起点。
+绝大多数瞬时故障 (残留标签、AJAX 重绘导致的元素失效) 在 1 秒内即可修复，无需动辄 30 秒的全量重建。
+"""
+
+import threading
+import time
+
+import config
+import erp_latency
+import erp_list_search
+import erp_login
+from erp_watchdog import ItemDeadlineExceeded
+
+# 自愈级别，按代价从低到高排列
+TIERS = ("research", "clear_tag", "reload", "rebuild", "restart")
+
+TIER_NAMES = {
+    "research": "重新检索",
+    "clear_tag": "清除筛选标签",
+    "reload": "重载标签页",
+    "rebuild": "重建检索环境",
+    "restart": "重启浏览器",
+}
+
+# 各级别的经验默认代价 (秒)，实测样本积累后被真实耗时取代
+# (research 固定等待 1 秒；clear_tag 定位标签最多 2 秒，清除后再等待页面重绘)
+DEFAULT_COST = {
+    "research": 1,
+    "clear_tag": 3,
+    "reload": 15,
+    "rebuild": 40,
+    "restart": 120,
+}
+
+# 单次重试本身的经验默认代价 (秒)，同样会被实测样本取代
+DEFAULT_RETRY_COST = 8
+
+# 所有级别均修复失败、最终放弃该任务的代价 (秒)：放弃的数据需要人工补录，代价远高于任何一级自愈
+GIVE_UP_COST = 600
+
+# 各类故障在各级别上的修复成功率先验，以 (成功, 失败) 伪计数表示
+PRIORS = {
+    "search_timeout": {"research": (2, 2), "clear_tag": (3, 1), "reload": (3, 1), "rebuild": (4, 1), "restart": (4, 1)},
+    "element_lost":   {"research": (3, 1), "clear_tag": (1, 3), "reload": (3, 1), "rebuild": (4, 1), "restart": (4, 1)},
+    "render_timeout": {"research": (1, 3), "clear_tag": (0, 4), "reload": (2, 2), "rebuild": (3, 1), "restart": (4, 1)},
+    "deadline":       {"research": (2, 2), "clear_tag": (1, 3), "reload": (2, 2), "rebuild": (4, 1), "restart": (4, 1)},
+    "disconnected":   {"research": (0, 4), "clear_tag": (0, 4), "reload": (0, 4), "rebuild": (1, 3), "restart": (4, 1)},
+    "other":          {"research": (2, 2), "clear_tag": (1, 3), "reload": (2, 2), "rebuild": (3, 1), "restart": (4, 1)},
+}
+
+# 实际修复结果：{(故障类型, 级别): [成功次数, 失败次数]}
+_stats = {}
+_lock = threading.Lock()
+
+
+def classify_failure(error):
+    """
+    故障分类：沿异常链 (raise ... from e) 逐层检查异常类型与信息，归入 PRIORS 中的某一类
+    """
+    texts = []
+    current = error
+    while current is not None:
+        if isinstance(current, ItemDeadlineExceeded):
+            return "deadline"
+        if isinstance(current, ConnectionError):
+            return "disconnected"
+        texts.append(f"{type(current).__name__} {current}")
+        current = current.__cause__ or current.__context__
+
+    text = " ".join(texts)
+    if "Disconnected" in text or "BrowserConnect" in text or "连接已断开" in text:
+        return "disconnected"
+    if "ListRenderTimeout" in text:
+        return "render_timeout"
+    if "ElementLost" in text or "ElementNotFound" in text or "NoneElement" in text or "AttributeError" in text:
+        return "element_lost"
+    if "SearchTimeout" in text:
+        return "search_timeout"
+    return "other"
+
+
+def record_outcome(failure, tier, fixed):
+    with _lock:
+        counts = _stats.setdefault((failure, tier), [0, 0])
+        counts[0 if fixed else 1] += 1
+
+
+def success_rate(failure, tier):
+    """
+    修复成功率估计：经验先验伪计数 + 本次运行的实际修复结果
+    """
+    prior_ok, prior_fail = PRIORS.get(failure, PRIORS["other"])[tier]
+    with _lock:
+        ok, fail = _stats.get((failure, tier), (0, 0))
+    return (prior_ok + ok) / (prior_ok + prior_fail + ok + fail)
+
+
+def tier_cost(tier):
+    cost = erp_latency.get_percentile(f"recovery_{tier}", 50, min_samples=3)
+    return DEFAULT_COST[tier] if cost is None else cost
+
+
+def retry_cost(failure):
+    """
+    故障重试本身的代价：按故障类型分别学习。超时类故障的每次重试往往要耗满看门狗截止时间，代价远高于普通故障
+    """
+    cost = erp_latency.get_percentile(f"recovery_retry_{failure}", 50, min_samples=3)
+    if cost is not None:
+        return cost
+    if failure == "deadline" and config.ITEM_DEADLINE > 0:
+        return config.ITEM_DEADLINE
+    return DEFAULT_RETRY_COST
+
+
+def choose_tier(failure, tiers, steps_left):
+    """
+    [代价模型] 在可用级别 tiers (按代价升序) 中，选出期望总代价最小的下一级别
+    E(k, n) = 第 k 级代价 + 重试代价 + (1 - 第 k 级成功率) × min{ E(j, n-1) | j 高于 k }
+    剩余步数 n 耗尽或已无更高级别时，失败一方计入放弃代价。步数有限时，代价模型会自动跳过“便宜但大概率无效”的级别。
+    """
+    if not tiers or steps_left <= 0:
+        return None
+
+    retry = retry_cost(failure)
+    cost = {t: tier_cost(t) + retry for t in tiers}
+    rate = {t: success_rate(failure, t) for t in tiers}
+
+    # best[n][i]：剩余 n 步、只能使用第 i 个及更高级别时的最小期望代价
+    best = [[GIVE_UP_COST] * (len(tiers) + 1) for _ in range(steps_left + 1)]
+    expected = {}
+    for n in range(1, steps_left + 1):
+        for i in range(len(tiers) - 1, -1, -1):
+            tier = tiers[i]
+            value = cost[tier] + (1 - rate[tier]) * best[n - 1][i + 1]
+            if n == steps_left:
+                expected[tier] = value
+            best[n][i] = min(value, best[n][i + 1])
+
+    return min(tiers, key=lambda t: expected[t])
+
+
+def summary():
+    """
+    输出本次运行中各级自愈的修复统计
+    """
+    with _lock:
+        items = sorted(_stats.items(), key=lambda kv: (kv[0][0], TIERS.index(kv[0][1])))
+    if not items:
+        return
+    print("[自愈策略] 本次运行的分级自愈统计：")
+    for (failure, tier), (ok, fail) in items:
+        print(f"    - {failure:<15} {TIER_NAMES[tier]:<8} 修复 {ok} 次 / 未修复 {fail} 次")
+
+
+class RecoveryPolicy:
+    """
+    分级自愈策略
+    actions 为 {级别: 无参可调用对象} 的字典，缺失或值为 None 的级别视为当前业务线不可用。
+    """
+
+    def __init__(self, actions, max_steps=None):
+        self.actions = actions
+        self.max_steps = config.RECOVERY_MAX_STEPS if max_steps is None else max_steps
+
+    def _available(self, after=None):
+        tiers = [t for t in TIERS if self.actions.get(t) is not None]
+        if after is not None:
+            tiers = tiers[tiers.index(after) + 1:]
+        return tiers
+
+    def _apply(self, tier):
+        print(f"[自愈策略] 执行第 {TIERS.index(tier) + 1} 级自愈：{TIER_NAMES[tier]}...")
+        start = time.time()
+        try:
+            self.actions[tier]()
+        finally:
+            erp_latency.record_latency(f"recovery_{tier}", time.time() - start)
+
+    def run(self, attempt_fn, label=""):
+        """
+        执行单个任务，失败时按代价模型选择起始级别逐级自愈并重试
+        返回：attempt_fn 的返回值；自愈步数耗尽或所有级别均失败时，抛出最后一次的异常。
+        """
+        failure = None  # 触发当前自愈链的故障类型
+        tier = None     # 最近一次执行的自愈级别
+        steps = 0
+
+        while True:
+            start = time.time()
+            try:
+                result = attempt_fn()
+            except Exception as e:
+                if tier is not None:
+                    erp_latency.record_latency(f"recovery_retry_{failure}", time.time() - start)
+                    record_outcome(failure, tier, False)
+                    print(f"[自愈策略] {TIER_NAMES[tier]} 未能修复 {label} 的故障，准备升级处理...")
+                else:
+                    failure = classify_failure(e)
+                    print(f"[自愈策略] {label} 故障类型判定为 [{failure}]：{e}")
+
+                # 选择下一级：首次故障按代价模型挑选起点，此后只能向更高代价的级别升级
+                while True:
+                    tier = choose_tier(failure, self._available(after=tier), self.max_steps - steps)
+                    if tier is None:
+                        raise e
+                    steps += 1
+                    try:
+                        self._apply(tier)
+                        break
+                    except Exception as action_error:
+                        record_outcome(failure, tier, False)
+                        print(f"[自愈策略] {TIER_NAMES[tier]} 执行失败 ({action_error})，继续升级...")
+                continue
+
+            if tier is not None:
+                erp_latency.record_latency(f"recovery_retry_{failure}", time.time() - start)
+                record_outcome(failure, tier, True)
+                print(f"[自愈策略] {label} 已由第 {TIERS.index(tier) + 1} 级自愈 [{TIER_NAMES[tier]}] 修复。")
+            return result
+
+
+def for_search_pool(search_pool):
+    """
+    为基于检索标签页池的列表类业务线 (功能 1/2/3) 构建自愈策略
+    """
+    def research():
+        search_pool.active.wait(1)
+
+    def clear_tag():
+        erp_list_search.clear_subject_tag(search_pool.active)
+
+    def restart():
+        search_pool.restart(erp_login.restart_browser(search_pool.page))
+
+    return RecoveryPolicy({
+        "research": research,
+        "clear_tag": clear_tag,
+        "reload": search_pool.reload_active,
+        "rebuild": search_pool.failover,
+        "restart": restart if erp_login.can_restart() else None,
+    })
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+ValkyrieEngine 增量刷新模块 (Incremental Refresh)
+功能：以上一次运行的输出表为底稿，终态行 (不会再变化的结果) 原样沿用，只重新查询状态仍可能变化的编号，
+合并结果按输入顺序写回同一输出表。终态判定由各业务线提供 (is_final)：
+  - 功能1：精确命中且已提取出项目中标金额；
+  - 功能2：逐工程判定，新/老版本工程维度发包且已提取出中标金额，或“无此工程”。全部工程均为终态的项目整行沿用，
+    其余项目重新查询，已发包的终态工程后缀直接沿用上次结果；
+  - 功能3：全部工程均为“结束”或“无此工程”。
+“无此工程”只在工程数不变时成立：功能2/3 的行须底稿中记录的工程数与当前真实工程数一致才算终态
+(当前工程数取自工程数缓存或工作台查询，兜底值与未知工程数一律视为不一致)，项目新增工程后即整行重新查询。
+未发包、待确认、未盘点与各类异常/失败记录一律重新查询。
+输出表同时也是下一次的底稿：运行期间的自动存档在已处理的行之后保留尚未处理编号的原有行，中途崩溃不会丢失底稿。
+功能5 的字段均为可变的项目主数据，不参与增量刷新。
+"""
+
+import config
+import data_excel
+import erp_cache
+
+
+def load(output_file):
+    """
+    读取上一次的输出表作为底稿：未开启增量刷新时返回空字典 (全部重新查询)
+    返回：{项目编号: 上次输出的行}
+    """
+    if not config.INCREMENTAL_REFRESH:
+        return {}
+    return data_excel.load_previous_results(output_file)
+
+
+def known_counts(codes, previous):
+    """
+    底稿中已有行的编号在工程数缓存中的真实工程数 (登录前即可核对终态；缓存未命中的编号登录后再查询)
+    """
+    return erp_cache.get_counts([code for code in codes if code in previous]) if previous else {}
+
+
+def count_matches(row, count):
+    """
+    底稿中记录的工程数与当前真实工程数一致 (当前工程数未知时视为不一致)
+    """
+    if count is None:
+        return False
+    try:
+        return int(float(row.get("工程数"))) == int(count)
+    except (TypeError, ValueError):
+        return False
+
+
+def pending_codes(codes, previous, is_final, counts=None):
+    """
+    需要重新查询的编号 (保持输入顺序)：底稿中没有或仍可能变化的编号
+    counts 为当前真实工程数 {编号: 工程数}，供功能2/3 核对终态
+    """
+    counts = counts or {}
+    pending = [code for code in codes if not is_final(previous.get(code), counts.get(code))]
+    if previous:
+        print(f"[增量刷新] 共 {len(codes)} 个编号：沿用上次结果 {len(codes) - len(pending)} 个，"
+              f"重新查询 {len(pending)} 个。")
+    return pending
+
+
+def carried_rows(codes, previous):
+    """
+    全部编号均为终态时，按输入顺序直接输出底稿中的行
+    """
+    return [dict(previous[code]) for code in codes]
+
+
+def with_baseline(results, codes, previous):
+    """
+    自动存档的内容：按输入顺序已处理完毕的行 (results 与 codes 的前缀一一对应)，加上其余编号在底稿中的原有行
+    """
+    return results + [dict(previous[code]) for code in codes[len(results):] if code in previous]
+
+
+def merge_counts(codes, counts):
+    """
+    按输入顺序构建工程数边界字典：[{'项目编号': 编号, '工程数': 数量或 None}, ...]
+    """
+    return [{"项目编号": code, "工程数": counts.get(code)} for code in codes]
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+ValkyrieEngine 运行规划模块 (Dry Run)
+功能：在启动浏览器之前，对一次批量任务做试算：读取并清洗输入表格 (data_excel.load_and_clean_data)，
+结合本地缓存 (erp_cache) 与历次运行记录的操作耗时，按功能报告：
+  - 有效编号、去重后的编号数与重复编号数 (重复编号仍会逐条处理，属于可提前消除的浪费)；
+  - 各类缓存的命中情况 (工程数、空结果、单据内容、列表镜像)；
+  - 可按共享前缀批量检索的编号 (erp_query_planner)；
+  - 开启增量刷新时，可沿用上一次输出表的终态编号 (erp_refresh)；
+  - 预计的界面检索次数、HTTP 请求次数、详情页打开次数与预计耗时。
+不启动 Chrome、不登录 ERP。本地缓存以只读方式打开 (erp_cache.read_only)：不建表、不写入，
+缓存文件尚不存在时不会创建，按全部未命中估算。
+耗时按历次运行记录的中位数 (erp_latency.persist) 估算，尚无记录的操作使用 DEFAULT_SECONDS 中的经验值；
+浏览器启动、登录与环境导航的固定开销不计入。
+"""
+
+import config
+import data_excel
+import erp_cache
+import erp_construction_bidding
+import erp_construction_bidding_01
+import erp_construction_bidding_data_extractor
+import erp_construction_bidding_data_extractor_01
+import erp_information_data_extractor
+import erp_inventory_data_extractor
+import erp_list_search
+import erp_query_planner
+import erp_refresh
+
+# 尚无运行记录时各类操作的经验耗时 (秒)
+DEFAULT_SECONDS = {
+    "f1_search": 6.0,
+    "f2_project_search": 6.0,
+    "f3_search": 4.0,
+    "f5_query": 10.0,
+    "detail_open": 4.0,
+    "http_detail": 1.0,
+    "workbench_count": 5.0,
+    "http_count": 0.5,
+    "http_list_page": 2.0,
+}
+
+FEATURES = {
+    '1': "中标金额查询（项目维度）",
+    '2': "中标金额查询（工程维度）",
+    '3': "盘点情况查询",
+    '5': "项目基础信息查询",
+}
+
+
+class Estimate:
+    """
+    单个功能的试算结果：报告条目与预计耗时的累加器
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.lines = []
+        self.seconds = 0.0
+
+    def cost(self, op_name):
+        """
+        单次操作的预计耗时：优先取历次运行记录的中位数
+        """
+        if op_name in self.history:
+            return self.history[op_name][0]
+        return DEFAULT_SECONDS[op_name]
+
+    def add(self, label, value, op_name=None, times=0, parallel=1):
+        """
+        追加一条报告；给出 op_name 时，按“次数 × 单次耗时 / 并发数”计入预计耗时
+        """
+        if op_name is not None and times:
+            spent = times * self.cost(op_name) / parallel
+            self.seconds += spent
+            value = f"{value}  (约 {spent / 60:.1f} 分钟)"
+        self.lines.append((label, value))
+
+
+def count_plan(est, codes):
+    """
+    工程数获取 (功能2/3)：读取工程数缓存，返回 {编号: 工程数}；未命中的编号按工作台查询计入耗时
+    """
+    unique = list(dict.fromkeys(codes))
+    if config.ENGINEERING_COUNT_SOURCE == 'search':
+        est.add("工程数来源", "由检索结果推导 (不查询工作台)")
+        return {}
+
+    cached = erp_cache.get_counts(unique)
+    misses = len(unique) - len(cached)
+    est.add("工程数缓存命中", f"{len(cached)} / {len(unique)}")
+    if config.COUNT_FETCH == 'http':
+        est.add("工作台查询 (HTTP)", f"{misses} 次", "http_count", misses, config.HTTP_WORKERS)
+    else:
+        est.add("工作台查询 (界面)", f"{misses} 次", "workbench_count", misses)
+    return cached
+
+
+def search_plan(est, codes, search_op):
+    """
+    检索方式 (功能1/2/3)：扣除前缀批量检索可覆盖的编号后，其余编号 (含重复编号) 逐个界面检索
+    """
+    covered = set()
+    if config.PREFIX_BATCH:
+        groups, _ = erp_query_planner.group_codes(codes)
+        covered = {code for members in groups.values() for code in members}
+        est.add("可批量检索的前缀组", f"{len(groups)} 组，覆盖 {len(covered)} 个编号")
+        # 每组至少一次前缀检索，结果较多时还需翻页或拆分
+        est.add("前缀检索 (HTTP)", f"至少 {len(groups)} 次", "http_list_page", len(groups))
+
+    searches = sum(1 for code in codes if code not in covered)
+    est.add("界面检索", f"{searches} 次", search_op, searches)
+
+
+def detail_plan(est, opens, bound=False, needed=True):
+    """
+    详情页获取 (功能1/2)：按详情获取方式计入耗时；列投影不含详情字段 (needed 为假) 时不打开详情页
+    """
+    if not needed:
+        est.add("详情页", "列投影不含详情字段，不打开详情页")
+        return
+    label = f"{'至多 ' if bound else ''}{opens} 次"
+    if config.DETAIL_FETCH == 'http':
+        est.add("详情获取 (HTTP)", label, "http_detail", opens, config.HTTP_WORKERS)
+    else:
+        est.add("详情页打开 (浏览器)", label, "detail_open", opens)
+
+
+def mirror_usable(list_key):
+    """
+    列表镜像已启用且已同步过时，命中情况可由本地索引离线判定 (镜像读取失败时按未同步处理)
+    """
+    if not config.LIST_MIRROR or not erp_cache.available():
+        return False
+    try:
+        return erp_cache.get_mirror_state(list_key) is not None
+    except Exception as e:
+        print(f"[运行规划] 列表镜像读取失败，按界面检索估算：{e}")
+        return False
+
+
+def mirror_rows(list_key, keyword):
+    """
+    读取镜像索引行；读取失败时视为无匹配
+    """
+    try:
+        return erp_cache.find_mirror_rows(list_key, keyword)
+    except Exception as e:
+        print(f"[运行规划] 列表镜像读取失败：{e}")
+        return []
+
+
+def plan_feature_1(est, codes):
+    extractor = erp_construction_bidding_data_extractor
+    pending = [code for code in codes if erp_cache.get_negative(extractor.NEGATIVE_NAMESPACE, code) is None]
+    est.add("空结果缓存命中", f"{len(codes) - len(pending)} 个编号")
+
+    if mirror_usable(erp_construction_bidding.STATE_KEY):
+        # 列表镜像可离线给出命中情况，只有精确命中且无内容缓存的单据需要打开详情；镜像未命中的编号仍需界面检索确认
+        hits, misses = {}, []
+        for code in pending:
+            rows = mirror_rows(erp_construction_bidding.STATE_KEY, f"{code}-")
+            if len(rows) == 1:
+                hits[code] = rows[0][0]
+            elif not rows:
+                misses.append(code)
+        est.add("列表镜像", f"{len(pending)} 个编号本地判定：精确命中 {len(hits)} 个，未命中 {len(misses)} 个 (界面检索确认)")
+        est.add("界面检索", f"{len(misses)} 次", "f1_search", len(misses))
+        cached = erp_cache.count_contents(extractor.CACHE_NAMESPACE, extractor.CACHE_SCHEMA, hits.values())
+        est.add("单据内容缓存命中", f"{cached} 个")
+        detail_plan(est, len(hits) - cached, needed=bool(extractor.detail_fields()))
+        return
+
+    search_plan(est, pending, "f1_search")
+    detail_plan(est, len(pending), bound=True, needed=bool(extractor.detail_fields()))
+
+
+def plan_feature_2(est, codes):
+    extractor = erp_construction_bidding_data_extractor_01
+    counts = count_plan(est, codes)
+
+    # 工程数未知的编号按 5 个工程 (功能2 的处理上限) 估算
+    suffixes = []
+    for code in codes:
+        suffixes.extend(f"{code}_{i:02d}" for i in range(1, min(counts.get(code, 5), 5) + 1))
+    open_suffixes = [s for s in suffixes if erp_cache.get_negative(extractor.NEGATIVE_NAMESPACE, s) is None]
+    est.add("待处理工程后缀", f"{len(suffixes)} 个，其中空结果缓存命中 {len(suffixes) - len(open_suffixes)} 个")
+
+    opened = set(s.rsplit('_', 1)[0] for s in open_suffixes)
+    projects = [code for code in codes if code in opened]
+    if mirror_usable(erp_construction_bidding_01.STATE_KEY):
+        found = {}
+        for code in dict.fromkeys(projects):
+            for doc_key, subject, _ in mirror_rows(erp_construction_bidding_01.STATE_KEY, f"{code}_"):
+                matched = erp_list_search.match_suffix(code, subject)
+                if matched and f"{code}_{matched[0]:02d}" in open_suffixes:
+                    found.setdefault(f"{code}_{matched[0]:02d}", doc_key)
+        # 镜像中缺少待处理工程的项目仍需界面检索确认
+        unresolved = [code for code in dict.fromkeys(projects)
+                      if any(s.rsplit('_', 1)[0] == code and s not in found for s in open_suffixes)]
+        est.add("列表镜像", f"{len(projects)} 个项目本地判定：找到 {len(found)} 个工程单据，"
+                        f"{len(unresolved)} 个项目不齐全 (界面检索确认)")
+        est.add("界面检索", f"{len(unresolved)} 次", "f2_project_search", len(unresolved))
+        cached = erp_cache.count_contents(extractor.CACHE_NAMESPACE, extractor.CACHE_SCHEMA, found.values())
+        est.add("单据内容缓存命中", f"{cached} 个")
+        detail_plan(est, len(found) - cached, needed=bool(extractor.selected_fields()))
+        return
+
+    search_plan(est, projects, "f2_project_search")
+    detail_plan(est, len(open_suffixes), bound=True, needed=bool(extractor.selected_fields()))
+
+
+def plan_feature_3(est, codes):
+    count_plan(est, codes)
+    if config.LIST_HARVEST != 'off' and "list_harvest" in est.history:
+        # 整表采集与逐个检索的取舍在运行时实测决定，此处仅列出上次采集耗时供参考
+        est.add("整表采集 (历次实测)", f"约 {est.history['list_harvest'][0]:.0f} 秒")
+    search_plan(est, codes, "f3_search")
+
+
+def plan_feature_5(est, codes):
+    namespace = erp_information_data_extractor.NEGATIVE_NAMESPACE
+    pending = [code for code in codes if erp_cache.get_negative(namespace, code) is None]
+    est.add("空结果缓存命中", f"{len(codes) - len(pending)} 个编号")
+    est.add("工作台查询与提取", f"{len(pending)} 次", "f5_query", len(pending))
+
+
+PLANNERS = {'1': plan_feature_1, '2': plan_feature_2, '3': plan_feature_3, '5': plan_feature_5}
+
+# 参与增量刷新的功能：终态判定 (功能5 的字段均为可变的项目主数据，不参与)
+FINALITY = {
+    '1': erp_construction_bidding_data_extractor.is_final,
+    '2': erp_construction_bidding_data_extractor_01.is_final,
+    '3': erp_inventory_data_extractor.is_final,
+}
+
+
+def plan(feature):
+    """
+    [控制器] 对指定功能的输入表格做试算并打印报告
+    """
+    codes = data_excel.load_and_clean_data(getattr(config, f"F{feature}_INPUT"))
+    if not codes:
+        print("[运行规划] 输入表格中没有有效编号。")
+        return None
+
+    # 试算期间缓存只读：不建表、不写入，缓存文件不存在时不会创建
+    with erp_cache.read_only():
+        est = Estimate(erp_cache.get_latency_stats())
+        if not erp_cache.available():
+            est.add("本地缓存", "尚未建立，按全部未命中估算")
+        unique = list(dict.fromkeys(codes))
+        est.add("有效编号", f"{len(codes)} 个 (去重后 {len(unique)} 个)")
+        if len(codes) > len(unique):
+            est.add("重复编号", f"{len(codes) - len(unique)} 个 (仍会逐条处理，建议提前去重)")
+
+        if feature in FINALITY and config.INCREMENTAL_REFRESH:
+            previous = erp_refresh.load(getattr(config, f"F{feature}_OUTPUT"))
+            counts = erp_refresh.known_counts(codes, previous)
+            pending = [code for code in codes if not FINALITY[feature](previous.get(code), counts.get(code))]
+            note = " (部分工程沿用的项目仍按全部工程估算)" if feature == '2' else ""
+            if feature in ('2', '3'):
+                note += "；工程数缓存未命中的编号按重新查询估算"
+            est.add("增量刷新", f"沿用上次结果 {len(codes) - len(pending)} 个，重新查询 {len(pending)} 个{note}")
+            codes = pending
+
+        PLANNERS[feature](est, codes)
+
+    print("\n" + "-" * 50)
+    print(f"  [运行规划] 功能 {feature}：{FEATURES[feature]}")
+    print("-" * 50)
+    for label, value in est.lines:
+        print(f"    {label}：{value}")
+    known = [op for op in DEFAULT_SECONDS if op in est.history]
+    print(f"    预计耗时：约 {est.seconds / 60:.1f} 分钟 (不含浏览器启动、登录与环境导航)")
+    print(f"    耗时依据：{'历次运行实测 (' + ', '.join(known) + ')' if known else '经验值 (尚无运行记录)'}"
+          f"{'；其余操作使用经验值' if known and len(known) < len(DEFAULT_SECONDS) else ''}")
+    print("-" * 50)
+    return est
\ No newline at end of file
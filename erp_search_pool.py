@@ -0,0 +1,449 @@
+"""
+ValkyrieEngine 检索标签页池 (对冲检索 Hedged Search)
+功能：统一托管业务列表的“主检索标签页”与“备用检索标签页”。
+
+【对冲检索原理】
+绝大多数检索都能在数秒内完成，但每批总有少数检索会卡到 SearchTimeout，随后触发代价高昂的整页重置。
+开启对冲模式后，当一次检索的耗时超过该操作已学习到的 p95 延迟时，会在预热好的备用标签页上发起同一检索：
+  - 谁先拿到结果谁胜出，落后一方收到取消信号，在下一个检查点自行放弃；
+  - 若备用标签页胜出，主备角色立即互换，后续检索直接在新的主标签页上进行；
+  - 只有超过 p95 的“长尾”检索才会触发第二次请求，额外请求数以长尾检索的数量为上限。
+
+【热备切换原理】
+开启热备模式 (WARM_STANDBY) 后，池中始终保留一个已挂载好筛选条件的备用标签页。
+主标签页故障时，备用标签页立即顶替成为主标签页 (failover)，随后在后台线程中按业务列表地址重新预热新的备用标签页，
+自愈耗时从“回首页 + 菜单导航 + 挂载条件 + 等待全量列表渲染”的数十秒降至几乎为零。
+
+【常驻详情标签页】
+[V2.4.0 新增] 池内额外托管一个常驻详情标签页：读取列表行的单据链接后在该标签页中原地导航，
+取代“点击 -> latest_tab -> 用后关闭”，免去每条单据新建/销毁渲染进程的开销，等待也只针对这一个标签页自身的导航，
+彻底消除“取到错误的最新标签页”的竞态。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import config
+import erp_latency
+import erp_list_state
+import erp_list_search
+from erp_list_search import SearchCancelled
+
+
+class SearchTabPool:
+    """
+    检索标签页池
+    nav_module 为业务线专属的导航模块（如 erp_construction_bidding），
+    必须提供 open_search_tab / setup_search_environment / reset_and_back_to_home 三个函数。
+    """
+
+    def __init__(self, page, nav_module, hedge=False, warm_standby=None):
+        self.page = page
+        self.nav_module = nav_module
+        self.hedge = hedge
+        self.warm_standby = config.WARM_STANDBY if warm_standby is None else warm_standby
+        self.active = None   # 主检索标签页
+        self.standby = None  # 预热好的备用检索标签页 (对冲或热备模式下存在)
+
+        # 标签页创建锁：“点击 -> latest_tab”式的新标签页获取必须与后台预热的 new_tab 互斥，
+        # 否则后台新开的备用标签页可能被误认为是刚弹出的详情页。
+        self.tab_lock = threading.Lock()
+
+        # 被取消但仍在收尾的检索任务。备用标签页在其结束前不可再次投入使用
+        self._standby_busy = None
+        self._executor = None
+        # 最近一次对冲检索发起的备用侧 (标签页, 检索任务)，检索未结束前供看门狗定位嫌疑标签页
+        self._hedge = None
+
+        # 后台预热状态：正在构建中的标签页，以及用于识别“过期”预热任务的代次号
+        self._building_tab = None
+        self._builder_thread = None
+        self._generation = 0
+
+        # [V2.4.0 新增] 常驻详情标签页，以及它当前是否正在被某个任务使用 (供看门狗定位嫌疑标签页)
+        self.detail = None
+        self._detail_busy = False
+
+    @property
+    def keeps_standby(self):
+        return self.hedge or self.warm_standby
+
+    @contextmanager
+    def creating_tab(self):
+        """
+        新标签页创建临界区
+        限时获取标签页创建锁：即便持锁的工作线程被看门狗遗弃，也最多等待 30 秒，绝不让主流程永久死锁。
+        """
+        acquired = self.tab_lock.acquire(timeout=30)
+        try:
+            yield
+        finally:
+            if acquired:
+                self.tab_lock.release()
+
+    # ---------------- 生命周期管理 ----------------
+
+    def build(self):
+        """
+        初始化检索环境：构建主标签页，对冲/热备模式下额外预热一个备用标签页
+        """
+        self.active = self.nav_module.setup_search_environment(self.page)
+        if self.keeps_standby:
+            self.standby = self._open_standby()
+        return self
+
+    def rebuild(self):
+        """
+        全量重建：清理所有衍生标签页、刷新首页，再重新构建主备标签页
+        """
+        self.nav_module.reset_and_back_to_home(self.page)
+        return self._rebuild_on(self.page)
+
+    def restart(self, page):
+        """
+        [V2.4.0 新增] 浏览器重启后的接管：切换至新的浏览器句柄并重新构建主备标签页
+        """
+        self.page = page
+        return self._rebuild_on(page)
+
+    def _rebuild_on(self, page):
+        self._generation += 1  # 令仍在后台运行的预热任务作废
+        self.standby = None
+        self._standby_busy = None
+        self._hedge = None
+        self._building_tab = None
+        self.detail = None
+        self.active = self.nav_module.setup_search_environment(page)
+        if self.keeps_standby:
+            self.standby = self._open_standby()
+        return self.active
+
+    def reload_active(self):
+        """
+        [V2.4.0 新增] 原地重载主检索标签页 (分级自愈的“重载标签页”级别)
+        优先按列表状态存档载入已配置的列表；无存档或校验不一致时，回到业务列表地址 (或原地刷新) 后重新挂载筛选条件。
+        """
+        tab = self.active
+        if tab is None or not self._is_alive(tab):
+            raise Exception("TabLost: 主检索标签页已失效，无法原地重载")
+
+        state_key = getattr(self.nav_module, 'STATE_KEY', None)
+        if state_key and erp_list_state.reload_configured_tab(tab, state_key, self.nav_module.RENDER_ANCHOR):
+            return tab
+
+        list_url = getattr(self.nav_module, 'LIST_URL', None)
+        if list_url:
+            tab.get(list_url)
+        else:
+            tab.refresh()
+        self.nav_module.apply_search_conditions(tab)
+        return tab
+
+    def failover(self):
+        """
+        快速自愈：销毁故障的主标签页，由热备标签页立即顶替，并在后台重新预热新的备用标签页。
+        若当前没有可用的备用标签页，则退化为全量重建。
+        """
+        if self.standby is None and self._builder_thread is not None and self._builder_thread.is_alive():
+            # 新的备用标签页正在后台预热，等待它通常仍比全量重建快得多
+            print("[热备切换] 备用检索标签页正在后台预热，等待其就绪...")
+            self._builder_thread.join(timeout=45)
+
+        standby = self.standby
+        if standby is not None and self._standby_busy is not None and not self._standby_busy.done():
+            # 备用标签页上仍有被取消的对冲检索在收尾，稍候片刻
+            try:
+                self._standby_busy.result(timeout=5)
+            except Exception:
+                pass
+            if not self._standby_busy.done():
+                standby = None
+
+        if standby is None or not self._is_alive(standby):
+            print("[热备切换] 暂无可用的备用检索标签页，退化为全量环境重建...")
+            return self.rebuild()
+
+        broken = self.active
+        self.active = standby
+        self.standby = None
+        self._standby_busy = None
+        self._discard_tab(broken)
+        print("[热备切换] 备用检索标签页已顶替故障标签页，检索环境即时恢复。")
+
+        self._start_background_standby()
+        return self.active
+
+    def close(self):
+        """
+        释放对冲检索线程池 (不等待仍在收尾的被取消任务)，并令后台预热任务作废
+        """
+        self._generation += 1
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self.detail is not None:
+            self._discard_tab(self.detail)
+            self.detail = None
+
+    def protected_tab_ids(self):
+        """
+        返回池内备用/预热中标签页的 ID，看门狗清理“本次任务新开的标签页”时必须跳过它们
+        (正在执行对冲检索的备用标签页除外，它可能正是卡死的一方)
+        """
+        ids = []
+        hedging = self._hedging_tab()
+        for tab in (self.standby, self._building_tab):
+            if tab is not None and tab is not hedging:
+                ids.append(tab.tab_id)
+        return ids
+
+    def _hedging_tab(self):
+        """
+        对冲检索的备用侧仍在检索时返回该备用标签页，否则返回 None
+        """
+        hedge = self._hedge
+        if hedge is not None and not hedge[1].done() and hedge[0] is not self.active:
+            return hedge[0]
+        return None
+
+    def suspect_tabs(self):
+        """
+        看门狗超时时的嫌疑标签页：常驻详情标签页正在使用中则为它，否则为主检索标签页
+        (对冲检索的备用侧仍在检索时，连同该备用标签页一并视为嫌疑)
+        """
+        if self._detail_busy and self.detail is not None:
+            return [self.detail]
+        hedging = self._hedging_tab()
+        return [self.active] if hedging is None else [self.active, hedging]
+
+    # ---------------- 详情页 ----------------
+
+    @contextmanager
+    def open_detail(self, row):
+        """
+        [V2.4.0 新增] 打开列表行对应的详情页，with 块内可用
+        优先读取行内单据链接，在常驻详情标签页中原地导航 (首次使用或已失效时新建)，块结束后标签页保留复用；
+        行内找不到可导航的链接时，退回“点击 -> latest_tab”的原有方式，块结束后关闭该标签页。
+        """
+        url = erp_list_search.row_link(row)
+
+        if url is None:
+            # 持有标签页创建锁，防止后台预热的备用检索标签页被误认为详情页
+            with self.creating_tab():
+                row.click()
+                # 给底层系统留出响应打开新标签页的微小时间差
+                self.page.wait(1)
+                tab = self.page.latest_tab
+            start = time.time()
+            try:
+                yield tab
+                erp_latency.record_latency('detail_open', time.time() - start)
+            finally:
+                print("[资源回收] 正在关闭详情标签页。")
+                self._discard_tab(tab)
+            return
+
+        tab = self.detail
+        if tab is None or not self._is_alive(tab):
+            with self.creating_tab():
+                tab = self.page.new_tab()
+            self.detail = tab
+
+        self._detail_busy = True
+        start = time.time()
+        try:
+            # get() 阻塞至该标签页自身的导航完成，表单就绪与否由后续的轮询读取判定
+            if not tab.get(url):
+                raise Exception(f"DetailLoadTimeout: 详情页导航失败 {url}")
+            yield tab
+            # [V2.4.0] 详情页“打开 + 提取”的耗时，供运行规划预估
+            erp_latency.record_latency('detail_open', time.time() - start)
+        finally:
+            self._detail_busy = False
+
+    # ---------------- 备用标签页预热 ----------------
+
+    def _open_standby(self):
+        """
+        预热一个备用标签页。单次尝试，失败仅返回 None，绝不影响主标签页。
+        优先按列表状态存档直达已配置的列表 (免去筛选点击)；
+        其次按已记录的业务列表地址直达 (new_tab) 并重新挂载条件；否则退化为经首页菜单导航。
+        """
+        print("[热备切换] 正在预热备用检索标签页...")
+        list_url = getattr(self.nav_module, 'LIST_URL', None)
+        tab = None
+        try:
+            restore = getattr(self.nav_module, 'restore_search_tab', None)
+            if restore is not None:
+                tab = restore(self.page, tab_guard=self.creating_tab, on_created=self._mark_building)
+            if tab is None and list_url:
+                with self.creating_tab():
+                    tab = self.page.new_tab(list_url)
+                self._building_tab = tab
+                self.nav_module.apply_search_conditions(tab)
+            elif tab is None:
+                with self.creating_tab():
+                    tab = self.nav_module.open_search_tab(self.page)
+            print("[热备切换] 备用检索标签页已就绪。")
+            return tab
+        except Exception as e:
+            print(f"[热备切换] 备用标签页预热失败，暂不启用对冲/热备：{e}")
+            if tab is not None:
+                self._discard_tab(tab)
+            return None
+        finally:
+            self._building_tab = None
+
+    def _mark_building(self, tab):
+        self._building_tab = tab
+
+    def _start_background_standby(self):
+        """
+        在后台线程中预热新的备用标签页，主流程无需等待
+        """
+        if self._builder_thread is not None and self._builder_thread.is_alive():
+            return
+
+        generation = self._generation
+
+        def build():
+            tab = self._open_standby()
+            if tab is None:
+                return
+            if generation != self._generation:
+                # 预热期间发生了全量重建或池已关闭，本次预热结果作废
+                self._discard_tab(tab)
+                return
+            self.standby = tab
+
+        self._builder_thread = threading.Thread(target=build, name="standby-builder", daemon=True)
+        self._builder_thread.start()
+
+    def _is_alive(self, tab):
+        try:
+            return tab.tab_id in self.page.tab_ids
+        except Exception:
+            return False
+
+    def _standby_ready(self):
+        if self.standby is None:
+            return False
+        return self._standby_busy is None or self._standby_busy.done()
+
+    def _discard_tab(self, tab):
+        """
+        状态不可信的标签页 (检索报错或已被取代) 直接关闭，不再作为备用
+        """
+        try:
+            tab.close()
+        except:
+            pass
+
+    # ---------------- 检索调度 ----------------
+
+    def search(self, op_name, search_fn, *args, cancel_event=None):
+        """
+        执行一次检索
+        参数：
+          - op_name: 延迟统计使用的操作名称 (如 'f1_search')，各业务线分别学习自己的 p95。
+          - search_fn: 检索函数，签名为 search_fn(tab, *args, cancel_event=None)。
+          - cancel_event: 外层任务的取消信号 (看门狗放弃任务时置位)，置位后两侧检索一并停止。
+        返回：(实际产出结果的标签页, 检索结果)。调用方后续的点击等操作必须在返回的标签页上进行。
+        """
+        threshold = None
+        if self.hedge and self._standby_ready():
+            threshold = erp_latency.get_percentile(op_name, 95, min_samples=config.HEDGE_MIN_SAMPLES)
+
+        if threshold is None:
+            # 未启用对冲或统计样本尚不足：在当前线程直接执行，行为与单标签页模式完全一致
+            start = time.time()
+            result = search_fn(self.active, *args, cancel_event=cancel_event)
+            erp_latency.record_latency(op_name, time.time() - start)
+            return self.active, result
+
+        return self._hedged_search(op_name, threshold, search_fn, args, cancel_event)
+
+    def _timed_call(self, op_name, search_fn, tab, args, cancel_event):
+        start = time.time()
+        result = search_fn(tab, *args, cancel_event=cancel_event)
+        erp_latency.record_latency(op_name, time.time() - start)
+        return result
+
+    @staticmethod
+    def _wait_any(futures, timeout, cancel_event, side_cancels):
+        """
+        等待任一侧检索返回 (timeout 为 None 时不限时)；外层任务被取消时通知两侧检索一并停止
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            step = 0.5 if deadline is None else max(0.0, min(0.5, deadline - time.time()))
+            done, _ = wait(futures, timeout=step, return_when=FIRST_COMPLETED)
+            if done or (deadline is not None and time.time() >= deadline):
+                return done
+            if cancel_event is not None and cancel_event.is_set():
+                for side_cancel in side_cancels:
+                    side_cancel.set()
+                erp_list_search.check_cancelled(cancel_event)
+
+    def _hedged_search(self, op_name, threshold, search_fn, args, cancel_event=None):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+
+        primary, backup = self.active, self.standby
+        primary_cancel, backup_cancel = threading.Event(), threading.Event()
+
+        primary_future = self._executor.submit(self._timed_call, op_name, search_fn, primary, args, primary_cancel)
+        done = self._wait_any([primary_future], threshold, cancel_event, [primary_cancel])
+        if primary_future in done:
+            return primary, primary_future.result()
+
+        print(f"[对冲检索] 主标签页检索已超过 p95 ({threshold:.1f}s)，正在备用标签页上发起同一检索...")
+        backup_future = self._executor.submit(self._timed_call, op_name, search_fn, backup, args, backup_cancel)
+        self._hedge = (backup, backup_future)
+
+        pending = {
+            primary_future: (primary, primary_cancel),
+            backup_future: (backup, backup_cancel),
+        }
+        failed_tabs = []
+        first_error = None
+
+        while pending:
+            done = self._wait_any(list(pending), None, cancel_event, [primary_cancel, backup_cancel])
+            for future in done:
+                tab, _cancel = pending.pop(future)
+                try:
+                    result = future.result()
+                except SearchCancelled:
+                    continue
+                except Exception as e:
+                    failed_tabs.append(tab)
+                    if first_error is None:
+                        first_error = e
+                    continue
+
+                # 胜出：通知落后一方放弃，并把它登记为“收尾中”的备用标签页
+                for other_future, (_other_tab, other_cancel) in pending.items():
+                    other_cancel.set()
+                    self._standby_busy = other_future
+
+                loser_tab = backup if tab is primary else primary
+                self.active = tab
+                if any(t is loser_tab for t in failed_tabs):
+                    self._discard_tab(loser_tab)
+                    self.standby = None
+                    self._standby_busy = None
+                    print("[对冲检索] 落后标签页检索报错，已关闭。")
+                    if self.warm_standby:
+                        self._start_background_standby()
+                else:
+                    self.standby = loser_tab
+
+                winner = "备用" if tab is backup else "主"
+                print(f"[对冲检索] {winner}标签页率先返回结果，已取消另一侧检索。")
+                return tab, result
+
+        # 两侧均失败：交由上层的自愈流程处理
+        raise first_error or Exception("SearchTimeout: 对冲检索两侧均未返回结果")
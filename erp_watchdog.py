@@ -0,0 +1,124 @@
+"""
+ValkyrieEngine 单任务看门狗模块 (Per-Item Deadline Watchdog)
+功能：为每个业务编号的单次处理设定墙钟截止时间 (deadline)。
+
+【设计背景】
+DrissionPage 的部分调用在渲染进程卡死时会远远超过其自身的 timeout 参数（例如点击后弹出的新标签页永不加载），
+run_data_cycle 中的 try/except 只有在调用返回后才能生效，单个冻结的详情页可能拖住整批任务数分钟。
+
+【处理流程】
+1. 业务处理函数被放入独立的工作线程执行，主线程按截止时间等待；
+2. 超时后，看门狗通过 DevTools 协议直接销毁“肇事”标签页（本次任务期间新开的标签页；若没有，则销毁调用方指定的嫌疑标签页），
+   工作线程中阻塞的浏览器调用会因连接断开而立即报错返回；
+3. 主线程抛出 ItemDeadlineExceeded，交由各业务线原有的重试/自愈流程接管。
+   被放弃的工作线程不一定能及时退出：cancellable 模式下，看门狗在超时时置位取消信号 (cancel_event)，
+   业务函数在各浏览器操作之间检查该信号 (erp_list_search.check_cancelled) 并停止操作；
+   业务函数只通过返回值交付结果、不修改调用方的共享状态，被放弃的线程即使稍后返回也不会覆盖重试的结果。
+"""
+
+import threading
+import urllib.request
+
+import config
+
+
+class ItemDeadlineExceeded(Exception):
+    """
+    单任务处理超过墙钟截止时间
+    """
+    pass
+
+
+def kill_tab(page, tab_id):
+    """
+    [底层组件] 通过 DevTools 协议强制销毁指定标签页
+    优先走 CDP 的 Target.closeTarget 指令；若浏览器会话本身也被阻塞，
+    则降级调用 DevTools HTTP 端点 /json/close，该通道完全独立于任何标签页的 WebSocket 连接。
+    """
+    try:
+        page.run_cdp('Target.closeTarget', targetId=tab_id)
+        return True
+    except Exception as e:
+        print(f"    [看门狗] CDP 销毁标签页失败 ({e})，尝试 DevTools HTTP 通道...")
+
+    try:
+        address = page.browser.address
+        with urllib.request.urlopen(f"http://{address}/json/close/{tab_id}", timeout=5):
+            pass
+        return True
+    except Exception as e:
+        print(f"    [看门狗] DevTools HTTP 通道同样失败：{e}")
+        return False
+
+
+def run_with_deadline(page, func, args=(), deadline=None, suspect_tabs=None, protected_tabs=None,
+                      cancellable=False):
+    """
+    [核心组件] 带截止时间执行单个任务
+    参数：
+      - page: 浏览器主控对象，用于枚举与销毁标签页。
+      - func / args: 实际的业务处理函数及其参数。
+      - deadline: 截止秒数，缺省读取配置项 ITEM_DEADLINE；小于等于 0 时直接在当前线程执行，不启用看门狗。
+      - suspect_tabs: 可调用对象，超时时调用，返回“嫌疑标签页”列表（通常为当前主检索标签页）。
+                      仅当本次任务期间没有新开标签页时才会销毁它们。
+      - protected_tabs: 可调用对象，返回绝不能销毁的标签页 ID 列表（如后台预热中的备用检索标签页）。
+      - cancellable: 为真时以关键字参数 cancel_event 向 func 传入取消信号，超时即置位。
+    返回：func 的返回值；func 抛出的异常原样向上抛出。
+    """
+    if deadline is None:
+        deadline = config.ITEM_DEADLINE
+
+    cancel_event = threading.Event()
+    kwargs = {"cancel_event": cancel_event} if cancellable else {}
+
+    if not deadline or deadline <= 0:
+        return func(*args, **kwargs)
+
+    tabs_before = set(page.tab_ids)
+    outcome = {}
+    finished = threading.Event()
+
+    def worker():
+        try:
+            outcome["value"] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            finished.set()
+
+    # 守护线程：若被销毁标签页后依旧无法返回，也不会阻止主程序退出
+    threading.Thread(target=worker, name="item-worker", daemon=True).start()
+
+    if finished.wait(deadline):
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome.get("value")
+
+    # ==========================================
+    # 截止时间已到：定位并销毁肇事标签页
+    # ==========================================
+    print(f"[看门狗] 单任务处理超过 {deadline} 秒截止时间，正在强制中断卡死的浏览器调用...")
+    # 先通知工作线程停止后续的浏览器操作，再销毁卡死的标签页
+    cancel_event.set()
+
+    protected = set(protected_tabs()) if protected_tabs is not None else set()
+    try:
+        new_tabs = [tid for tid in page.tab_ids if tid not in tabs_before and tid not in protected]
+    except Exception:
+        new_tabs = []
+
+    targets = new_tabs
+    if not targets and suspect_tabs is not None:
+        targets = []
+        for tab in suspect_tabs():
+            if tab is not None and tab.tab_id not in protected:
+                targets.append(tab.tab_id)
+
+    for tab_id in targets:
+        if kill_tab(page, tab_id):
+            print(f"[看门狗] 已销毁卡死标签页：{tab_id}")
+
+    # 给工作线程一点时间感知连接断开并退出，避免与随后的自愈流程争抢浏览器
+    finished.wait(5)
+
+    raise ItemDeadlineExceeded(f"ItemDeadlineExceeded: 单任务处理超过 {deadline} 秒，已销毁 {len(targets)} 个卡死标签页")
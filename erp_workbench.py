@@ -0,0 +1,140 @@
+"""
+ValkyrieEngine 项目流程工作台查询引擎 (Workbench Query Engine)
+功能：工程数嗅探 (erp_fundamental，功能2/3) 与项目基础信息查询 (erp_information_data_extractor，功能5) 共用的工作台单次查询。
+一次页面脚本调用同时读取表头计数 (#aatest 项目数 / #bbtest 工程数)、结果列表中的全部编号与详情面板字段。
+
+【设计背景】
+原先两条业务线各自维护等待逻辑：工程数嗅探每次查询后点击清空 (#btnclear) 并死等“项目数(0)” (最多 10 秒)，
+项目基础信息查询则固定等待 3.5 秒再解析表头，查询结束后同样清空。两者本质上都在回答同一个问题：“屏幕上的结果是否已属于本次查询”。
+
+【新结果判定】
+不再清空。点击查询后轮询，直至：
+  - 非空结果：列表中出现本编号，且表头与列表一致 (项目数非零、工程数等于列表中本编号的工程后缀数)。
+    表头刷新滞后于列表时，最多再等 HEADER_GRACE 秒 (V2.1.0 延迟读取修复)；仍不一致时表头多半还是上一个编号的读数，
+    按列表渲染超时抛出 ListRenderTimeout 交由重试，绝不以未通过校验的读数作答 (也就不会写入工程数缓存)；
+  - 空结果：表头明确显示项目数为 0 且列表为空，并持续 EMPTY_SETTLE 秒 (原先查询后的固定等待时长) 才采信。
+    查询加载期间列表同样会短暂清空，结果集相对上一次查询“已变化”不能说明加载已完成，因此空结果不设更短的判定。
+详情面板同理：点击列表项前读取面板现有内容，点击后轮询至面板内容属于目标工程 (由调用方判定)。
+"""
+
+import json
+import re
+import time
+from collections import namedtuple
+
+# 查询结果：表头项目数、工程数 (读取失败为 None)，列表中出现的全部编号 (页面顺序)，详情面板字段 {选择器: 文本}
+Snapshot = namedtuple("Snapshot", ["projects", "engineerings", "rows", "panel"])
+
+# 表头刷新滞后于列表时的纠错等待秒数
+HEADER_GRACE = 3
+# 空结果的稳定判定秒数 (与原先查询后的固定等待一致)
+EMPTY_SETTLE = 3.5
+
+# 工作台快照脚本：表头文本、结果列表中的编号 (只扫描不再嵌套表格的叶子单元格，去重并保持页面顺序)、详情面板字段文本
+SNAPSHOT_JS = """
+function text(selector) {
+    var el = document.querySelector(selector);
+    return el ? el.innerText.trim() : null;
+}
+var rows = [], seen = {};
+var cells = document.getElementsByTagName('td');
+for (var i = 0; i < cells.length; i++) {
+    if (cells[i].getElementsByTagName('td').length) { continue; }
+    var found = cells[i].innerText.match(/[A-Za-z]\\d{6,}(?:_\\d{2,})?/g) || [];
+    for (var j = 0; j < found.length; j++) {
+        if (!seen[found[j]]) { seen[found[j]] = 1; rows.push(found[j]); }
+    }
+}
+var selectors = arguments[0] || [], panel = {};
+for (var k = 0; k < selectors.length; k++) { panel[selectors[k]] = text(selectors[k]); }
+return JSON.stringify({projects: text('#aatest'), engineerings: text('#bbtest'), rows: rows, panel: panel});
+"""
+
+
+def parse_count(raw_text):
+    """
+    解析“项目数(X)”“工程数(X)”格式的表头文本；元素不存在或格式不符时返回 None
+    """
+    matched = re.search(r'\((\d+)\)', raw_text or '')
+    return int(matched.group(1)) if matched else None
+
+
+def read_snapshot(tab, selectors=()):
+    """
+    一次往返读取工作台当前的表头计数、结果列表编号与详情面板字段
+    """
+    raw = json.loads(tab.run_js(SNAPSHOT_JS, list(selectors)))
+    return Snapshot(parse_count(raw["projects"]), parse_count(raw["engineerings"]), raw["rows"], raw["panel"])
+
+
+def own_rows(snapshot, code):
+    """
+    结果列表中属于该项目的编号 (项目编号本身及“编号_NN”工程编号)
+    """
+    return [row for row in snapshot.rows if row == code or row.startswith(f"{code}_")]
+
+
+def suffixes(snapshot, code):
+    """
+    结果列表中该项目的工程后缀，按序号排列 (如 ["_01", "_02"])
+    """
+    found = {row[len(code):] for row in own_rows(snapshot, code) if row != code}
+    return sorted(found, key=lambda suffix: int(suffix[1:]))
+
+
+def query(tab, code, timeout=15, interval=0.3):
+    """
+    [核心组件] 工作台单次查询：输入编号 -> 查询 -> 轮询至屏幕上的结果属于本次查询
+    返回：Snapshot。超时抛出 Exception("WorkbenchQueryTimeout")，表头与列表始终不一致时抛出 Exception("ListRenderTimeout")，
+    均由调用方的重试与自愈机制接管。
+    """
+    input_box = tab.ele('#projectcode', timeout=10)
+    if not input_box:
+        raise Exception("WorkbenchNotReady: 无法定位查询输入框，判定页面DOM结构已失效")
+    input_box.clear().input(code)
+    tab.ele('#btnquery', timeout=5).click()
+
+    start = time.time()
+    rows_since = None  # 列表首次出现本编号的时刻 (表头纠错计时起点)
+    empty_since = None  # 空结果首次出现的时刻 (稳定判定计时起点)
+    while True:
+        now = time.time()
+        snapshot = read_snapshot(tab)
+
+        if own_rows(snapshot, code):
+            empty_since = None
+            rows_since = rows_since or now
+            if snapshot.projects and snapshot.engineerings == len(suffixes(snapshot, code)):
+                return snapshot
+            if now - rows_since >= HEADER_GRACE:
+                raise Exception(f"ListRenderTimeout: {code} 的表头读数 (项目数 {snapshot.projects}，"
+                                f"工程数 {snapshot.engineerings}) 与列表中的 {len(suffixes(snapshot, code))} 个工程始终不一致，"
+                                f"疑似表头仍为上一次查询的结果")
+
+        elif snapshot.projects == 0 and not snapshot.rows:
+            rows_since = None
+            empty_since = empty_since or now
+            if now - empty_since >= EMPTY_SETTLE:
+                return snapshot
+
+        else:
+            rows_since = empty_since = None
+
+        if now - start >= timeout:
+            raise Exception(f"WorkbenchQueryTimeout: 查询 {code} 后 {timeout} 秒内结果未刷新，疑似仍在转圈")
+        time.sleep(interval)
+
+
+def read_panel(tab, selectors, ready, timeout=15, interval=0.5):
+    """
+    [核心组件] 详情面板轮询读取：点击列表项后调用，ready(panel) 为真时返回本次读取的面板字段 {选择器: 文本}
+    面板就绪校验与字段提取在同一次往返中完成。超时抛出 Exception("PanelRenderTimeout")。
+    """
+    deadline = time.time() + timeout
+    while True:
+        panel = read_snapshot(tab, selectors).panel
+        if ready(panel):
+            return panel
+        if time.time() >= deadline:
+            raise Exception("PanelRenderTimeout: 详情面板数据请求超时")
+        time.sleep(interval)
\ No newline at end of file
@@ -10,6 +10,10 @@ import erp_construction_bidding_01
 import erp_construction_bidding_data_extractor_01
 import erp_information
 import erp_information_data_extractor
+import erp_search_pool  # [V2.4.0 新增] 检索标签页池，统一托管主/备检索标签页 (对冲检索)
+import erp_latency  # [V2.4.0 新增] 操作耗时统计，运行结束时存档供运行规划试算
+import erp_run_planner  # [V2.4.0 新增] 运行规划试算 (不启动浏览器)
+import erp_refresh  # [V2.4.0 新增] 增量刷新，终态行沿用上一次的输出表
 
 def get_run_mode():
     """
@@ -39,6 +43,7 @@ def feature_1_project_bidding():
     # 【架构规范】提前声明浏览器句柄
     # 防止在步骤1读取Excel报错时，finally 块调用未定义的 page 变量导致二次崩溃
     page = None
+    search_pool = None
 
     try:
         # [V2.0.0 新增] 获取运行模式指令
@@ -56,6 +61,17 @@ def feature_1_project_bidding():
             print("[提示] 源表格中未发现有效的 ERP 编号，程序终止运行。")
             return
 
+        # [V2.4.0 新增] 列投影配置校验：字段名拼写错误在启动浏览器之前即报错
+        erp_construction_bidding_data_extractor.detail_fields()
+
+        # [V2.4.0 新增] 增量刷新：以上一次的输出表为底稿，只重新查询仍可能变化的编号；全部为终态时无需启动浏览器
+        previous = erp_refresh.load(config.F1_OUTPUT)
+        pending = erp_refresh.pending_codes(target_codes, previous, erp_construction_bidding_data_extractor.is_final, {})
+        if not pending:
+            print("[增量刷新] 全部编号上次结果均已是终态，无需登录查询。")
+            data_excel.save_data_to_excel(erp_refresh.carried_rows(target_codes, previous), config.F1_OUTPUT)
+            return
+
         # 步骤 2：系统鉴权与登录
         # 调用 erp_login 模块初始化浏览器实例（ChromiumPage）。
         # 程序将自动填充账号密码，并挂起等待用户手动完成验证码验证。
@@ -67,7 +83,9 @@ def feature_1_project_bidding():
         # 调用 erp_construction_bidding 模块，控制浏览器导航至“施工委托招标”目标页面。
         # 自动执行前置动作：勾选“结束”状态，清除默认的创建时间限制，准备就绪。
         print("\n[系统执行 3/5] 正在进入目标查询界面并设置筛选条件...")
-        search_tab = erp_construction_bidding.setup_search_environment(page)
+        # [V2.4.0] 由检索标签页池统一托管检索标签页；开启对冲检索时会额外预热一个备用标签页
+        search_pool = erp_search_pool.SearchTabPool(page, erp_construction_bidding,
+                                                    hedge=config.HEDGE_SEARCH).build()
 
         # 步骤 4：核心数据提取循环
         # 调用 erp_data_extractor 模块，将清洗后的 target_codes 列表传入。
@@ -75,8 +93,8 @@ def feature_1_project_bidding():
         # 附带页面异常自愈机制，防止单次查询卡顿导致程序崩溃。
         # 【V2.1.0 优化】传入功能1专属的输出路径，用于实时存档
         print("\n[系统执行 4/5] 开启自动化搜索与数据提取流程...")
-        final_results = erp_construction_bidding_data_extractor.run_data_cycle(page, search_tab, target_codes,
-                                                                               config.F1_OUTPUT)
+        final_results = erp_construction_bidding_data_extractor.run_data_cycle(page, search_pool, target_codes,
+                                                                               config.F1_OUTPUT, previous)
 
         # 步骤 5：成果导出与保存
         # 调用 data_excel 模块，将抓取产生的字典列表（包含成功数据及异常状态标记）
@@ -101,9 +119,14 @@ def feature_1_project_bidding():
         # 【生命周期终结与资源回收】
         # 无论程序是正常执行到最后，还是中途被 return 阻断，抑或是由于严重报错进入 except 块，
         # 只要控制流即将离开该函数，系统就会强制进入 finally 块执行这里的资源清理。
+        # [V2.4.0 新增] 存档本次运行的操作耗时，供下次运行规划试算
+        erp_latency.persist()
+        if search_pool is not None:
+            search_pool.close()
         if page is not None:
             print("\n[系统维护] 正在执行浏览器生命周期终结与资源回收...")
-            page.quit()
+            # [V2.4.0] 若运行期间分级自愈重启过浏览器，一并销毁重启后的新实例
+            erp_login.quit_browser(page)
             print("[系统维护] 底层浏览器进程已安全彻底销毁，内存已释放。")
 
 
@@ -123,6 +146,7 @@ def feature_2_engineering_bidding():
     print("=" * 50)
 
     page = None
+    search_pool = None
 
     try:
         # [步骤 0] 获取运行模式指令
@@ -137,6 +161,19 @@ def feature_2_engineering_bidding():
             print("[提示] 源表格中未发现有效的 ERP 编号，程序终止运行。")
             return
 
+        # [V2.4.0 新增] 列投影配置校验：字段名拼写错误在启动浏览器之前即报错
+        erp_construction_bidding_data_extractor_01.selected_fields()
+
+        # [V2.4.0 新增] 增量刷新：以上一次的输出表为底稿，全部工程均为终态的项目整行沿用，不再查询工程数与检索
+        # 终态须核对工程数：底稿记录的工程数与缓存中的真实工程数一致才沿用，缓存未命中的编号登录后再核对
+        previous = erp_refresh.load(config.F2_OUTPUT)
+        counts = erp_refresh.known_counts(target_codes, previous)
+        pending = erp_refresh.pending_codes(target_codes, previous, erp_construction_bidding_data_extractor_01.is_final, counts)
+        if not pending:
+            print("[增量刷新] 全部项目上次结果均已是终态，无需登录查询。")
+            data_excel.save_data_to_excel(erp_refresh.carried_rows(target_codes, previous), config.F2_OUTPUT)
+            return
+
         # [步骤 2] 系统鉴权与登录
         print("\n[系统执行 2/6] 启动浏览器并执行系统登录...")
         page = erp_login.login_erp(run_mode)
@@ -147,7 +184,18 @@ def feature_2_engineering_bidding():
         print("\n[系统执行 3/6] 正在调用基础能力库(erp_fundamental)，获取工程数量字典...")
 
         # 返回值结构示例: [{'项目编号': 'D1234567890', '工程数': 2}, ...]
-        enriched_data = erp_fundamental.batch_get_engineering_counts(page, target_codes)
+        # [V2.4.0] search 模式下跳过整轮工作台嗅探，工程数留空 (None)，由提取器根据检索结果推导
+        if config.ENGINEERING_COUNT_SOURCE == 'search':
+            print("[系统反馈] 工程数将由业务线检索结果推导，跳过工作台批量嗅探。")
+            # 沿用的编号保留缓存中的真实工程数，供提取器核对终态
+            carried = {code: count for code, count in counts.items() if code not in pending}
+            enriched_data = erp_refresh.merge_counts(target_codes, carried)
+        else:
+            fetched, fallback_codes = erp_fundamental.resolve_engineering_counts(page, pending)
+            # 兜底工程数不是真实数据，不能据此核对终态：这些编号的底稿作废，整行重新查询
+            for code in fallback_codes:
+                previous.pop(code, None)
+            enriched_data = erp_refresh.merge_counts(target_codes, dict(counts, **fetched))
 
         print(f"[系统反馈] 基础边界数据构建完毕，共获取 {len(enriched_data)} 条项目的维度信息。")
 
@@ -161,7 +209,8 @@ def feature_2_engineering_bidding():
 
         # 导航至“施工委托（招标）”列表页 (注意：调用的是 _01 后缀的新模块)
         print("\n[系统执行 4/6] 正在进入【施工委托（招标）】业务线并设置筛选条件...")
-        search_tab = erp_construction_bidding_01.setup_search_environment(page)
+        search_pool = erp_search_pool.SearchTabPool(page, erp_construction_bidding_01,
+                                                    hedge=config.HEDGE_SEARCH).build()
 
         # [步骤 5] 核心数据提取循环 (传入 enriched_data)
         # 逻辑：这里是将“大脑”(enriched_data) 和 “手”(search_tab) 结合的地方。
@@ -170,9 +219,10 @@ def feature_2_engineering_bidding():
 
         final_results = erp_construction_bidding_data_extractor_01.run_data_cycle(
             page,  # 浏览器大管家 (用于获取详情页句柄)
-            search_tab,  # 列表页句柄 (用于搜索和翻页)
+            search_pool,  # 检索标签页池 (用于搜索和翻页，内含主/备列表页句柄)
             enriched_data,  # 核心数据源 (包含项目编号和工程数)
-            config.F2_OUTPUT  # 结果保存路径
+            config.F2_OUTPUT,  # 结果保存路径
+            previous  # [V2.4.0] 增量刷新底稿
         )
 
         print("\n" + "=" * 50)
@@ -188,9 +238,13 @@ def feature_2_engineering_bidding():
 
     finally:
         # 生命周期终结与资源回收
+        erp_latency.persist()
+        if search_pool is not None:
+            search_pool.close()
         if page is not None:
             print("\n[系统维护] 正在执行浏览器生命周期终结与资源回收...")
-            page.quit()
+            # [V2.4.0] 若运行期间分级自愈重启过浏览器，一并销毁重启后的新实例
+            erp_login.quit_browser(page)
             print("[系统维护] 底层浏览器进程已安全彻底销毁。")
 
 
@@ -204,6 +258,7 @@ def feature_3_inventory_query():
     print("=" * 50)
 
     page = None
+    search_pool = None
 
     try:
         # 获取运行模式指令 (1 还是 2)
@@ -218,6 +273,16 @@ def feature_3_inventory_query():
             print("[提示] 源表格中未发现有效的 ERP 编号，程序终止运行。")
             return
 
+        # [V2.4.0 新增] 增量刷新：以上一次的输出表为底稿，全部工程均已结束的编号整行沿用，不再查询工程数与检索
+        # 终态须核对工程数：底稿记录的工程数与缓存中的真实工程数一致才沿用，缓存未命中的编号登录后再核对
+        previous = erp_refresh.load(config.F3_OUTPUT)
+        counts = erp_refresh.known_counts(target_codes, previous)
+        pending = erp_refresh.pending_codes(target_codes, previous, erp_inventory_data_extractor.is_final, counts)
+        if not pending:
+            print("[增量刷新] 全部编号上次结果均已是终态，无需登录查询。")
+            data_excel.save_data_to_excel(erp_refresh.carried_rows(target_codes, previous), config.F3_OUTPUT)
+            return
+
         # 步骤 2：系统鉴权与登录
         print("\n[系统执行 2/5] 启动浏览器并执行系统登录...")
         page = erp_login.login_erp(run_mode)
@@ -231,14 +296,25 @@ def feature_3_inventory_query():
 
         # 调用 fundamental 模块的批量查询功能
         # 返回值 enriched_data 是一个字典列表：[{'项目编号': 'D123', '工程数': 3}, ...]
-        enriched_data = erp_fundamental.batch_get_engineering_counts(page, target_codes)
+        # [V2.4.0] search 模式下跳过整轮工作台嗅探，工程数留空 (None)，由提取器根据检索结果推导
+        if config.ENGINEERING_COUNT_SOURCE == 'search':
+            print("[系统反馈] 工程数将由盘点列表检索结果推导，跳过工作台批量嗅探。")
+            # 沿用的编号保留缓存中的真实工程数，供提取器核对终态
+            carried = {code: count for code, count in counts.items() if code not in pending}
+            enriched_data = erp_refresh.merge_counts(target_codes, carried)
+        else:
+            fetched, fallback_codes = erp_fundamental.resolve_engineering_counts(page, pending)
+            # 兜底工程数不是真实数据，不能据此核对终态：这些编号的底稿作废，整行重新查询
+            for code in fallback_codes:
+                previous.pop(code, None)
+            enriched_data = erp_refresh.merge_counts(target_codes, dict(counts, **fetched))
 
         print(f"[系统反馈] 边界数据获取完毕，准备携带 {len(enriched_data)} 条精准数据进入盘点业务线...")
 
         # 步骤 4：初始化查询环境 (盘点业务专属)
         # 注意：fundamental 模块执行完后已经关闭了工作台标签页，此时 page 焦点在首页，可以直接导航。
         print("\n[系统执行 4/5] 正在进入盘点查询界面并设置筛选条件...")
-        search_tab = erp_inventory.setup_search_environment(page)
+        search_pool = erp_search_pool.SearchTabPool(page, erp_inventory, hedge=config.HEDGE_SEARCH).build()
 
         # 步骤 5：核心数据提取循环 (传入 enriched_data 字典列表)
         # 逻辑：我们将上一步获取到的带有“工程数”的字典列表传给提取器。
@@ -247,9 +323,10 @@ def feature_3_inventory_query():
         print("\n[系统执行 5/5] 开启工程维度定向雷达嗅探扫描...")
         final_results = erp_inventory_data_extractor.run_data_cycle(
             page,
-            search_tab,
+            search_pool,
             enriched_data,  # <--- 这里传进去的就是字典列表啦！
-            config.F3_OUTPUT
+            config.F3_OUTPUT,
+            previous  # [V2.4.0] 增量刷新底稿
         )
 
         print("\n" + "=" * 50)
@@ -262,9 +339,13 @@ def feature_3_inventory_query():
         print("!" * 50)
 
     finally:
+        erp_latency.persist()
+        if search_pool is not None:
+            search_pool.close()
         if page is not None:
             print("\n[系统维护] 正在执行浏览器生命周期终结与资源回收...")
-            page.quit()
+            # [V2.4.0] 若运行期间分级自愈重启过浏览器，一并销毁重启后的新实例
+            erp_login.quit_browser(page)
             print("[系统维护] 底层浏览器进程已安全彻底销毁，内存已释放。")
 
 
@@ -301,6 +382,9 @@ def feature_5_project_information():
             print("[调度提示] 输入源数据校验未通过，任务终止。")
             return
 
+        # [V2.4.0 新增] 列投影配置校验：字段名拼写错误在启动浏览器之前即报错
+        erp_information_data_extractor.panel_fields()
+
         # 第二阶段：浏览器初始化与身份验证
         print("\n[调度流 2/4] 初始化浏览器引擎并执行系统级鉴权...")
         page = erp_login.login_erp(run_mode)
@@ -327,11 +411,29 @@ def feature_5_project_information():
     finally:
         # 【核心要求：浏览器进程强制销毁】
         # 无论上述 try 块中发生何种异常，此处均会执行，确保物理内存资源被安全释放。
+        erp_latency.persist()
         if page is not None:
             print("\n[调度维护] 正在执行浏览器生命周期终结与进程资源回收...")
-            page.quit()
+            # [V2.4.0] 若运行期间分级自愈重启过浏览器，一并销毁重启后的新实例
+            erp_login.quit_browser(page)
             print("[调度维护] 底层浏览器进程已彻底销毁，内存句柄已释放。")
 
+
+def run_planner():
+    """
+    [V2.4.0 新增] 运行规划试算：不启动浏览器，仅依据输入表格与本地缓存预估一次批量任务的工作量与耗时
+    """
+    feature = input("\n[运行规划] 请输入需要试算的功能编号 (1/2/3/5): ").strip()
+    if feature not in erp_run_planner.PLANNERS:
+        print("\n[输入异常] 仅支持对功能 1、2、3、5 进行试算。")
+        return
+
+    try:
+        erp_run_planner.plan(feature)
+    except Exception as e:
+        print(f"\n[运行规划] 试算失败：{e}")
+
+
 def main_engine_hub():
     """
     ValkyrieEngine 主控路由中枢
@@ -350,8 +452,9 @@ def main_engine_hub():
         print("  5. 项目基础信息查询（ERP状态、总包、分包、项目经理） [已上线]")
         print("  6. 两重项目类别查询 [待开发]")
         print("  7. 退出系统")
+        print("  8. 运行规划试算（不启动浏览器，预估工作量与耗时） [V2.4.0 新增]")
 
-        choice = input("\n[主控中枢] 请输入功能编号 (1-7): ").strip()
+        choice = input("\n[主控中枢] 请输入功能编号 (1-8): ").strip()
 
         if choice == '1':
             # 路由跳转：分配至功能 1 对应的业务线
@@ -381,8 +484,12 @@ def main_engine_hub():
             print("\n[系统提示] 正在安全退出系统。")
             break
 
+        elif choice == '8':
+            # [V2.4.0] 试算后返回主菜单，可继续选择功能正式运行 (新增于末尾，保持原有编号不变)
+            run_planner()
+
         else:
-            print("\n[输入异常] 无法识别的指令，请输入 1-7 之间的有效数字。")
+            print("\n[输入异常] 无法识别的指令，请输入 1-8 之间的有效数字。")
 
 
 # 程序启动入口